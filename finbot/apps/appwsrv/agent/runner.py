@@ -1,22 +1,33 @@
 """Streaming agent runner — drives the OpenAI tool-call loop and emits SSE events.
 
 The chat endpoint is stateless: the client posts the full conversation history each
-turn. This generator opens its own DB session because FastAPI's `manage_db_session`
-middleware closes its session before the StreamingResponse body runs.
+turn. Blocking work (system prompt, tool handlers) runs in a bounded thread pool so
+that it never blocks the event loop, each call opening its own DB session because
+FastAPI's `manage_db_session` middleware closes its session before the
+StreamingResponse body runs. Tool calls of the same round run concurrently, their
+results are emitted in the order the model requested them.
+
+The system prompt and data tool results are cached (see `tool_cache`) against the
+version of the user's data read at the start of the turn.
 """
 
+import asyncio
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any, AsyncIterator, cast
 
 import orjson
-from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
 
 from finbot.apps.appwsrv.agent import schema as agent_schema
+from finbot.apps.appwsrv.agent import tool_cache
 from finbot.apps.appwsrv.agent import tools as agent_tools
 from finbot.apps.appwsrv.agent.prompts import build_system_prompt
-from finbot.core.environment import get_environment_value_or, get_openai_api_key
+from finbot.apps.appwsrv.agent.tools.base import ToolResult, ToolSpec
+from finbot.core.environment import get_environment_value_or
+from finbot.core.llm_gateway import Priority, get_llm_gateway
 from finbot.model import ScopedSession
 
 logger = logging.getLogger(__name__)
@@ -24,171 +35,218 @@ logger = logging.getLogger(__name__)
 
 CHAT_MODEL: str = get_environment_value_or("FINBOT_CHAT_MODEL") or "gpt-5.5"
 MAX_ROUNDS: int = 8
+MAX_TOOL_WORKERS: int = 8
+
+# shared by all chat sessions, bounds the DB work (and connections) used by the agent
+_TOOLS_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="agent-tools")
+
+
+@dataclass
+class _ToolCall:
+    id: str
+    name: str
+    args: dict[str, Any]
+    spec: ToolSpec[Any] | None
+    result: asyncio.Future[ToolResult] | None = field(default=None)
 
 
 def _sse(event: str, payload: dict[str, Any]) -> bytes:
     return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n".encode()
 
 
+def _load_context(user_account_id: int) -> tuple[tool_cache.DataVersion, str]:
+    with ScopedSession() as session:
+        version = tool_cache.get_data_version(session, user_account_id)
+        system_prompt = tool_cache.get_system_prompt(user_account_id, version)
+        if system_prompt is None:
+            system_prompt = build_system_prompt(session, user_account_id)
+            tool_cache.put_system_prompt(user_account_id, version, system_prompt)
+        return version, system_prompt
+
+
+def _run_tool(
+    spec: ToolSpec[Any],
+    user_account_id: int,
+    version: tool_cache.DataVersion,
+    args: dict[str, Any],
+) -> ToolResult:
+    parsed_args = spec.args_model.model_validate(args)
+    if spec.is_render_tool:
+        return spec.handler(parsed_args)
+    cache_key = tool_cache.make_tool_result_key(spec.name, user_account_id, parsed_args, version)
+    if (result := tool_cache.get_tool_result(cache_key)) is not None:
+        return result
+    with ScopedSession() as session:
+        result = spec.handler(session, user_account_id, parsed_args)
+    tool_cache.put_tool_result(cache_key, result)
+    return result
+
+
+def _parse_tool_call(slot: dict[str, str]) -> _ToolCall:
+    try:
+        args = json.loads(slot["args"] or "{}")
+    except json.JSONDecodeError:
+        args = {}
+    return _ToolCall(id=slot["id"], name=slot["name"], args=args, spec=agent_tools.TOOLS_BY_NAME.get(slot["name"]))
+
+
 async def stream_agent_response(
     user_account_id: int,
     messages: list[agent_schema.ChatMessage],
 ) -> AsyncIterator[bytes]:
-    api_key = get_openai_api_key()
-    if not api_key:
+    gateway = get_llm_gateway()
+    if gateway is None:
         # Caller (route) should have returned 503 already; double-guard.
         yield _sse("error", {"message": "Chat assistant is not configured on this server"})
         yield _sse("done", {})
         return
 
-    with ScopedSession() as session:
-        try:
-            system_prompt = build_system_prompt(session, user_account_id)
-        except Exception as exc:
-            logger.exception("failed to build system prompt for user %s", user_account_id)
-            yield _sse("error", {"message": f"Failed to load context: {exc}"})
-            yield _sse("done", {})
-            return
-
-        oa_messages: list[dict[str, Any]] = [
-            {"role": "system", "content": system_prompt},
-            *[{"role": m.role, "content": m.content} for m in messages],
-        ]
-        client = AsyncOpenAI(api_key=api_key)
-
-        yield _sse("assistant_message_start", {})
-
-        for _round in range(MAX_ROUNDS):
-            try:
-                stream = await client.chat.completions.create(
-                    model=CHAT_MODEL,
-                    messages=cast(list[ChatCompletionMessageParam], oa_messages),
-                    tools=cast(list[ChatCompletionToolParam], agent_tools.OPENAI_TOOLS),
-                    stream=True,
-                )
-            except Exception as exc:
-                logger.exception("OpenAI request failed")
-                yield _sse("error", {"message": f"Chat request failed: {exc}"})
-                break
+    loop = asyncio.get_running_loop()
+    try:
+        version, system_prompt = await loop.run_in_executor(_TOOLS_EXECUTOR, _load_context, user_account_id)
+    except Exception as exc:
+        logger.exception("failed to build system prompt for user %s", user_account_id)
+        yield _sse("error", {"message": f"Failed to load context: {exc}"})
+        yield _sse("done", {})
+        return
 
-            text_acc = ""
-            tool_acc: dict[int, dict[str, str]] = {}
-            finish_reason: str | None = None
+    oa_messages: list[dict[str, Any]] = [
+        {"role": "system", "content": system_prompt},
+        *[{"role": m.role, "content": m.content} for m in messages],
+    ]
 
-            try:
-                async for chunk in stream:
-                    if not chunk.choices:
-                        continue
-                    choice = chunk.choices[0]
-                    delta = choice.delta
-                    if delta.content:
-                        text_acc += delta.content
-                        yield _sse("text_delta", {"delta": delta.content})
-                    if delta.tool_calls:
-                        for tc in delta.tool_calls:
-                            slot = tool_acc.setdefault(tc.index, {"id": "", "name": "", "args": ""})
-                            if tc.id:
-                                slot["id"] = tc.id
-                            fn = tc.function
-                            if fn is not None:
-                                if fn.name:
-                                    slot["name"] = fn.name
-                                if fn.arguments:
-                                    slot["args"] += fn.arguments
-                    if choice.finish_reason:
-                        finish_reason = choice.finish_reason
-            except Exception as exc:
-                logger.exception("OpenAI stream interrupted")
-                yield _sse("error", {"message": f"Chat stream interrupted: {exc}"})
-                break
+    yield _sse("assistant_message_start", {})
 
-            assistant_msg: dict[str, Any] = {"role": "assistant"}
-            if text_acc:
-                assistant_msg["content"] = text_acc
-            if tool_acc:
-                assistant_msg["tool_calls"] = [
-                    {
-                        "id": s["id"],
-                        "type": "function",
-                        "function": {"name": s["name"], "arguments": s["args"] or "{}"},
-                    }
-                    for s in tool_acc.values()
-                ]
-            oa_messages.append(assistant_msg)
+    for _round in range(MAX_ROUNDS):
+        stream = gateway.stream_chat(
+            caller="chat_agent",
+            model=CHAT_MODEL,
+            messages=cast(list[ChatCompletionMessageParam], oa_messages),
+            tools=cast(list[ChatCompletionToolParam], agent_tools.OPENAI_TOOLS),
+            priority=Priority.Interactive,
+        )
 
-            if finish_reason != "tool_calls" or not tool_acc:
-                break
+        text_acc = ""
+        tool_acc: dict[int, dict[str, str]] = {}
+        finish_reason: str | None = None
+        stream_started = False
 
-            for slot in tool_acc.values():
-                spec = agent_tools.TOOLS_BY_NAME.get(slot["name"])
-                try:
-                    args = json.loads(slot["args"] or "{}")
-                except json.JSONDecodeError:
-                    args = {}
-
-                if spec is None:
-                    yield _sse(
-                        "tool_call_end",
-                        {"id": slot["id"], "status": "error", "result_summary": f"unknown tool: {slot['name']}"},
-                    )
-                    oa_messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": slot["id"],
-                            "content": f"ERROR: unknown tool {slot['name']!r}",
-                        }
-                    )
+        try:
+            async for chunk in stream:
+                stream_started = True
+                if not chunk.choices:
                     continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    text_acc += delta.content
+                    yield _sse("text_delta", {"delta": delta.content})
+                if delta.tool_calls:
+                    for tc in delta.tool_calls:
+                        slot = tool_acc.setdefault(tc.index, {"id": "", "name": "", "args": ""})
+                        if tc.id:
+                            slot["id"] = tc.id
+                        fn = tc.function
+                        if fn is not None:
+                            if fn.name:
+                                slot["name"] = fn.name
+                            if fn.arguments:
+                                slot["args"] += fn.arguments
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        except Exception as exc:
+            if not stream_started:
+                logger.exception("OpenAI request failed")
+                yield _sse("error", {"message": f"Chat request failed: {exc}"})
+                break
+            logger.exception("OpenAI stream interrupted")
+            yield _sse("error", {"message": f"Chat stream interrupted: {exc}"})
+            break
+
+        assistant_msg: dict[str, Any] = {"role": "assistant"}
+        if text_acc:
+            assistant_msg["content"] = text_acc
+        if tool_acc:
+            assistant_msg["tool_calls"] = [
+                {
+                    "id": s["id"],
+                    "type": "function",
+                    "function": {"name": s["name"], "arguments": s["args"] or "{}"},
+                }
+                for s in tool_acc.values()
+            ]
+        oa_messages.append(assistant_msg)
+
+        if finish_reason != "tool_calls" or not tool_acc:
+            break
+
+        calls = [_parse_tool_call(slot) for slot in tool_acc.values()]
+        for call in calls:
+            if call.spec is None:
+                continue
+            yield _sse(
+                "tool_call_start",
+                {
+                    "id": call.id,
+                    "name": call.spec.name,
+                    "label": call.spec.label,
+                    "icon": call.spec.icon,
+                },
+            )
+            call.result = loop.run_in_executor(
+                _TOOLS_EXECUTOR, _run_tool, call.spec, user_account_id, version, call.args
+            )
 
+        for call in calls:
+            if call.spec is None or call.result is None:
                 yield _sse(
-                    "tool_call_start",
+                    "tool_call_end",
+                    {"id": call.id, "status": "error", "result_summary": f"unknown tool: {call.name}"},
+                )
+                oa_messages.append(
                     {
-                        "id": slot["id"],
-                        "name": spec.name,
-                        "label": spec.label,
-                        "icon": spec.icon,
-                    },
+                        "role": "tool",
+                        "tool_call_id": call.id,
+                        "content": f"ERROR: unknown tool {call.name!r}",
+                    }
                 )
+                continue
 
-                try:
-                    parsed_args = spec.args_model.model_validate(args)
-                    if spec.is_render_tool:
-                        result = spec.handler(parsed_args)
-                    else:
-                        result = spec.handler(session, user_account_id, parsed_args)
-                except Exception as exc:
-                    logger.exception("tool %s failed", spec.name)
-                    yield _sse(
-                        "tool_call_end",
-                        {"id": slot["id"], "status": "error", "result_summary": str(exc)[:120]},
-                    )
-                    oa_messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": slot["id"],
-                            "content": f"ERROR: {exc}",
-                        }
-                    )
-                    continue
-
-                if result.rich_block is not None:
-                    yield _sse("rich_block", {"block": result.rich_block.model_dump()})
-
+            try:
+                result = await call.result
+            except Exception as exc:
+                logger.exception("tool %s failed", call.spec.name)
                 yield _sse(
                     "tool_call_end",
-                    {"id": slot["id"], "status": "done", "result_summary": result.summary},
+                    {"id": call.id, "status": "error", "result_summary": str(exc)[:120]},
                 )
                 oa_messages.append(
                     {
                         "role": "tool",
-                        "tool_call_id": slot["id"],
-                        "content": result.payload_json(),
+                        "tool_call_id": call.id,
+                        "content": f"ERROR: {exc}",
                     }
                 )
-        else:
+                continue
+
+            if result.rich_block is not None:
+                yield _sse("rich_block", {"block": result.rich_block.model_dump()})
+
             yield _sse(
-                "text_delta",
-                {"delta": "I had trouble completing that — could you rephrase?"},
+                "tool_call_end",
+                {"id": call.id, "status": "done", "result_summary": result.summary},
+            )
+            oa_messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": call.id,
+                    "content": result.payload_json(),
+                }
             )
+    else:
+        yield _sse(
+            "text_delta",
+            {"delta": "I had trouble completing that — could you rephrase?"},
+        )
 
-        yield _sse("done", {})
+    yield _sse("done", {})
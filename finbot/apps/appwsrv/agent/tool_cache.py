@@ -0,0 +1,93 @@
+"""In-memory cache of the chat agent system prompts and data tool results.
+
+The client reposts the full conversation on every turn, so the agent frequently
+re-runs the same data tools, with the same arguments, across turns. Results are
+cached against the user's `DataVersion`: when a new valuation lands (or transactions,
+linked accounts or settings change) the version changes and the stale entries are
+never hit again, they are evicted (least recently used first) or expire.
+
+Entries also expire after `TOOL_RESULTS_TTL` seconds: transactions post-processing
+(categories, transfers, subscriptions) completes after the valuation lands and does
+not change the version.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any
+
+from cachetools import TTLCache
+from sqlalchemy.sql import text
+
+from finbot.apps.appwsrv.agent.tools.base import ToolResult
+from finbot.core.schema import BaseModel
+from finbot.model import SessionType
+
+TOOL_RESULTS_TTL = 600
+
+_TOOL_RESULTS_CACHE: TTLCache[tuple[Any, ...], ToolResult] = TTLCache(maxsize=2_000, ttl=TOOL_RESULTS_TTL)
+_SYSTEM_PROMPTS_CACHE: TTLCache[tuple[Any, ...], str] = TTLCache(maxsize=1_000, ttl=TOOL_RESULTS_TTL)
+_CACHE_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    last_history_entry_id: int | None
+    last_transaction_id: int | None
+    last_account_change: datetime | None
+    today: date
+
+
+def get_data_version(session: SessionType, user_account_id: int) -> DataVersion:
+    query = """
+        SELECT (SELECT MAX(he.id)
+                  FROM finbot_user_accounts_history_entries he
+                 WHERE he.user_account_id = :user_account_id
+                   AND he.available) AS last_history_entry_id,
+               (SELECT MAX(th.id)
+                  FROM finbot_transactions_history th
+                  JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
+                 WHERE la.user_account_id = :user_account_id) AS last_transaction_id,
+               (SELECT MAX(GREATEST(COALESCE(la.updated_at, la.created_at),
+                                    COALESCE(s.updated_at, s.created_at)))
+                  FROM finbot_user_accounts_settings s
+                  LEFT JOIN finbot_linked_accounts la ON la.user_account_id = s.user_account_id
+                 WHERE s.user_account_id = :user_account_id) AS last_account_change
+    """
+    row = session.execute(text(query), {"user_account_id": user_account_id}).one()
+    return DataVersion(
+        last_history_entry_id=row.last_history_entry_id,
+        last_transaction_id=row.last_transaction_id,
+        last_account_change=row.last_account_change,
+        today=datetime.now(timezone.utc).date(),
+    )
+
+
+def make_tool_result_key(
+    tool_name: str,
+    user_account_id: int,
+    args: BaseModel,
+    version: DataVersion,
+) -> tuple[Any, ...]:
+    # validated arguments, defaults included, serialized in field declaration order
+    return tool_name, user_account_id, args.model_dump_json(), version
+
+
+def get_tool_result(key: tuple[Any, ...]) -> ToolResult | None:
+    with _CACHE_LOCK:
+        return _TOOL_RESULTS_CACHE.get(key)
+
+
+def put_tool_result(key: tuple[Any, ...], result: ToolResult) -> None:
+    with _CACHE_LOCK:
+        _TOOL_RESULTS_CACHE[key] = result
+
+
+def get_system_prompt(user_account_id: int, version: DataVersion) -> str | None:
+    with _CACHE_LOCK:
+        return _SYSTEM_PROMPTS_CACHE.get((user_account_id, version))
+
+
+def put_system_prompt(user_account_id: int, version: DataVersion, system_prompt: str) -> None:
+    with _CACHE_LOCK:
+        _SYSTEM_PROMPTS_CACHE[(user_account_id, version)] = system_prompt
@@ -12,7 +12,13 @@ from finbot.model import SessionType
 class _Args(BaseModel):
     from_date: date | None = Field(default=None, description="Start of the date range (inclusive).")
     to_date: date | None = Field(default=None, description="End of the date range (inclusive).")
-    description: str | None = Field(default=None, description="Substring match on transaction description.")
+    description: str | None = Field(
+        default=None,
+        description=(
+            "Search text, matched against transaction descriptions, counterparties and merchant names. "
+            "Results are then ranked by relevance rather than by date."
+        ),
+    )
     merchant_name: list[str] | None = Field(default=None, description="Filter by merchant name(s).")
     spending_category: list[str] | None = Field(default=None, description="Filter by spending category code(s).")
     amount_sign: agent_schema.AmountSign | None = Field(default=None, description="Filter to credits or debits only.")
@@ -41,7 +47,8 @@ class _Payload(BaseModel):
 
 @data_tool(
     description=(
-        "Search transactions with optional filters. Returns at most 50 rows ordered by date desc. "
+        "Search transactions with optional filters. Returns at most 50 rows ordered by date desc "
+        "(by relevance when searching text). "
         "Use for specific transaction lookups; for spending summaries prefer get_spending_breakdown."
     ),
     icon="search",
@@ -63,6 +70,7 @@ def search_transactions(session: SessionType, user_account_id: int, args: _Args)
         amount_max=args.amount_max,
         limit=args.limit,
         offset=0,
+        rank_by_relevance=True,
     )
     txns = [
         _Transaction(
@@ -1,13 +1,17 @@
+import base64
 import calendar
+import threading
 from collections import defaultdict
 from datetime import date, datetime, timedelta, timezone
 from typing import Any
 
+from cachetools import TTLCache
 from pydantic import AwareDatetime
 from sqlalchemy.sql import text
 
 from finbot.apps.appwsrv.reports.transactions import schema
 from finbot.core.db.utils import row_to_dict
+from finbot.core.errors import InvalidUserInput
 from finbot.core.spending_categories import PRIMARY_CATEGORY_LABELS as SPENDING_CATEGORY_LABELS
 from finbot.model import (
     SessionType,
@@ -17,6 +21,71 @@ from finbot.model import (
     repository,
 )
 
+TOTAL_COUNT_TTL = 300
+
+_TOTAL_COUNTS_CACHE: TTLCache[tuple[str, tuple[tuple[str, Any], ...]], int] = TTLCache(
+    maxsize=10_000, ttl=TOTAL_COUNT_TTL
+)
+_TOTAL_COUNTS_CACHE_LOCK = threading.Lock()
+
+FILTER_OPTIONS_TTL = 30
+
+_FILTER_OPTIONS_CACHE: TTLCache[tuple[tuple[str, Any], ...], schema.TransactionFilterOptions] = TTLCache(
+    maxsize=10_000, ttl=FILTER_OPTIONS_TTL
+)
+_FILTER_OPTIONS_CACHE_LOCK = threading.Lock()
+
+# Facets of the transaction filter options: each facet is counted without its own filters
+FILTER_FACETS = ("account", "category", "merchant", "amount")
+
+# GROUPING(linked_account_id, spending_category_primary, merchant_name) of each grouping set
+_GROUPED_BY_ACCOUNT = 0b011
+_GROUPED_BY_CATEGORY = 0b101
+_GROUPED_BY_MERCHANT = 0b110
+_GROUPED_BY_NOTHING = 0b111
+
+# Daily cash-flow rows (per day, transaction type, spending category and internal
+# transfer flag) of the user's transactions in [:from_time, :to_time]. Days fully
+# contained in the range are read from the daily aggregates, the (partial) days at
+# the edges of the range are aggregated from the transactions history.
+_FIRST_FULL_DAY = "(CAST(:from_time AS timestamptz) + interval '1 day' - interval '1 microsecond')::date"
+_END_FULL_DAY = "CAST(:to_time AS timestamptz)::date"
+_CASH_FLOW_ROWS_QUERY = f"""
+        SELECT a.day,
+               a.transaction_type,
+               a.spending_category_primary,
+               a.is_internal_transfer,
+               a.inflows,
+               a.outflows,
+               a.transaction_count
+          FROM finbot_cash_flow_daily_aggregates a
+          JOIN finbot_linked_accounts la ON a.linked_account_id = la.id
+         WHERE a.user_account_id = :user_account_id
+           AND NOT la.deleted
+           AND a.day >= {_FIRST_FULL_DAY}
+           AND a.day < {_END_FULL_DAY}
+         UNION ALL
+        SELECT th.transaction_date::date AS day,
+               th.transaction_type,
+               th.spending_category_primary,
+               th.is_internal_transfer,
+               COALESCE(SUM(CASE WHEN th.amount_snapshot_ccy > 0 THEN th.amount_snapshot_ccy ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN th.amount_snapshot_ccy < 0 THEN th.amount_snapshot_ccy ELSE 0 END), 0),
+               COUNT(*)
+          FROM finbot_transactions_history th
+          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
+         WHERE la.user_account_id = :user_account_id
+           AND NOT la.deleted
+           AND th.transaction_date >= :from_time
+           AND th.transaction_date <= :to_time
+           AND (th.transaction_date < {_FIRST_FULL_DAY}
+                OR th.transaction_date >= GREATEST({_FIRST_FULL_DAY}, {_END_FULL_DAY}))
+         GROUP BY th.transaction_date::date,
+                  th.transaction_type,
+                  th.spending_category_primary,
+                  th.is_internal_transfer
+"""
+
 
 def get_subscriptions_report(
     session: SessionType,
@@ -118,29 +187,20 @@ def get_spending_calendar(
     )
 
     # Daily spending aggregation (outflows only, match-excluded)
-    spending_query = """
-        SELECT th.transaction_date::date AS spend_date,
-               COALESCE(SUM(ABS(th.amount_snapshot_ccy)), 0) AS total_spending
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.transaction_date >= :month_start
-           AND th.transaction_date < :month_end_exclusive
-           AND th.amount_snapshot_ccy < 0
-           AND th.id NOT IN (
-               SELECT tm.outflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-               UNION ALL
-               SELECT tm.inflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-           )
-         GROUP BY th.transaction_date::date
+    spending_query = f"""
+        SELECT c.day AS spend_date,
+               -SUM(c.outflows) AS total_spending
+          FROM ({_CASH_FLOW_ROWS_QUERY}) c
+         WHERE NOT c.is_internal_transfer
+         GROUP BY c.day
+        HAVING SUM(c.outflows) < 0
     """
     spending_rows = session.execute(
         text(spending_query),
         {
             "user_account_id": user_account_id,
-            "month_start": dt_month_start,
-            "month_end_exclusive": dt_month_end_exclusive,
+            "from_time": dt_month_start,
+            "to_time": dt_month_end_exclusive - timedelta(microseconds=1),
         },
     )
     spending_by_date: dict[date, float] = {}
@@ -276,6 +336,94 @@ def get_spending_calendar(
     )
 
 
+def encode_transactions_cursor(transaction_date: datetime, transaction_id: int) -> str:
+    """Opaque cursor pointing after the given transaction (in report order)"""
+    return base64.urlsafe_b64encode(f"{transaction_date.isoformat()}|{transaction_id}".encode()).decode()
+
+
+def _decode_transactions_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        transaction_date, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(transaction_date), int(transaction_id)
+    except ValueError:
+        raise InvalidUserInput(f"invalid transactions cursor: {cursor}")
+
+
+def _to_search_pattern(search_text: str) -> str:
+    """Case insensitive substring (ILIKE) pattern, LIKE wildcards in the search
+    text are matched literally"""
+    escaped = search_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _build_search_clause(pattern_param: str) -> str:
+    """Transactions whose description, counterparty or merchant name match the
+    pattern. Each condition is served by a trigram (pg_trgm) index, so that
+    substring search does not scan the whole transactions history."""
+    return f"""(th.description ILIKE :{pattern_param}
+              OR th.counterparty ILIKE :{pattern_param}
+              OR th.merchant_id IN (SELECT ms.id FROM finbot_merchants ms WHERE ms.name ILIKE :{pattern_param}))"""
+
+
+def _get_transactions_total_count(
+    session: SessionType,
+    count_query: str,
+    params: dict[str, Any],
+    refresh: bool,
+) -> int:
+    """Count of transactions matching the report filters, cached for
+    `TOTAL_COUNT_TTL` seconds so that following pages do not recount"""
+    cache_key = (count_query, tuple(sorted(params.items())))
+    if not refresh:
+        with _TOTAL_COUNTS_CACHE_LOCK:
+            if (total_count := _TOTAL_COUNTS_CACHE.get(cache_key)) is not None:
+                return total_count
+    total_count = session.execute(text(count_query), params).scalar() or 0
+    with _TOTAL_COUNTS_CACHE_LOCK:
+        _TOTAL_COUNTS_CACHE[cache_key] = total_count
+    return total_count
+
+
+def _get_sub_account_names(session: SessionType, transaction_ids: list[int]) -> dict[tuple[int, str], str]:
+    """Latest description of the sub-accounts of the given transactions"""
+    query = """
+        SELECT k.linked_account_id,
+               k.sub_account_id,
+               latest.sub_account_description
+          FROM (SELECT DISTINCT th.linked_account_id, th.sub_account_id
+                  FROM finbot_transactions_history th
+                 WHERE th.id IN :transaction_ids) k
+         CROSS JOIN LATERAL (
+               SELECT savhe.sub_account_description
+                 FROM finbot_sub_accounts_valuation_history_entries savhe
+                WHERE savhe.linked_account_id = k.linked_account_id
+                  AND savhe.sub_account_id = k.sub_account_id
+                ORDER BY savhe.history_entry_id DESC
+                LIMIT 1
+         ) latest
+    """
+    return {
+        (row.linked_account_id, row.sub_account_id): row.sub_account_description
+        for row in session.execute(text(query), {"transaction_ids": tuple(transaction_ids)})
+    }
+
+
+def _get_matched_transaction_ids(session: SessionType, transaction_ids: list[int]) -> dict[int, int]:
+    """Counterpart (matched transfer) of the given transactions"""
+    query = """
+        SELECT tm.outflow_transaction_id,
+               tm.inflow_transaction_id
+          FROM finbot_transaction_matches tm
+         WHERE (tm.outflow_transaction_id IN :transaction_ids OR tm.inflow_transaction_id IN :transaction_ids)
+           AND tm.match_status != 'rejected'
+    """
+    matched_ids: dict[int, int] = {}
+    for row in session.execute(text(query), {"transaction_ids": tuple(transaction_ids)}):
+        matched_ids.setdefault(row.outflow_transaction_id, row.inflow_transaction_id)
+        matched_ids.setdefault(row.inflow_transaction_id, row.outflow_transaction_id)
+    return matched_ids
+
+
 def get_transactions_report(
     session: SessionType,
     user_account_id: int,
@@ -291,10 +439,23 @@ def get_transactions_report(
     amount_sign: str | None = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
+    rank_by_relevance: bool = False,
 ) -> schema.TransactionsReport:
+    """Transactions, most recent first. Pages are selected with `cursor` (the
+    `next_cursor` of the previous page, keyset pagination) or `offset`.
+
+    `description` is searched in transactions descriptions, counterparties and
+    merchant names. With `rank_by_relevance`, matching transactions are ordered
+    by how closely they match the search text (pages are then selected with
+    `offset` only).
+    """
+    if rank_by_relevance and cursor:
+        raise InvalidUserInput("cursor pagination is not supported when ranking transactions by relevance")
+    rank_by_relevance = rank_by_relevance and bool(description)
     settings = repository.get_user_account_settings(session, user_account_id)
 
-    params: dict[str, Any] = {"user_account_id": user_account_id, "limit": limit, "offset": offset}
+    params: dict[str, Any] = {"user_account_id": user_account_id}
 
     where_clauses = [
         "la.user_account_id = :user_account_id",
@@ -316,8 +477,8 @@ def get_transactions_report(
         params["spending_categories"] = tuple(spending_category)
         where_clauses.append("th.spending_category_primary IN :spending_categories")
     if description:
-        params["description_pattern"] = f"%{description}%"
-        where_clauses.append("LOWER(th.description) LIKE LOWER(:description_pattern)")
+        params["description_pattern"] = _to_search_pattern(description)
+        where_clauses.append(_build_search_clause("description_pattern"))
     if merchant_name:
         params["merchant_names"] = tuple(merchant_name)
         where_clauses.append("m.name IN :merchant_names")
@@ -342,22 +503,26 @@ def get_transactions_report(
           {merchant_join}
          WHERE {where}
     """
-    total_count = session.execute(text(count_query), params).scalar() or 0
+    total_count = _get_transactions_total_count(session, count_query, params, refresh=cursor is None and offset == 0)
+
+    page_params = {**params, "limit": limit + 1, "offset": offset}
+    if cursor:
+        page_params["cursor_date"], page_params["cursor_id"] = _decode_transactions_cursor(cursor)
+        where += " AND (th.transaction_date, th.id) < (:cursor_date, :cursor_id)"
+    order_by = "th.transaction_date DESC, th.id DESC"
+    if rank_by_relevance:
+        # best (pg_trgm) word similarity of the search text with the description, counterparty or merchant name
+        page_params["search_text"] = description
+        order_by = f"""GREATEST(word_similarity(:search_text, th.description),
+                                word_similarity(:search_text, th.counterparty),
+                                word_similarity(:search_text, m.name)) DESC,
+                       {order_by}"""
 
     query = f"""
         SELECT th.id,
                th.linked_account_id,
                la.account_name AS linked_account_name,
                th.sub_account_id,
-               COALESCE(
-                   (SELECT savhe.sub_account_description
-                      FROM finbot_sub_accounts_valuation_history_entries savhe
-                     WHERE savhe.linked_account_id = th.linked_account_id
-                       AND savhe.sub_account_id = th.sub_account_id
-                     ORDER BY savhe.history_entry_id DESC
-                     LIMIT 1),
-                   th.sub_account_id
-               ) AS sub_account_name,
                th.transaction_date,
                th.transaction_type,
                th.amount,
@@ -371,14 +536,6 @@ def get_transactions_report(
                th.counterparty,
                th.spending_category_primary,
                th.spending_category_detailed,
-               (SELECT CASE WHEN tm.outflow_transaction_id = th.id
-                       THEN tm.inflow_transaction_id
-                       ELSE tm.outflow_transaction_id END
-                  FROM finbot_transaction_matches tm
-                 WHERE (tm.outflow_transaction_id = th.id OR tm.inflow_transaction_id = th.id)
-                   AND tm.match_status != 'rejected'
-                 LIMIT 1
-               ) AS matched_transaction_id,
                th.merchant_id,
                m.name AS merchant_name,
                m.website_url AS merchant_website_url,
@@ -388,17 +545,42 @@ def get_transactions_report(
           LEFT JOIN finbot_merchants m ON th.merchant_id = m.id
           LEFT JOIN finbot_recurring_transaction_groups rg ON rg.id = th.recurring_group_id
          WHERE {where}
-         ORDER BY th.transaction_date DESC, th.id DESC
+         ORDER BY {order_by}
          LIMIT :limit OFFSET :offset
     """
 
-    rows = session.execute(text(query), params)
-    transactions = [schema.TransactionEntry(**row_to_dict(row)) for row in rows]
+    # one extra row is fetched to tell whether there is a next page
+    rows = [row_to_dict(row) for row in session.execute(text(query), page_params)]
+    has_next_page = len(rows) > limit
+    rows = rows[:limit]
+
+    sub_account_names: dict[tuple[int, str], str] = {}
+    matched_transaction_ids: dict[int, int] = {}
+    if rows:
+        transaction_ids = [row["id"] for row in rows]
+        sub_account_names = _get_sub_account_names(session, transaction_ids)
+        matched_transaction_ids = _get_matched_transaction_ids(session, transaction_ids)
+
+    transactions = [
+        schema.TransactionEntry(
+            **row,
+            sub_account_name=(
+                sub_account_names.get((row["linked_account_id"], row["sub_account_id"])) or row["sub_account_id"]
+            ),
+            matched_transaction_id=matched_transaction_ids.get(row["id"]),
+        )
+        for row in rows
+    ]
 
     return schema.TransactionsReport(
         valuation_ccy=settings.valuation_ccy,
         transactions=transactions,
         total_count=total_count,
+        next_cursor=(
+            encode_transactions_cursor(transactions[-1].transaction_date, transactions[-1].id)
+            if has_next_page and not rank_by_relevance
+            else None
+        ),
     )
 
 
@@ -563,39 +745,38 @@ def _build_filter_where(
     amount_min: float | None = None,
     amount_max: float | None = None,
     amount_sign: str | None = None,
-) -> tuple[list[str], bool]:
-    clauses: list[str] = []
-    needs_merchant_join = False
+) -> list[tuple[str, str | None]]:
+    """Filter clauses, each tagged with the facet it filters (None: applied to all facets)"""
+    clauses: list[tuple[str, str | None]] = []
     if from_time:
         params["f_from_time"] = from_time
-        clauses.append("th.transaction_date >= :f_from_time")
+        clauses.append(("th.transaction_date >= :f_from_time", None))
     if to_time:
         params["f_to_time"] = to_time
-        clauses.append("th.transaction_date <= :f_to_time")
+        clauses.append(("th.transaction_date <= :f_to_time", None))
     if linked_account_id:
         params["f_linked_account_ids"] = tuple(linked_account_id)
-        clauses.append("th.linked_account_id IN :f_linked_account_ids")
+        clauses.append(("th.linked_account_id IN :f_linked_account_ids", "account"))
     if spending_category:
         params["f_spending_categories"] = tuple(spending_category)
-        clauses.append("th.spending_category_primary IN :f_spending_categories")
+        clauses.append(("th.spending_category_primary IN :f_spending_categories", "category"))
     if description:
-        params["f_description_pattern"] = f"%{description}%"
-        clauses.append("LOWER(th.description) LIKE LOWER(:f_description_pattern)")
+        params["f_description_pattern"] = _to_search_pattern(description)
+        clauses.append((_build_search_clause("f_description_pattern"), None))
     if merchant_name:
         params["f_merchant_names"] = tuple(merchant_name)
-        clauses.append("m.name IN :f_merchant_names")
-        needs_merchant_join = True
+        clauses.append(("m.name IN :f_merchant_names", "merchant"))
     if amount_min is not None:
         params["f_amount_min"] = amount_min
-        clauses.append("ABS(th.amount) >= :f_amount_min")
+        clauses.append(("ABS(th.amount) >= :f_amount_min", "amount"))
     if amount_max is not None:
         params["f_amount_max"] = amount_max
-        clauses.append("ABS(th.amount) <= :f_amount_max")
+        clauses.append(("ABS(th.amount) <= :f_amount_max", "amount"))
     if amount_sign == "credit":
-        clauses.append("th.amount > 0")
+        clauses.append(("th.amount > 0", "amount"))
     elif amount_sign == "debit":
-        clauses.append("th.amount < 0")
-    return clauses, needs_merchant_join
+        clauses.append(("th.amount < 0", "amount"))
+    return clauses
 
 
 def get_transaction_filter_options(
@@ -612,7 +793,7 @@ def get_transaction_filter_options(
     amount_sign: str | None = None,
 ) -> schema.TransactionFilterOptions:
     params: dict[str, Any] = {"user_account_id": user_account_id}
-    filter_clauses, needs_merchant_join = _build_filter_where(
+    filter_clauses = _build_filter_where(
         params,
         from_time=from_time,
         to_time=to_time,
@@ -624,78 +805,98 @@ def get_transaction_filter_options(
         amount_max=amount_max,
         amount_sign=amount_sign,
     )
-    extra_where = (" AND " + " AND ".join(filter_clauses)) if filter_clauses else ""
-    merchant_join = "LEFT JOIN finbot_merchants m ON th.merchant_id = m.id" if needs_merchant_join else ""
-
-    # Accounts: all non-deleted, non-frozen accounts with filtered transaction counts
-    # Filter clauses go into a subquery so accounts with 0 matching transactions still appear
-    account_on_clauses = [c for c in filter_clauses if c != "th.linked_account_id IN :f_linked_account_ids"]
-    account_sub_where = " AND ".join(["TRUE"] + account_on_clauses)
-    account_query = f"""
-        SELECT la.id, la.account_name,
-               COUNT(ft.id) AS transaction_count
-          FROM finbot_linked_accounts la
-          LEFT JOIN (
-            SELECT th.id, th.linked_account_id
+    cache_key = tuple(sorted(params.items()))
+    with _FILTER_OPTIONS_CACHE_LOCK:
+        if (filter_options := _FILTER_OPTIONS_CACHE.get(cache_key)) is not None:
+            return filter_options
+
+    # Each facet counts the transactions matching all filters but its own: the
+    # filters shared by all facets restrict the scan, the facet filters are
+    # evaluated once per transaction and applied per facet (grouping set)
+    facet_matches = {facet: "TRUE" for facet in FILTER_FACETS}
+    common_clauses = []
+    for clause, facet in filter_clauses:
+        if facet is None:
+            common_clauses.append(clause)
+        elif facet in facet_matches:
+            facet_matches[facet] += f" AND {clause}"
+        else:
+            raise ValueError(f"unknown filter facet '{facet}' for clause: {clause}")
+    common_where = "".join(f" AND {clause}" for clause in common_clauses)
+    query = f"""
+        WITH ft AS MATERIALIZED (
+            SELECT th.linked_account_id,
+                   th.spending_category_primary,
+                   m.name AS merchant_name,
+                   th.amount,
+                   {facet_matches["account"]} AS account_match,
+                   {facet_matches["category"]} AS category_match,
+                   {facet_matches["merchant"]} AS merchant_match,
+                   {facet_matches["amount"]} AS amount_match
               FROM finbot_transactions_history th
-              {merchant_join}
-             WHERE {account_sub_where}
-          ) ft ON ft.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND NOT la.frozen
-         GROUP BY la.id, la.account_name
-         ORDER BY COUNT(ft.id) DESC, la.account_name
-    """
-    account_rows = session.execute(text(account_query), params)
-    accounts = [
-        schema.FilterOption(
-            label=row_to_dict(row)["account_name"],
-            value=str(row_to_dict(row)["id"]),
-            transaction_count=row_to_dict(row)["transaction_count"],
+              JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
+              LEFT JOIN finbot_merchants m ON th.merchant_id = m.id
+             WHERE la.user_account_id = :user_account_id
+               AND NOT la.deleted
+               {common_where}
         )
-        for row in account_rows
-    ]
-
-    # Merchants: only those with transactions in filtered set
-    merchant_count_query = f"""
-        SELECT m.name, COUNT(*) AS transaction_count
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-          JOIN finbot_merchants m ON th.merchant_id = m.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           {extra_where.replace("m.name IN :f_merchant_names", "TRUE")}
-         GROUP BY m.name
-         ORDER BY COUNT(*) DESC, m.name
+        SELECT GROUPING(ft.linked_account_id, ft.spending_category_primary, ft.merchant_name) AS grouping_id,
+               ft.linked_account_id,
+               ft.spending_category_primary,
+               ft.merchant_name,
+               COUNT(*) FILTER (WHERE ft.category_match AND ft.merchant_match AND ft.amount_match) AS account_count,
+               COUNT(*) FILTER (WHERE ft.account_match AND ft.merchant_match AND ft.amount_match) AS category_count,
+               COUNT(*) FILTER (WHERE ft.account_match AND ft.category_match AND ft.amount_match) AS merchant_count,
+               MAX(ABS(ft.amount)) FILTER (
+                   WHERE ft.account_match AND ft.category_match AND ft.merchant_match
+               ) AS amount_max,
+               COUNT(*) FILTER (
+                   WHERE ft.account_match AND ft.category_match AND ft.merchant_match AND ft.amount > 0
+               ) AS credit_count,
+               COUNT(*) FILTER (
+                   WHERE ft.account_match AND ft.category_match AND ft.merchant_match AND ft.amount < 0
+               ) AS debit_count
+          FROM ft
+         GROUP BY GROUPING SETS ((ft.linked_account_id), (ft.spending_category_primary), (ft.merchant_name), ())
     """
-    merchant_rows = session.execute(text(merchant_count_query), params)
+    account_counts: dict[int, int] = {}
+    category_counts: dict[str, int] = {}
+    merchant_counts: dict[str, int] = {}
+    fo_amount_min: float | None = None
+    fo_amount_max: float | None = None
+    credit_count = debit_count = 0
+    for row in session.execute(text(query), params):
+        if row.grouping_id == _GROUPED_BY_ACCOUNT:
+            account_counts[row.linked_account_id] = row.account_count
+        elif row.grouping_id == _GROUPED_BY_CATEGORY and row.spending_category_primary is not None:
+            category_counts[row.spending_category_primary] = row.category_count
+        elif row.grouping_id == _GROUPED_BY_MERCHANT and row.merchant_name is not None and row.merchant_count:
+            merchant_counts[row.merchant_name] = row.merchant_count
+        elif row.grouping_id == _GROUPED_BY_NOTHING:
+            if row.amount_max is not None:
+                fo_amount_min = 0.0
+                fo_amount_max = float(row.amount_max)
+            credit_count = row.credit_count
+            debit_count = row.debit_count
+
+    # Accounts: all non-deleted, non-frozen accounts, including those without matching transactions
+    accounts = sorted(
+        [
+            schema.FilterOption(
+                label=linked_account.account_name,
+                value=str(linked_account.id),
+                transaction_count=account_counts.get(linked_account.id, 0),
+            )
+            for linked_account in repository.find_linked_accounts(session, user_account_id)
+            if not linked_account.frozen
+        ],
+        key=lambda o: (-o.transaction_count, o.label),
+    )
     merchants = [
-        schema.FilterOption(
-            label=row_to_dict(row)["name"],
-            value=row_to_dict(row)["name"],
-            transaction_count=row_to_dict(row)["transaction_count"],
-        )
-        for row in merchant_rows
+        schema.FilterOption(label=name, value=name, transaction_count=transaction_count)
+        for name, transaction_count in sorted(merchant_counts.items(), key=lambda item: (-item[1], item[0]))
     ]
-
     # Categories: all known categories with filtered transaction counts
-    category_query = f"""
-        SELECT th.spending_category_primary AS category,
-               COUNT(*) AS transaction_count
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-          {merchant_join}
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.spending_category_primary IS NOT NULL
-           {extra_where.replace("th.spending_category_primary IN :f_spending_categories", "TRUE")}
-         GROUP BY th.spending_category_primary
-    """
-    category_rows = session.execute(text(category_query), params)
-    category_counts: dict[str, int] = {
-        row_to_dict(row)["category"]: row_to_dict(row)["transaction_count"] for row in category_rows
-    }
     categories = sorted(
         [
             schema.FilterOption(
@@ -708,45 +909,7 @@ def get_transaction_filter_options(
         key=lambda o: (-o.transaction_count, o.label),
     )
 
-    # Amount range (filtered, excluding amount filters themselves)
-    amount_extra = extra_where
-    for clause in (
-        "ABS(th.amount) >= :f_amount_min",
-        "ABS(th.amount) <= :f_amount_max",
-        "th.amount > 0",
-        "th.amount < 0",
-    ):
-        amount_extra = amount_extra.replace(clause, "TRUE")
-    amount_query = f"""
-        SELECT MAX(ABS(th.amount)) AS amount_max
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-          {merchant_join}
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           {amount_extra}
-    """
-    amount_row = session.execute(text(amount_query), params).fetchone()
-    fo_amount_min = 0.0 if amount_row and amount_row[0] is not None else None
-    fo_amount_max = float(amount_row[0]) if amount_row and amount_row[0] is not None else None
-
-    # Credit/debit counts (excluding sign filter itself)
-    sign_query = f"""
-        SELECT
-            COUNT(*) FILTER (WHERE th.amount > 0) AS credit_count,
-            COUNT(*) FILTER (WHERE th.amount < 0) AS debit_count
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-          {merchant_join}
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           {amount_extra}
-    """
-    sign_row = session.execute(text(sign_query), params).fetchone()
-    credit_count = sign_row[0] if sign_row else 0
-    debit_count = sign_row[1] if sign_row else 0
-
-    return schema.TransactionFilterOptions(
+    filter_options = schema.TransactionFilterOptions(
         accounts=accounts,
         merchants=merchants,
         categories=categories,
@@ -755,6 +918,9 @@ def get_transaction_filter_options(
         credit_count=credit_count,
         debit_count=debit_count,
     )
+    with _FILTER_OPTIONS_CACHE_LOCK:
+        _FILTER_OPTIONS_CACHE[cache_key] = filter_options
+    return filter_options
 
 
 def get_cash_flow_summary(
@@ -765,22 +931,13 @@ def get_cash_flow_summary(
 ) -> schema.CashFlowSummary:
     settings = repository.get_user_account_settings(session, user_account_id)
 
-    query = """
-        SELECT th.transaction_type,
-               COALESCE(SUM(th.amount_snapshot_ccy), 0) AS total
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.transaction_date >= :from_time
-           AND th.transaction_date <= :to_time
-           AND th.id NOT IN (
-               SELECT tm.outflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-               UNION ALL
-               SELECT tm.inflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-           )
-         GROUP BY th.transaction_type
-         ORDER BY th.transaction_type
+    query = f"""
+        SELECT c.transaction_type,
+               COALESCE(SUM(c.inflows + c.outflows), 0) AS total
+          FROM ({_CASH_FLOW_ROWS_QUERY}) c
+         WHERE NOT c.is_internal_transfer
+         GROUP BY c.transaction_type
+         ORDER BY c.transaction_type
     """
     rows = session.execute(
         text(query),
@@ -815,10 +972,10 @@ def get_cash_flow_time_series(
     settings = repository.get_user_account_settings(session, user_account_id)
 
     grouping = {
-        "daily": "th.transaction_date::date::text",
-        "weekly": "to_char(th.transaction_date, 'IYYY') || '-W' || to_char(th.transaction_date, 'IW')",
-        "monthly": "to_char(th.transaction_date, 'YYYY-MM')",
-    }.get(frequency, "to_char(th.transaction_date, 'YYYY-MM')")
+        "daily": "{date}::date::text",
+        "weekly": "to_char({date}, 'IYYY') || '-W' || to_char({date}, 'IW')",
+        "monthly": "to_char({date}, 'YYYY-MM')",
+    }.get(frequency, "to_char({date}, 'YYYY-MM')")
 
     params: dict[str, Any] = {
         "user_account_id": user_account_id,
@@ -826,51 +983,57 @@ def get_cash_flow_time_series(
         "to_time": to_time,
     }
 
-    extra_where = ""
-    if linked_account_id is not None:
-        params["linked_account_id"] = linked_account_id
-        extra_where = "AND th.linked_account_id = :linked_account_id"
-        match_exclusion = """
-           AND th.id NOT IN (
-               SELECT tm.outflow_transaction_id
-                 FROM finbot_transaction_matches tm
-                 JOIN finbot_transactions_history counterpart ON counterpart.id = tm.inflow_transaction_id
-                WHERE tm.match_status != 'rejected'
-                  AND counterpart.linked_account_id = :linked_account_id
-               UNION ALL
-               SELECT tm.inflow_transaction_id
-                 FROM finbot_transaction_matches tm
-                 JOIN finbot_transactions_history counterpart ON counterpart.id = tm.outflow_transaction_id
-                WHERE tm.match_status != 'rejected'
-                  AND counterpart.linked_account_id = :linked_account_id
-           )"""
+    if linked_account_id is None:
+        period = grouping.format(date="c.day")
+        query = f"""
+            SELECT {period} AS period,
+                   COALESCE(SUM(c.inflows), 0) AS inflows,
+                   COALESCE(SUM(c.outflows), 0) AS outflows,
+                   COALESCE(SUM(c.inflows + c.outflows), 0) AS net
+              FROM ({_CASH_FLOW_ROWS_QUERY}) c
+             WHERE NOT c.is_internal_transfer
+             GROUP BY {period}
+             ORDER BY {period}
+        """
     else:
-        match_exclusion = """
-           AND th.id NOT IN (
-               SELECT tm.outflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-               UNION ALL
-               SELECT tm.inflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-           )"""
-
-    query = f"""
-        SELECT {grouping} AS period,
-               COALESCE(SUM(CASE WHEN th.amount_snapshot_ccy > 0 THEN th.amount_snapshot_ccy ELSE 0 END), 0) AS inflows,
-               COALESCE(
-                   SUM(CASE WHEN th.amount_snapshot_ccy < 0 THEN th.amount_snapshot_ccy ELSE 0 END),
-                   0
-               ) AS outflows,
-               COALESCE(SUM(th.amount_snapshot_ccy), 0) AS net
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.transaction_date >= :from_time
-           AND th.transaction_date <= :to_time
-           {match_exclusion}
-           {extra_where}
-         GROUP BY {grouping}
-         ORDER BY {grouping}
-    """
+        # only transfers between sub-accounts of this linked account are internal to it,
+        # which the daily aggregates cannot tell: aggregated from the transactions history
+        params["linked_account_id"] = linked_account_id
+        period = grouping.format(date="th.transaction_date")
+        query = f"""
+            SELECT {period} AS period,
+                   COALESCE(
+                       SUM(CASE WHEN th.amount_snapshot_ccy > 0 THEN th.amount_snapshot_ccy ELSE 0 END),
+                       0
+                   ) AS inflows,
+                   COALESCE(
+                       SUM(CASE WHEN th.amount_snapshot_ccy < 0 THEN th.amount_snapshot_ccy ELSE 0 END),
+                       0
+                   ) AS outflows,
+                   COALESCE(SUM(th.amount_snapshot_ccy), 0) AS net
+              FROM finbot_transactions_history th
+              JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
+             WHERE la.user_account_id = :user_account_id
+               AND NOT la.deleted
+               AND th.transaction_date >= :from_time
+               AND th.transaction_date <= :to_time
+               AND th.linked_account_id = :linked_account_id
+               AND NOT (
+                   th.is_internal_transfer
+                   AND EXISTS (
+                       SELECT 1
+                         FROM finbot_transaction_matches tm
+                         JOIN finbot_transactions_history counterpart
+                           ON counterpart.id IN (tm.outflow_transaction_id, tm.inflow_transaction_id)
+                          AND counterpart.id != th.id
+                        WHERE th.id IN (tm.outflow_transaction_id, tm.inflow_transaction_id)
+                          AND tm.match_status != 'rejected'
+                          AND counterpart.linked_account_id = :linked_account_id
+                   )
+               )
+             GROUP BY {period}
+             ORDER BY {period}
+        """
     rows = session.execute(text(query), params)
 
     entries = [
@@ -897,19 +1060,14 @@ def get_spending_breakdown(
 ) -> schema.SpendingBreakdown:
     settings = repository.get_user_account_settings(session, user_account_id)
 
-    query = """
-        SELECT th.spending_category_primary AS category,
-               COALESCE(SUM(ABS(th.amount_snapshot_ccy)), 0) AS total,
-               COUNT(*) AS transaction_count
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.transaction_date >= :from_time
-           AND th.transaction_date <= :to_time
-           AND th.spending_category_primary IS NOT NULL
-           AND th.transaction_type IN ('expense', 'other', 'payment')
-         GROUP BY th.spending_category_primary
+    query = f"""
+        SELECT c.spending_category_primary AS category,
+               COALESCE(SUM(c.inflows - c.outflows), 0) AS total,
+               SUM(c.transaction_count) AS transaction_count
+          FROM ({_CASH_FLOW_ROWS_QUERY}) c
+         WHERE c.spending_category_primary IS NOT NULL
+           AND c.transaction_type IN ('expense', 'other', 'payment')
+         GROUP BY c.spending_category_primary
          ORDER BY total DESC
     """
     rows = session.execute(
@@ -954,21 +1112,12 @@ def _aggregate_by_type(
     from_time: datetime,
     to_time: datetime,
 ) -> dict[str, float]:
-    query = """
-        SELECT th.transaction_type,
-               COALESCE(SUM(th.amount_snapshot_ccy), 0) AS total
-          FROM finbot_transactions_history th
-          JOIN finbot_linked_accounts la ON th.linked_account_id = la.id
-         WHERE la.user_account_id = :user_account_id
-           AND NOT la.deleted
-           AND th.transaction_date >= :from_time
-           AND th.transaction_date <= :to_time
-           AND th.id NOT IN (
-               SELECT tm.outflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-               UNION ALL
-               SELECT tm.inflow_transaction_id FROM finbot_transaction_matches tm WHERE tm.match_status != 'rejected'
-           )
-         GROUP BY th.transaction_type
+    query = f"""
+        SELECT c.transaction_type,
+               COALESCE(SUM(c.inflows + c.outflows), 0) AS total
+          FROM ({_CASH_FLOW_ROWS_QUERY}) c
+         WHERE NOT c.is_internal_transfer
+         GROUP BY c.transaction_type
     """
     rows = session.execute(
         text(query),
@@ -95,6 +95,7 @@ class TransactionsReport(BaseModel):
     valuation_ccy: str
     transactions: list[TransactionEntry]
     total_count: int
+    next_cursor: str | None = None
 
 
 class CashFlowCategoryEntry(BaseModel):
@@ -97,6 +97,8 @@ def get_transactions_report(
     amount_sign: str | None = Query(default=None),
     limit: int = Query(default=100, le=500),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
+    rank_by_relevance: bool = Query(default=False),
 ) -> appwsrv_schema.GetTransactionsReportResponse:
     """Get paginated transactions report"""
     return appwsrv_schema.GetTransactionsReportResponse(
@@ -115,6 +117,8 @@ def get_transactions_report(
             amount_sign=amount_sign,
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            rank_by_relevance=rank_by_relevance,
         )
     )
 
@@ -11,6 +11,7 @@ from temporalio.client import (
 )
 
 from finbot.core.temporal_ import GENERIC_TASK_QUEUE, TRY_ONCE, temporal_workflow_id
+from finbot.workflows.fetch_financial_data.workflows import DeleteExpiredFinancialDataWorkflow
 from finbot.workflows.user_account_valuation.workflows import RunValuationForAllUsers
 
 
@@ -71,4 +72,29 @@ def get_static_schedules() -> list[Schedule]:
         )
         for entry in VALUATION_SCHEDULE
     ]
+    all_schedules.append(
+        Schedule(
+            id="delete_expired_financial_data",
+            temporal_schedule=TemporalSchedule(
+                action=ScheduleActionStartWorkflow(
+                    DeleteExpiredFinancialDataWorkflow.run,
+                    task_queue=GENERIC_TASK_QUEUE,
+                    retry_policy=TRY_ONCE,
+                    id=temporal_workflow_id(),
+                ),
+                spec=ScheduleSpec(
+                    calendars=[
+                        ScheduleCalendarSpec(
+                            hour=(ScheduleRange(3),),
+                            minute=(ScheduleRange(0),),
+                        )
+                    ],
+                    time_zone_name="Europe/Paris",
+                ),
+                policy=SchedulePolicy(
+                    catchup_window=timedelta(hours=1),
+                ),
+            ),
+        )
+    )
     return all_schedules
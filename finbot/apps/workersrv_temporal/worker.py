@@ -11,11 +11,21 @@ from finbot.apps.workersrv_temporal.static_schedules import get_static_schedules
 from finbot.core.environment import get_desired_log_level
 from finbot.core.logging import configure_logging
 from finbot.core.temporal_ import GENERIC_TASK_QUEUE, TRY_ONCE, get_temporal_client
-from finbot.workflows.fetch_financial_data.activities import get_financial_data, validate_credentials
-from finbot.workflows.fetch_financial_data.workflows import GetFinancialDataWorkflow, ValidateCredentialsWorkflow
+from finbot.workflows.fetch_financial_data.activities import (
+    delete_expired_financial_data,
+    get_financial_data,
+    get_financial_data_claim_check,
+    validate_credentials,
+)
+from finbot.workflows.fetch_financial_data.workflows import (
+    DeleteExpiredFinancialDataWorkflow,
+    GetFinancialDataWorkflow,
+    ValidateCredentialsWorkflow,
+)
 from finbot.workflows.user_account_snapshot.activities import (
     build_and_persist_final_snapshot,
     create_empty_snapshot,
+    delete_stored_snapshot_data,
     prepare_raw_snapshot_requests,
 )
 from finbot.workflows.user_account_snapshot.workflows import (
@@ -28,8 +38,18 @@ from finbot.workflows.user_account_valuation.activities import (
     send_valuation_notification,
 )
 from finbot.workflows.user_account_valuation.workflows import RunValuationForAllUsers, UserAccountValuationWorkflow
-from finbot.workflows.write_valuation_history.activities import write_history
-from finbot.workflows.write_valuation_history.workflows import WriteValuationHistoryWorkflow
+from finbot.workflows.write_valuation_history.activities import (
+    categorize_transactions,
+    consolidate_transactions,
+    detect_recurring_transactions,
+    enrich_merchants,
+    match_transactions,
+    write_history,
+)
+from finbot.workflows.write_valuation_history.workflows import (
+    PostProcessTransactionsWorkflow,
+    WriteValuationHistoryWorkflow,
+)
 
 DEFAULT_WORKER_THREADS = 4
 STATIC_SCHEDULE_PREFIX = "static_schedule"
@@ -83,8 +103,10 @@ async def worker_main() -> None:
             # workflows.fetch_financial_data
             ValidateCredentialsWorkflow,
             GetFinancialDataWorkflow,
+            DeleteExpiredFinancialDataWorkflow,
             # workflows.write_valuation_history
             WriteValuationHistoryWorkflow,
+            PostProcessTransactionsWorkflow,
             # workflows.user_account_snapshot
             TakeUserAccountSnapshotWorkflow,
             TakeUserAccountRawSnapshotWorkflow,
@@ -98,12 +120,20 @@ async def worker_main() -> None:
             # workflows.fetch_financial_data
             validate_credentials,
             get_financial_data,
+            get_financial_data_claim_check,
+            delete_expired_financial_data,
             # workflows.write_valuation_history
             write_history,
+            consolidate_transactions,
+            enrich_merchants,
+            categorize_transactions,
+            match_transactions,
+            detect_recurring_transactions,
             # workflows.user_account_snapshot
             create_empty_snapshot,
             prepare_raw_snapshot_requests,
             build_and_persist_final_snapshot,
+            delete_stored_snapshot_data,
             # workflows.user_account_valuation
             send_error_notifications,
             send_valuation_notification,
@@ -0,0 +1,125 @@
+import time
+import uuid
+from datetime import timedelta
+from functools import cache
+from pathlib import Path
+from typing import Any, Generator, Iterable, Protocol, cast
+
+from sqlalchemy.sql import text
+
+from finbot.core import environment
+from finbot.model import LargeObjectBlob, ScopedSession
+from finbot.model.base import SingletonEngine
+
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore(Protocol):
+    def put(self, chunks: Iterable[bytes]) -> str:
+        """Store a blob, return its key"""
+        ...
+
+    def iter_chunks(self, key: str) -> Generator[bytes, None, None]: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def delete_older_than(self, max_age: timedelta) -> int:
+        """Delete the blobs stored more than `max_age` ago, return their count"""
+        ...
+
+
+class FilesystemBlobStore(BlobStore):
+    def __init__(self, root_dir: Path):
+        self._root_dir = root_dir
+
+    def put(self, chunks: Iterable[bytes]) -> str:
+        self._root_dir.mkdir(parents=True, exist_ok=True)
+        key = uuid.uuid4().hex
+        partial_path = self._root_dir / f"{key}.partial"
+        with partial_path.open("wb") as blob_file:
+            for chunk in chunks:
+                blob_file.write(chunk)
+        partial_path.rename(self._root_dir / key)
+        return key
+
+    def iter_chunks(self, key: str) -> Generator[bytes, None, None]:
+        with (self._root_dir / key).open("rb") as blob_file:
+            while chunk := blob_file.read(BLOB_CHUNK_SIZE):
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        (self._root_dir / key).unlink(missing_ok=True)
+
+    def delete_older_than(self, max_age: timedelta) -> int:
+        if not self._root_dir.exists():
+            return 0
+        expiry = time.time() - max_age.total_seconds()
+        deleted_count = 0
+        for blob_path in self._root_dir.iterdir():
+            if blob_path.stat().st_mtime < expiry:
+                blob_path.unlink(missing_ok=True)
+                deleted_count += 1
+        return deleted_count
+
+
+class PostgresLargeObjectBlobStore(BlobStore):
+    """Blobs are stored as Postgres large objects (key is the large object oid),
+    so they are shared by all workers connected to the database.
+    """
+
+    def put(self, chunks: Iterable[bytes]) -> str:
+        with ScopedSession() as session:
+            large_object = self._get_dbapi_connection(session).lobject(0, "wb")
+            for chunk in chunks:
+                large_object.write(chunk)
+            large_object.close()
+            session.add(LargeObjectBlob(oid=large_object.oid))
+            session.commit()
+            return str(large_object.oid)
+
+    def iter_chunks(self, key: str) -> Generator[bytes, None, None]:
+        # read through a dedicated pool connection: the scoped session is bound to the
+        # caller context, which may change (or close it) while this generator is suspended
+        connection = SingletonEngine.get_instance().raw_connection()
+        try:
+            large_object = connection.dbapi_connection.lobject(int(key), "rb")
+            while chunk := large_object.read(BLOB_CHUNK_SIZE):
+                yield chunk
+            large_object.close()
+            connection.commit()
+        finally:
+            connection.close()
+
+    def delete(self, key: str) -> None:
+        with ScopedSession() as session:
+            self._get_dbapi_connection(session).lobject(int(key)).unlink()
+            session.query(LargeObjectBlob).filter_by(oid=int(key)).delete()
+            session.commit()
+
+    def delete_older_than(self, max_age: timedelta) -> int:
+        query = """
+            WITH expired AS (
+                DELETE FROM finbot_large_object_blobs
+                 WHERE created_at < now() - :max_age
+             RETURNING oid
+            )
+            SELECT lo_unlink(lo.oid)
+              FROM pg_largeobject_metadata lo
+              JOIN expired ON lo.oid = expired.oid::oid
+        """
+        with ScopedSession() as session:
+            deleted_count = len(session.execute(text(query), {"max_age": max_age}).all())
+            session.commit()
+            return deleted_count
+
+    @staticmethod
+    def _get_dbapi_connection(session: Any) -> Any:
+        return cast(Any, session.connection().connection).dbapi_connection
+
+
+@cache
+def get_blob_store() -> BlobStore:
+    blob_store_dir = environment.get_blob_store_dir()
+    if blob_store_dir:
+        return FilesystemBlobStore(Path(blob_store_dir))
+    return PostgresLargeObjectBlobStore()
@@ -1,9 +1,17 @@
+import threading
+
 from cachetools import TTLCache, cached
 from pycoingecko import CoinGeckoAPI
 
 from finbot.core.async_ import aexec
 from finbot.core.errors import FinbotError
 
+# same lifetime as the single spot cache (`get_spot_cached`)
+SPOTS_TTL = 3600
+
+_SPOTS_CACHE: TTLCache[tuple[str, str], float] = TTLCache(maxsize=10_000, ttl=SPOTS_TTL)
+_SPOTS_CACHE_LOCK = threading.Lock()
+
 
 class Error(FinbotError):
     pass
@@ -17,7 +25,7 @@ class CryptoMarket(object):
     def _get_coin_id(self, symbol: str) -> str:
         return self._symbols_to_id[symbol.lower()]
 
-    @cached(TTLCache(maxsize=10_000, ttl=3600))
+    @cached(TTLCache(maxsize=10_000, ttl=SPOTS_TTL))
     def get_spot_cached(self, source_crypto_ccy: str, target_ccy: str) -> float:
         return self.get_spot(source_crypto_ccy, target_ccy)
 
@@ -34,3 +42,28 @@ class CryptoMarket(object):
 
     async def async_get_spot(self, source_crypto_ccy: str, target_ccy: str) -> float:
         return await aexec(self.get_spot, source_crypto_ccy, target_ccy)
+
+    def get_spots(self, source_crypto_ccys: list[str], target_ccy: str) -> dict[str, float]:
+        """Spot prices for several crypto currencies, with a single upstream call.
+        Prices are shared across `CryptoMarket` instances for `SPOTS_TTL` seconds.
+        """
+        target_ccy = target_ccy.lower()
+        with _SPOTS_CACHE_LOCK:
+            spots = {
+                symbol: _SPOTS_CACHE[(symbol, target_ccy)]
+                for symbol in source_crypto_ccys
+                if (symbol, target_ccy) in _SPOTS_CACHE
+            }
+        coin_ids = {symbol: self._get_coin_id(symbol) for symbol in source_crypto_ccys if symbol not in spots}
+        if coin_ids:
+            result = self._api.get_price(sorted(set(coin_ids.values())), target_ccy)
+            for symbol, coin_id in coin_ids.items():
+                if coin_id not in result:
+                    raise Error(f"no spot for {symbol} ({coin_id})")
+                spots[symbol] = float(result[coin_id][target_ccy])
+            with _SPOTS_CACHE_LOCK:
+                _SPOTS_CACHE.update({(symbol, target_ccy): spots[symbol] for symbol in coin_ids})
+        return spots
+
+    async def async_get_spots(self, source_crypto_ccys: list[str], target_ccy: str) -> dict[str, float]:
+        return await aexec(self.get_spots, source_crypto_ccys, target_ccy)
@@ -1,20 +1,33 @@
 import logging
 import threading
 from dataclasses import dataclass
-from typing import Optional, TypeAlias, cast
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Protocol, TypeAlias, cast
 
 import requests
-from cachetools import TTLCache, cached
 
 from finbot.core.async_ import aexec
 from finbot.core.environment import get_freecurrencyapi_key
 from finbot.core.errors import FinbotError
+from finbot.core.kv_store import DBKVStore, KVEntity
+from finbot.core.utils import now_utc
 
 logger = logging.getLogger(__name__)
 
 
 CurrencyType: TypeAlias = str
 
+# All rates are fetched against a single base currency, any other pair is
+# derived by triangulation through that base.
+FX_RATES_BASE_CCY = "USD"
+
+# Rates younger than FX_RATES_FRESH_FOR are served as is, rates younger than
+# FX_RATES_STALE_FOR are served while being refreshed in the background.
+FX_RATES_FRESH_FOR = timedelta(hours=1)
+FX_RATES_STALE_FOR = timedelta(days=1)
+
+_HTTP_SESSION = requests.Session()
+
 
 @dataclass(frozen=True, eq=True)
 class Xccy(object):
@@ -32,26 +45,189 @@ class Error(FinbotError):
     pass
 
 
-@cached(TTLCache(maxsize=1000, ttl=3600.0), lock=threading.Lock())
-def _get_rates_for_base(base_ccy: CurrencyType) -> dict[CurrencyType, float]:
+class FxRatesTable(KVEntity):
+    key = "Finbot.FxMarket.Rates"
+
+    def __init__(
+        self,
+        base_ccy: CurrencyType,
+        rates: dict[CurrencyType, float],
+        fetched_at: datetime,
+    ):
+        self.base_ccy = base_ccy
+        self.rates = rates
+        self.fetched_at = fetched_at
+
+    def age(self) -> timedelta:
+        return now_utc() - self.fetched_at
+
+    def get_rate(self, pair: Xccy) -> Optional[float]:
+        """Value of one unit of the domestic currency, expressed in the foreign currency"""
+        if pair.foreign == pair.domestic:
+            return 1.0
+        domestic_rate = self._get_base_rate(pair.domestic)
+        foreign_rate = self._get_base_rate(pair.foreign)
+        if not domestic_rate or not foreign_rate:
+            return None
+        return foreign_rate / domestic_rate
+
+    def _get_base_rate(self, ccy: CurrencyType) -> Optional[float]:
+        if ccy == self.base_ccy:
+            return 1.0
+        return self.rates.get(ccy)
+
+    def serialize(self) -> Any:
+        return {
+            "base_ccy": self.base_ccy,
+            "rates": self.rates,
+            "fetched_at": self.fetched_at.isoformat(),
+        }
+
+    @staticmethod
+    def deserialize(data: Any) -> "FxRatesTable":
+        return FxRatesTable(
+            base_ccy=data["base_ccy"],
+            rates=data["rates"],
+            fetched_at=datetime.fromisoformat(data["fetched_at"]),
+        )
+
+
+class FxRatesStore(Protocol):
+    def load(self) -> Optional[FxRatesTable]: ...
+
+    def save(self, table: FxRatesTable) -> None: ...
+
+
+class DBFxRatesStore(FxRatesStore):
+    """Rates shared by all finbot processes through the generic key-value store"""
+
+    def load(self) -> Optional[FxRatesTable]:
+        from finbot.model import ScopedSession
+
+        with ScopedSession() as session:
+            return DBKVStore(session).get_entity(FxRatesTable)
+
+    def save(self, table: FxRatesTable) -> None:
+        from finbot.model import ScopedSession
+
+        with ScopedSession() as session:
+            DBKVStore(session).set_entity(table)
+
+
+def _fetch_rates_table(base_ccy: CurrencyType = FX_RATES_BASE_CCY) -> FxRatesTable:
     api_key = get_freecurrencyapi_key()
-    response = requests.get(f"https://api.freecurrencyapi.com/v1/latest?apikey={api_key}&base_currency={base_ccy}")
+    response = _HTTP_SESSION.get(
+        "https://api.freecurrencyapi.com/v1/latest",
+        params={"apikey": api_key, "base_currency": base_ccy},
+        timeout=30.0,
+    )
     response.raise_for_status()
-    data = cast(dict[CurrencyType, float], response.json()["data"])
-    return data
+    return FxRatesTable(
+        base_ccy=base_ccy,
+        rates=cast(dict[CurrencyType, float], response.json()["data"]),
+        fetched_at=now_utc(),
+    )
+
+
+class FxRatesProvider(object):
+    """Stale-while-revalidate access to the FX rates table.
+
+    The table is kept in memory and in a persistent store shared across
+    processes, so worker restarts don't need a fresh upstream call. Callers only
+    block on the upstream API when no usable (i.e. not expired) table exists.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], FxRatesTable] = _fetch_rates_table,
+        store: FxRatesStore | None = None,
+        fresh_for: timedelta = FX_RATES_FRESH_FOR,
+        stale_for: timedelta = FX_RATES_STALE_FOR,
+    ):
+        self._fetch = fetch
+        self._store = store
+        self._fresh_for = fresh_for
+        self._stale_for = stale_for
+        self._table: FxRatesTable | None = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._revalidation: threading.Thread | None = None
+
+    def get_table(self) -> FxRatesTable:
+        table = self._get_known_table()
+        if table is not None and self._is_fresh(table):
+            return table
+        if table is not None and table.age() <= self._stale_for:
+            self._revalidate_in_background()
+            return table
+        return self._refresh()
+
+    def _is_fresh(self, table: FxRatesTable) -> bool:
+        return table.age() <= self._fresh_for
+
+    def _get_known_table(self) -> FxRatesTable | None:
+        with self._lock:
+            table = self._table
+        if table is not None and self._is_fresh(table):
+            return table
+        persisted = self._load_persisted()
+        if persisted is not None and (table is None or persisted.fetched_at > table.fetched_at):
+            with self._lock:
+                self._table = table = persisted
+        return table
+
+    def _refresh(self) -> FxRatesTable:
+        with self._refresh_lock:
+            with self._lock:
+                table = self._table
+            if table is not None and self._is_fresh(table):
+                return table
+            logger.info("fetching fx rates table")
+            table = self._fetch()
+            with self._lock:
+                self._table = table
+            self._save_persisted(table)
+            return table
+
+    def _revalidate_in_background(self) -> None:
+        with self._lock:
+            if self._revalidation is not None and self._revalidation.is_alive():
+                return
+            self._revalidation = threading.Thread(target=self._refresh_quietly, daemon=True)
+            self._revalidation.start()
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("failed to refresh fx rates table (stale rates still served)")
+
+    def _load_persisted(self) -> FxRatesTable | None:
+        if self._store is None:
+            return None
+        try:
+            return self._store.load()
+        except Exception:
+            logger.warning("failed to load persisted fx rates table", exc_info=True)
+            return None
+
+    def _save_persisted(self, table: FxRatesTable) -> None:
+        if self._store is None:
+            return
+        try:
+            self._store.save(table)
+        except Exception:
+            logger.warning("failed to persist fx rates table", exc_info=True)
+
+
+_FX_RATES = FxRatesProvider(store=DBFxRatesStore())
 
 
 def get_rates(pairs: set[Xccy]) -> dict[Xccy, Optional[float]]:
-    result: dict[Xccy, Optional[float]] = {}
-    for pair in pairs:
-        if pair.foreign == pair.domestic:
-            result[pair] = 1.0
-        else:
-            rates = _get_rates_for_base(base_ccy=pair.foreign)
-            rate = rates.get(pair.domestic)
-            rate = 1.0 / rate if rate else None
-            result[pair] = rate
-    return result
+    if all(pair.foreign == pair.domestic for pair in pairs):
+        return {pair: 1.0 for pair in pairs}
+    table = _FX_RATES.get_table()
+    return {pair: table.get_rate(pair) for pair in pairs}
 
 
 async def async_get_rates(pairs: set[Xccy]) -> dict[Xccy, Optional[float]]:
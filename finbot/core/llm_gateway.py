@@ -0,0 +1,373 @@
+"""Process-wide gateway to the LLM provider.
+
+All LLM calls (background enrichment, categorization, matching, interactive
+chat) go through a single gateway which owns the provider client, and thus its
+connection pool. The gateway runs its own event loop (in a daemon thread), so
+that callers driven by different event loops (`asyncio.run()` from synchronous
+code, the web server loop) share:
+
+- a token bucket rate limiter, also bounding the number of requests in flight,
+  which serves waiting requests by priority (interactive chat first);
+- coalescing of identical in-flight structured output requests;
+- per-caller latency / token usage metrics.
+"""
+
+import asyncio
+import dataclasses
+import enum
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, AsyncIterator, Callable, Coroutine, Generic, Optional, Protocol, TypeVar
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam, ChatCompletionToolParam
+from pydantic import BaseModel
+
+from finbot.core.environment import get_openai_api_key
+
+logger = logging.getLogger(__name__)
+
+REQUESTS_PER_SECOND = 5.0
+REQUESTS_BURST = 10
+MAX_CONCURRENT_REQUESTS = 8
+
+T = TypeVar("T", bound=BaseModel)
+R = TypeVar("R")
+
+
+class Priority(enum.IntEnum):
+    Interactive = 0
+    Background = 1
+
+
+@dataclass(frozen=True)
+class LLMUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass(frozen=True)
+class ParseResult(Generic[T]):
+    parsed: Optional[T]
+    usage: LLMUsage
+
+
+class LLMBackend(Protocol):
+    async def parse(self, model: str, prompt: str, text_format: type[T]) -> ParseResult[T]: ...
+
+    def stream_chat(
+        self,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+    ) -> AsyncIterator[ChatCompletionChunk]: ...
+
+
+class OpenAIBackend(LLMBackend):
+    def __init__(self, api_key: str):
+        self._api_key = api_key
+        self._client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # created lazily, from the gateway event loop which then owns its connection pool
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
+    async def parse(self, model: str, prompt: str, text_format: type[T]) -> ParseResult[T]:
+        response = await self.client.responses.parse(
+            model=model,
+            input=[{"role": "user", "content": prompt}],
+            text_format=text_format,
+        )
+        usage = response.usage
+        return ParseResult(
+            parsed=response.output_parsed,
+            usage=LLMUsage(
+                input_tokens=usage.input_tokens if usage else 0,
+                output_tokens=usage.output_tokens if usage else 0,
+            ),
+        )
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=tools,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            yield chunk
+
+
+class FakeLLMBackend(LLMBackend):
+    """Backend answering from canned handlers, records the requests it receives (for tests)"""
+
+    def __init__(
+        self,
+        parse_handler: Optional[Callable[[str, type[BaseModel]], Optional[BaseModel]]] = None,
+        chat_chunks: Optional[list[ChatCompletionChunk]] = None,
+        latency: float = 0.0,
+    ):
+        self.parse_handler = parse_handler
+        self.chat_chunks = chat_chunks or []
+        self.latency = latency
+        self.requests: list[tuple[str, str]] = []  # (model, prompt)
+
+    async def parse(self, model: str, prompt: str, text_format: type[T]) -> ParseResult[T]:
+        self.requests.append((model, prompt))
+        await asyncio.sleep(self.latency)
+        parsed = self.parse_handler(prompt, text_format) if self.parse_handler else None
+        assert parsed is None or isinstance(parsed, text_format)
+        return ParseResult(parsed=parsed, usage=LLMUsage(input_tokens=len(prompt.split()), output_tokens=1))
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        self.requests.append((model, json.dumps(messages, default=str)))
+        for chunk in self.chat_chunks:
+            await asyncio.sleep(self.latency)
+            yield chunk
+
+
+class PriorityRateLimiter(object):
+    """Token bucket (refilled at `rate` requests per second, up to `burst`)
+    combined with a bound on the number of requests in flight. Waiting requests
+    are served by priority, then in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int):
+        self._rate = rate
+        self._burst = burst
+        self._max_concurrency = max_concurrency
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, priority: Priority) -> None:
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # granted, but the caller is gone
+            raise
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        now = time.monotonic()
+        self._tokens = min(float(self._burst), self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+        while self._waiters and self._in_flight < self._max_concurrency:
+            if self._tokens < 1.0:
+                self._dispatcher = asyncio.get_running_loop().call_later(
+                    (1.0 - self._tokens) / self._rate, self._dispatch
+                )
+                return
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled():
+                continue
+            self._tokens -= 1.0
+            self._in_flight += 1
+            waiter.set_result(None)
+
+
+@dataclass
+class CallerStats:
+    requests: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    latency: float = 0.0  # cumulated, seconds
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMGateway(object):
+    def __init__(
+        self,
+        backend: LLMBackend,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        burst: int = REQUESTS_BURST,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    ):
+        self.backend = backend
+        self._limiter = PriorityRateLimiter(requests_per_second, burst, max_concurrency)
+        self._in_flight_parses: dict[str, asyncio.Future[ParseResult[Any]]] = {}
+        self._stats: dict[str, CallerStats] = defaultdict(CallerStats)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    async def parse(
+        self,
+        caller: str,
+        model: str,
+        prompt: str,
+        text_format: type[T],
+        priority: Priority = Priority.Background,
+    ) -> Optional[T]:
+        """Structured output request, identical concurrent requests are only sent once"""
+        result: ParseResult[T] = await self._run(self._parse(caller, model, prompt, text_format, priority))
+        return result.parsed
+
+    async def stream_chat(
+        self,
+        caller: str,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+        priority: Priority = Priority.Interactive,
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        caller_loop = asyncio.get_running_loop()
+        events: asyncio.Queue[tuple[str, Any]] = asyncio.Queue()
+
+        def emit(kind: str, value: Any) -> None:
+            caller_loop.call_soon_threadsafe(events.put_nowait, (kind, value))
+
+        streaming = asyncio.run_coroutine_threadsafe(
+            self._stream_chat(caller, model, messages, tools, priority, emit),
+            self._get_loop(),
+        )
+        try:
+            while True:
+                kind, value = await events.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            streaming.cancel()
+
+    def get_stats(self) -> dict[str, CallerStats]:
+        return {caller: dataclasses.replace(stats) for caller, stats in list(self._stats.items())}
+
+    async def _run(self, coroutine: Coroutine[Any, Any, R]) -> R:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()))
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _parse(
+        self,
+        caller: str,
+        model: str,
+        prompt: str,
+        text_format: type[T],
+        priority: Priority,
+    ) -> ParseResult[T]:
+        request_key = hashlib.sha256(json.dumps([model, prompt, text_format.__qualname__]).encode()).hexdigest()
+        if (in_flight := self._in_flight_parses.get(request_key)) is not None:
+            self._stats[caller].coalesced += 1
+            return await asyncio.shield(in_flight)
+        request = asyncio.ensure_future(self._send_parse(caller, model, prompt, text_format, priority))
+        self._in_flight_parses[request_key] = request
+        request.add_done_callback(lambda _: self._in_flight_parses.pop(request_key, None))
+        return await asyncio.shield(request)
+
+    async def _send_parse(
+        self,
+        caller: str,
+        model: str,
+        prompt: str,
+        text_format: type[T],
+        priority: Priority,
+    ) -> ParseResult[T]:
+        await self._limiter.acquire(priority)
+        started_at = time.monotonic()
+        try:
+            result = await self.backend.parse(model, prompt, text_format)
+        except Exception:
+            self._record(caller, model, started_at, LLMUsage(), failed=True)
+            raise
+        finally:
+            self._limiter.release()
+        self._record(caller, model, started_at, result.usage)
+        return result
+
+    async def _stream_chat(
+        self,
+        caller: str,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+        priority: Priority,
+        emit: Callable[[str, Any], None],
+    ) -> None:
+        await self._limiter.acquire(priority)
+        started_at = time.monotonic()
+        usage = LLMUsage()
+        try:
+            async for chunk in self.backend.stream_chat(model, messages, tools):
+                if chunk.usage:
+                    usage = LLMUsage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                emit("chunk", chunk)
+        except Exception as e:
+            self._record(caller, model, started_at, usage, failed=True)
+            emit("error", e)
+            return
+        finally:
+            self._limiter.release()
+        self._record(caller, model, started_at, usage)
+        emit("end", None)
+
+    def _record(self, caller: str, model: str, started_at: float, usage: LLMUsage, failed: bool = False) -> None:
+        latency = time.monotonic() - started_at
+        stats = self._stats[caller]
+        stats.requests += 1
+        stats.errors += int(failed)
+        stats.latency += latency
+        stats.input_tokens += usage.input_tokens
+        stats.output_tokens += usage.output_tokens
+        logger.info(
+            "llm request caller=%s model=%s latency=%.2fs input_tokens=%d output_tokens=%d failed=%s",
+            caller,
+            model,
+            latency,
+            usage.input_tokens,
+            usage.output_tokens,
+            failed,
+        )
+
+
+@cache
+def get_llm_gateway() -> Optional[LLMGateway]:
+    """Process-wide gateway, None when the LLM provider is not configured"""
+    api_key = get_openai_api_key()
+    if not api_key:
+        return None
+    return LLMGateway(OpenAIBackend(api_key))
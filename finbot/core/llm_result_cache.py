@@ -0,0 +1,77 @@
+"""Persistent cache of LLM results, shared by all users.
+
+Results are addressed by the content they were computed from (sanitized
+transaction description, amount sign and currency) and by the task prompt /
+model version, so that bumping the version of a task invalidates its entries.
+"""
+
+import hashlib
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Iterable
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from finbot import model
+from finbot.model import SessionType
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResultCache(object):
+    def __init__(self, db_session: SessionType, task: str, version: str):
+        self._db_session = db_session
+        self.task = task
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, sanitized_description: str, amount: Decimal, currency: str) -> str:
+        amount_sign = (amount > 0) - (amount < 0)
+        content = [self.task, self.version, sanitized_description, amount_sign, currency.upper()]
+        return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Cached results of the given keys (missing keys are omitted). Reads do not
+        write to the cache: hits and misses are only counted in memory (see `log_stats`)
+        """
+        unique_keys = set(keys)
+        if not unique_keys:
+            return {}
+        cached: dict[str, Any] = {
+            row.cache_key: row.result
+            for row in self._db_session.query(
+                model.LLMResultCacheEntry.cache_key,
+                model.LLMResultCacheEntry.result,
+            )
+            .filter(model.LLMResultCacheEntry.cache_key.in_(unique_keys))
+            .all()
+        }
+        self.hits += len(cached)
+        self.misses += len(unique_keys) - len(cached)
+        return cached
+
+    def put(self, key: str, result: Any) -> None:
+        statement = insert(model.LLMResultCacheEntry).values(
+            cache_key=key,
+            task=self.task,
+            version=self.version,
+            result=result,
+        )
+        self._db_session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[model.LLMResultCacheEntry.cache_key],
+                set_={"result": statement.excluded.result, "updated_at": func.now()},
+            )
+        )
+
+    def log_stats(self) -> None:
+        logger.info(
+            "llm results cache (%s %s): hits=%d misses=%d",
+            self.task,
+            self.version,
+            self.hits,
+            self.misses,
+        )
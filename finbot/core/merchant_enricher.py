@@ -7,24 +7,27 @@ depository accounts, building up a merchant database over time.
 import asyncio
 import json
 import logging
-from typing import Literal
+from typing import Iterable, Literal, NamedTuple, Optional
 
-from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
-from rapidfuzz import fuzz, process
 from sqlalchemy import and_, func
 
 from finbot import model
 from finbot.core.description_sanitizer import sanitize_description
-from finbot.core.environment import get_openai_api_key
+from finbot.core.llm_gateway import LLMGateway, get_llm_gateway
+from finbot.core.llm_result_cache import LLMResultCache
+from finbot.core.merchant_pattern_index import PatternMatch, get_merchant_pattern_index
 from finbot.core.spending_categories import PRIMARY_CATEGORIES
 from finbot.model import SessionType
 
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 10
+LLM_MODEL = "gpt-5.4"
+PROMPT_VERSION = 1  # bump when the prompt changes, to invalidate cached results
 HIGH_CONFIDENCE_THRESHOLD = 90
 MEDIUM_CONFIDENCE_THRESHOLD = 60
+MAX_CANDIDATE_PATTERNS = 5  # known patterns shown to the LLM per candidate merchant
 
 VALID_MERCHANT_CATEGORIES: set[str] = set(PRIMARY_CATEGORIES)
 
@@ -68,22 +71,6 @@ class MerchantEnrichmentResponse(BaseModel, extra="forbid"):
     results: list[MapToExistingMerchant | MapToNewMerchant | SkipTransaction]
 
 
-def _load_merchant_patterns(
-    db_session: SessionType,
-) -> dict[str, tuple[int, str]]:
-    """Load all merchant patterns into a dict mapping sanitized_description -> (merchant_id, merchant_name)."""
-    rows = (
-        db_session.query(
-            model.MerchantDescriptionPattern.sanitized_description,
-            model.MerchantDescriptionPattern.merchant_id,
-            model.Merchant.name,
-        )
-        .join(model.Merchant, model.MerchantDescriptionPattern.merchant_id == model.Merchant.id)  # type: ignore[no-untyped-call]
-        .all()
-    )
-    return {row.sanitized_description: (row.merchant_id, row.name) for row in rows}
-
-
 def _get_depository_transaction_ids(
     transaction_ids: list[int],
     db_session: SessionType,
@@ -138,13 +125,15 @@ def _get_depository_transaction_ids(
 async def enrich_transactions_with_merchants(
     transaction_ids: list[int],
     db_session: SessionType,
+    gateway: Optional[LLMGateway] = None,
 ) -> None:
     """Enrich transactions with merchant information.
 
     1. Filter to depository accounts only
     2. Sanitize descriptions
     3. Fuzzy match against known patterns
-    4. Fall back to LLM for unrecognized merchants
+    4. Reuse cached LLM results for descriptions already identified
+    5. Fall back to LLM for unrecognized merchants
     """
     depository_ids = _get_depository_transaction_ids(transaction_ids, db_session)
     if not depository_ids:
@@ -159,12 +148,11 @@ async def enrich_transactions_with_merchants(
     if not entries:
         return
 
-    patterns = _load_merchant_patterns(db_session)
-    pattern_keys = list(patterns.keys())
+    pattern_index = get_merchant_pattern_index(db_session)
 
     # Partition by fuzzy match confidence
     high_confidence: list[tuple[model.TransactionHistoryEntry, str, int]] = []  # (entry, sanitized, merchant_id)
-    medium_confidence: list[tuple[model.TransactionHistoryEntry, str, list[tuple[str, float, int]]]] = []
+    medium_confidence: list[tuple[model.TransactionHistoryEntry, str, list[PatternMatch]]] = []
     low_confidence: list[tuple[model.TransactionHistoryEntry, str]] = []
 
     for entry in entries:
@@ -172,37 +160,28 @@ async def enrich_transactions_with_merchants(
         if not sanitized:
             continue
 
-        if pattern_keys:
-            match = process.extractOne(
-                sanitized,
-                pattern_keys,
-                scorer=fuzz.token_sort_ratio,
-            )
-        else:
-            match = None
-
-        if match and match[1] >= HIGH_CONFIDENCE_THRESHOLD:
-            merchant_id, _ = patterns[match[0]]
-            high_confidence.append((entry, sanitized, merchant_id))
-        elif match and match[1] >= MEDIUM_CONFIDENCE_THRESHOLD:
-            # Gather top candidates for LLM
-            candidates = process.extract(
-                sanitized,
-                pattern_keys,
-                scorer=fuzz.token_sort_ratio,
-                limit=5,
-            )
-            candidate_info = [
-                (c[0], c[1], patterns[c[0]][0]) for c in candidates if c[1] >= MEDIUM_CONFIDENCE_THRESHOLD
-            ]
+        matches = pattern_index.match(sanitized, limit=5)
+        best_match = matches[0] if matches else None
+
+        if best_match and best_match.score >= HIGH_CONFIDENCE_THRESHOLD:
+            high_confidence.append((entry, sanitized, best_match.merchant_id))
+        elif best_match and best_match.score >= MEDIUM_CONFIDENCE_THRESHOLD:
+            # Keep top candidates for LLM
+            candidate_info = [match for match in matches if match.score >= MEDIUM_CONFIDENCE_THRESHOLD]
             medium_confidence.append((entry, sanitized, candidate_info))
         else:
             low_confidence.append((entry, sanitized))
 
+    merchant_cache = _MerchantCache(db_session)
+    merchant_cache.prefetch_candidates(
+        match.merchant_id for _, _, candidates in medium_confidence for match in candidates
+    )
+
     # Process high confidence matches
     for entry, sanitized, merchant_id in high_confidence:
         entry.merchant_id = merchant_id
-        _add_pattern_if_new(db_session, merchant_id, sanitized)
+        if pattern_index.get_merchant(sanitized) is None:
+            merchant_cache.add_pattern_if_new(merchant_id, sanitized)
 
     logger.info(
         "merchant fuzzy match: high=%d medium=%d low=%d",
@@ -213,26 +192,15 @@ async def enrich_transactions_with_merchants(
 
     # Send medium + low confidence to LLM
     llm_entries: list[tuple[model.TransactionHistoryEntry, str]] = []
-    llm_candidates: dict[int, list[tuple[int, str, list[str]]]] = {}  # txn_id -> [(merchant_id, name, patterns)]
+    llm_candidates: dict[int, list[MerchantCandidate]] = {}
 
     for entry, sanitized, candidates in medium_confidence:
         llm_entries.append((entry, sanitized))
         # Build candidate info for the prompt
-        merchant_candidates: list[tuple[int, str, list[str]]] = []
-        seen_merchants: set[int] = set()
-        for _, _, mid in candidates:
-            if mid not in seen_merchants:
-                seen_merchants.add(mid)
-                merchant = db_session.query(model.Merchant).get(mid)
-                if merchant:
-                    merchant_patterns = [
-                        p.sanitized_description
-                        for p in db_session.query(model.MerchantDescriptionPattern)
-                        .filter_by(merchant_id=mid)
-                        .limit(5)
-                        .all()
-                    ]
-                    merchant_candidates.append((mid, merchant.name, merchant_patterns))
+        merchant_candidates: list[MerchantCandidate] = []
+        for mid in dict.fromkeys(match.merchant_id for match in candidates):
+            if candidate := merchant_cache.get_candidate(mid):
+                merchant_candidates.append(candidate)
         llm_candidates[entry.id] = merchant_candidates
 
     for entry, sanitized in low_confidence:
@@ -240,57 +208,167 @@ async def enrich_transactions_with_merchants(
         llm_candidates[entry.id] = []
 
     if llm_entries:
-        await _llm_enrich(llm_entries, llm_candidates, db_session)
+        llm_cache = LLMResultCache(db_session, task="merchant", version=f"{LLM_MODEL}:{PROMPT_VERSION}")
+        llm_entries = _apply_cached_merchants(llm_entries, llm_cache, merchant_cache)
+        llm_cache.log_stats()
+        if llm_entries:
+            await _llm_enrich(llm_entries, llm_candidates, merchant_cache, llm_cache, gateway)
 
     db_session.flush()
 
 
-def _add_pattern_if_new(
-    db_session: SessionType,
-    merchant_id: int,
-    sanitized_description: str,
-) -> None:
-    """Add a sanitized description pattern for a merchant if it doesn't already exist."""
-    existing = (
-        db_session.query(model.MerchantDescriptionPattern)
-        .filter_by(merchant_id=merchant_id, sanitized_description=sanitized_description)
-        .first()
-    )
-    if not existing:
-        db_session.add(
-            model.MerchantDescriptionPattern(
-                merchant_id=merchant_id,
-                sanitized_description=sanitized_description,
+class MerchantCandidate(NamedTuple):
+    merchant_id: int
+    name: str
+    patterns: list[str]
+
+
+class _MerchantCache(object):
+    """Merchants (and their patterns) looked up during one enrichment run"""
+
+    def __init__(self, db_session: SessionType):
+        self.db_session = db_session
+        self._candidates: dict[int, Optional[MerchantCandidate]] = {}
+        self._merchant_ids_by_name: dict[str, int] = {}
+        self._known_patterns: set[tuple[int, str]] = set()
+
+    def prefetch_candidates(self, merchant_ids: Iterable[int]) -> None:
+        """Load the given merchants, with their first known patterns, in a single query"""
+        missing_ids = set(merchant_ids) - self._candidates.keys()
+        if not missing_ids:
+            return
+        ranked_patterns = (
+            self.db_session.query(
+                model.MerchantDescriptionPattern.merchant_id,
+                model.MerchantDescriptionPattern.sanitized_description,
+                func.row_number()
+                .over(
+                    partition_by=model.MerchantDescriptionPattern.merchant_id,
+                    order_by=model.MerchantDescriptionPattern.id,
+                )
+                .label("pattern_rank"),
             )
+            .filter(model.MerchantDescriptionPattern.merchant_id.in_(missing_ids))
+            .subquery("ranked_patterns")
         )
-        db_session.flush()
+        rows = (
+            self.db_session.query(
+                model.Merchant.id,
+                model.Merchant.name,
+                ranked_patterns.c.sanitized_description,
+            )
+            .outerjoin(  # type: ignore[no-untyped-call]
+                ranked_patterns,
+                and_(
+                    ranked_patterns.c.merchant_id == model.Merchant.id,
+                    ranked_patterns.c.pattern_rank <= MAX_CANDIDATE_PATTERNS,
+                ),
+            )
+            .filter(model.Merchant.id.in_(missing_ids))
+            .order_by(model.Merchant.id, ranked_patterns.c.pattern_rank)
+            .all()
+        )
+        self._candidates.update({merchant_id: None for merchant_id in missing_ids})
+        for row in rows:
+            candidate = self._candidates.get(row.id)
+            if candidate is None:
+                candidate = MerchantCandidate(merchant_id=row.id, name=row.name, patterns=[])
+                self._candidates[row.id] = candidate
+                self._merchant_ids_by_name.setdefault(row.name, row.id)
+            if row.sanitized_description is not None:
+                candidate.patterns.append(row.sanitized_description)
+                self._known_patterns.add((row.id, row.sanitized_description))
+
+    def get_candidate(self, merchant_id: int) -> Optional[MerchantCandidate]:
+        self.prefetch_candidates([merchant_id])
+        return self._candidates[merchant_id]
+
+    def find_merchant_id_by_name(self, name: str) -> Optional[int]:
+        if name not in self._merchant_ids_by_name:
+            row = self.db_session.query(model.Merchant.id).filter_by(name=name).first()
+            if row is None:
+                return None
+            self._merchant_ids_by_name[name] = row[0]
+        return self._merchant_ids_by_name[name]
+
+    def add_merchant(self, merchant: model.Merchant) -> int:
+        self.db_session.add(merchant)
+        self.db_session.flush()
+        self._candidates[merchant.id] = MerchantCandidate(merchant_id=merchant.id, name=merchant.name, patterns=[])
+        self._merchant_ids_by_name[merchant.name] = merchant.id
+        return merchant.id
+
+    def add_pattern_if_new(self, merchant_id: int, sanitized_description: str) -> None:
+        """Add a sanitized description pattern for a merchant if it doesn't already exist."""
+        if (merchant_id, sanitized_description) in self._known_patterns:
+            return
+        self._known_patterns.add((merchant_id, sanitized_description))
+        existing = (
+            self.db_session.query(model.MerchantDescriptionPattern)
+            .filter_by(merchant_id=merchant_id, sanitized_description=sanitized_description)
+            .first()
+        )
+        if not existing:
+            self.db_session.add(
+                model.MerchantDescriptionPattern(
+                    merchant_id=merchant_id,
+                    sanitized_description=sanitized_description,
+                )
+            )
+            self.db_session.flush()
+
+
+def _apply_cached_merchants(
+    entries: list[tuple[model.TransactionHistoryEntry, str]],
+    llm_cache: LLMResultCache,
+    merchant_cache: _MerchantCache,
+) -> list[tuple[model.TransactionHistoryEntry, str]]:
+    """Map transactions to the merchants previously identified (by the LLM) for the
+    same descriptions, returns the transactions which still need the LLM.
+    """
+    cache_keys = {entry.id: llm_cache.make_key(sanitized, entry.amount, entry.currency) for entry, sanitized in entries}
+    cached_results = llm_cache.get_many(cache_keys.values())
+    merchant_cache.prefetch_candidates(
+        result["merchant_id"] for result in cached_results.values() if result["merchant_id"] is not None
+    )
+    uncached_entries: list[tuple[model.TransactionHistoryEntry, str]] = []
+    for entry, sanitized in entries:
+        cached_result = cached_results.get(cache_keys[entry.id])
+        if cached_result is None:
+            uncached_entries.append((entry, sanitized))
+        elif (merchant_id := cached_result["merchant_id"]) is not None:
+            if merchant_cache.get_candidate(merchant_id) is None:
+                uncached_entries.append((entry, sanitized))  # merchant since deleted
+                continue
+            entry.merchant_id = merchant_id
+            merchant_cache.add_pattern_if_new(merchant_id, sanitized)
+    return uncached_entries
 
 
 async def _llm_enrich(
     entries: list[tuple[model.TransactionHistoryEntry, str]],
-    candidates: dict[int, list[tuple[int, str, list[str]]]],
-    db_session: SessionType,
+    candidates: dict[int, list[MerchantCandidate]],
+    merchant_cache: _MerchantCache,
+    llm_cache: LLMResultCache,
+    gateway: Optional[LLMGateway] = None,
 ) -> None:
     """Use LLM to identify merchants for transactions."""
-    api_key = get_openai_api_key()
-    if not api_key:
+    gateway = gateway or get_llm_gateway()
+    if gateway is None:
         logger.info("FINBOT_OPENAI_API_KEY not set, skipping LLM merchant enrichment")
         return
 
-    client = AsyncOpenAI(api_key=api_key)
-    semaphore = asyncio.Semaphore(8)
-
     batches = [entries[i : i + BATCH_SIZE] for i in range(0, len(entries), BATCH_SIZE)]
-    tasks = [_llm_enrich_batch(client, batch, candidates, db_session, semaphore) for batch in batches]
+    tasks = [_llm_enrich_batch(gateway, batch, candidates, merchant_cache, llm_cache) for batch in batches]
     await asyncio.gather(*tasks)
 
 
 async def _llm_enrich_batch(
-    client: AsyncOpenAI,
+    gateway: LLMGateway,
     entries: list[tuple[model.TransactionHistoryEntry, str]],
-    candidates: dict[int, list[tuple[int, str, list[str]]]],
-    db_session: SessionType,
-    semaphore: asyncio.Semaphore,
+    candidates: dict[int, list[MerchantCandidate]],
+    merchant_cache: _MerchantCache,
+    llm_cache: LLMResultCache,
 ) -> None:
     """Process a batch of transactions through LLM for merchant identification."""
     entries_by_id = {entry.id: entry for entry, _ in entries}
@@ -334,65 +412,62 @@ For merchant_category, you MUST use exactly one of these values:
 TRANSACTIONS:
 {json.dumps(transactions_data)}"""
 
-    async with semaphore:
-        try:
-            response = await client.responses.parse(
-                model="gpt-5.4",
-                input=[{"role": "user", "content": prompt}],
-                text_format=MerchantEnrichmentResponse,
-            )
-
-            parsed = response.output_parsed
-            if not parsed:
-                return
-
-            for result in parsed.results:
-                if result.transaction_id not in entries_by_id:
-                    logger.warning("LLM returned unknown transaction id %d, skipping", result.transaction_id)
-                    continue
-
-                entry = entries_by_id[result.transaction_id]
-                matched_sanitized = sanitized_by_id.get(result.transaction_id)
-
-                if isinstance(result, MapToExistingMerchant):
-                    # Verify merchant exists
-                    merchant = db_session.query(model.Merchant).get(result.merchant_id)
-                    if merchant:
-                        entry.merchant_id = result.merchant_id
-                        if matched_sanitized:
-                            _add_pattern_if_new(db_session, result.merchant_id, matched_sanitized)
-                    else:
-                        logger.warning("LLM referenced non-existent merchant_id %d", result.merchant_id)
-                elif isinstance(result, MapToNewMerchant):
-                    category = result.merchant_category
-                    if category and category not in VALID_MERCHANT_CATEGORIES:
-                        logger.warning(
-                            "LLM returned invalid merchant category %r for transaction %d, dropping",
-                            category,
-                            result.transaction_id,
-                        )
-                        category = None
-
-                    # Check if a merchant with this name already exists
-                    existing_merchant = db_session.query(model.Merchant).filter_by(name=result.merchant_name).first()
-                    if existing_merchant:
-                        merchant_id = existing_merchant.id
-                    else:
-                        new_merchant = model.Merchant(
+    try:
+        parsed = await gateway.parse(
+            caller="merchant_enricher",
+            model=LLM_MODEL,
+            prompt=prompt,
+            text_format=MerchantEnrichmentResponse,
+        )
+        if not parsed:
+            return
+
+        for result in parsed.results:
+            if result.transaction_id not in entries_by_id:
+                logger.warning("LLM returned unknown transaction id %d, skipping", result.transaction_id)
+                continue
+
+            entry = entries_by_id[result.transaction_id]
+            matched_sanitized = sanitized_by_id[result.transaction_id]
+            cache_key = llm_cache.make_key(matched_sanitized, entry.amount, entry.currency)
+
+            if isinstance(result, SkipTransaction):
+                llm_cache.put(cache_key, {"merchant_id": None})
+            elif isinstance(result, MapToExistingMerchant):
+                # Verify merchant exists
+                if merchant_cache.get_candidate(result.merchant_id) is not None:
+                    entry.merchant_id = result.merchant_id
+                    merchant_cache.add_pattern_if_new(result.merchant_id, matched_sanitized)
+                    llm_cache.put(cache_key, {"merchant_id": result.merchant_id})
+                else:
+                    logger.warning("LLM referenced non-existent merchant_id %d", result.merchant_id)
+            elif isinstance(result, MapToNewMerchant):
+                category = result.merchant_category
+                if category and category not in VALID_MERCHANT_CATEGORIES:
+                    logger.warning(
+                        "LLM returned invalid merchant category %r for transaction %d, dropping",
+                        category,
+                        result.transaction_id,
+                    )
+                    category = None
+
+                # Check if a merchant with this name already exists
+                merchant_id = merchant_cache.find_merchant_id_by_name(result.merchant_name)
+                if merchant_id is None:
+                    merchant_id = merchant_cache.add_merchant(
+                        model.Merchant(
                             name=result.merchant_name,
                             description=result.merchant_description,
                             category=category,
                             website_url=result.merchant_website_url,
                         )
-                        db_session.add(new_merchant)
-                        db_session.flush()
-                        merchant_id = new_merchant.id
+                    )
 
-                    entry.merchant_id = merchant_id
-                    if matched_sanitized:
-                        _add_pattern_if_new(db_session, merchant_id, matched_sanitized)
+                entry.merchant_id = merchant_id
+                merchant_cache.add_pattern_if_new(merchant_id, matched_sanitized)
+                llm_cache.put(cache_key, {"merchant_id": merchant_id})
 
-            logger.info("LLM enriched %d/%d transactions with merchants", len(parsed.results), len(entries))
+        logger.info("LLM enriched %d/%d transactions with merchants", len(parsed.results), len(entries))
 
-        except Exception as e:
-            logger.exception("LLM merchant enrichment API call failed: %s", e)
+    except Exception as e:
+        logger.exception("LLM merchant enrichment API call failed: %s", e)
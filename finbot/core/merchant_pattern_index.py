@@ -0,0 +1,129 @@
+"""In-memory index of merchant description patterns.
+
+Sanitized transaction descriptions are first looked up exactly, then fuzzy
+matched against a small set of candidate patterns retrieved through a
+character trigram index, rather than against every known pattern.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from rapidfuzz import fuzz, process
+
+from finbot import model
+from finbot.model import SessionType
+
+NGRAM_SIZE = 3
+MAX_QUERY_NGRAMS = 16  # only the most selective n-grams of a query are used for retrieval
+MAX_CANDIDATES = 256
+FULL_RELOAD_INTERVAL = 3600.0  # seconds, picks up deleted patterns / merchants
+# Patterns are reloaded by creation time, which is the start of the inserting
+# transaction: recent patterns are reloaded in case a transaction which started
+# before the last reload committed after it (post-processing activities, which
+# add patterns, time out after 20 minutes)
+RELOAD_OVERLAP = timedelta(minutes=30)
+
+
+@dataclass(frozen=True)
+class PatternMatch:
+    pattern: str
+    score: float
+    merchant_id: int
+
+
+class MerchantPatternIndex(object):
+    def __init__(self) -> None:
+        self._lock = threading.Lock()  # the index is shared by activity threads
+        self._merchants: dict[str, tuple[int, str]] = {}  # pattern -> (merchant_id, merchant_name)
+        self._postings: dict[str, set[str]] = defaultdict(set)  # n-gram -> patterns
+        self.last_created_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._merchants)
+
+    def add(self, pattern: str, merchant_id: int, merchant_name: str) -> None:
+        with self._lock:
+            self._merchants[pattern] = (merchant_id, merchant_name)
+            for ngram in _iter_ngrams(pattern):
+                self._postings[ngram].add(pattern)
+
+    def get_merchant(self, pattern: str) -> Optional[tuple[int, str]]:
+        return self._merchants.get(pattern)
+
+    def match(self, description: str, limit: int = 5) -> list[PatternMatch]:
+        """Best matching patterns for a sanitized description, best first"""
+        if exact_match := self._merchants.get(description):
+            return [PatternMatch(pattern=description, score=100.0, merchant_id=exact_match[0])]
+        candidates = self._get_candidates(description)
+        if not candidates:
+            return []
+        return [
+            PatternMatch(pattern=pattern, score=score, merchant_id=self._merchants[pattern][0])
+            for (pattern, score, _) in process.extract(
+                description,
+                candidates,
+                scorer=fuzz.token_sort_ratio,
+                limit=limit,
+            )
+        ]
+
+    def _get_candidates(self, description: str) -> list[str]:
+        shared_ngrams: Counter[str] = Counter()
+        with self._lock:
+            postings = sorted(
+                (self._postings[ngram] for ngram in set(_iter_ngrams(description)) if ngram in self._postings),
+                key=len,
+            )
+            for posting in postings[:MAX_QUERY_NGRAMS]:
+                shared_ngrams.update(posting)
+        return [pattern for (pattern, _) in shared_ngrams.most_common(MAX_CANDIDATES)]
+
+
+def _iter_ngrams(description: str) -> Iterable[str]:
+    # token_sort_ratio compares descriptions with sorted tokens
+    normalized = f" {' '.join(sorted(description.split()))} "
+    return (normalized[i : i + NGRAM_SIZE] for i in range(len(normalized) - NGRAM_SIZE + 1))
+
+
+class _CachedMerchantPatternIndex(object):
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: Optional[MerchantPatternIndex] = None
+        self._loaded_at = 0.0
+
+    def get(self, db_session: SessionType) -> MerchantPatternIndex:
+        """Return the process-wide index, after loading the patterns added (by any
+        worker) since it was last refreshed
+        """
+        with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at > FULL_RELOAD_INTERVAL:
+                self._index = MerchantPatternIndex()
+                self._loaded_at = time.monotonic()
+            _load_patterns(self._index, db_session)
+            return self._index
+
+
+def _load_patterns(index: MerchantPatternIndex, db_session: SessionType) -> None:
+    query = db_session.query(
+        model.MerchantDescriptionPattern.sanitized_description,
+        model.MerchantDescriptionPattern.merchant_id,
+        model.MerchantDescriptionPattern.created_at,
+        model.Merchant.name,
+    ).join(model.Merchant, model.MerchantDescriptionPattern.merchant_id == model.Merchant.id)  # type: ignore[no-untyped-call]
+    if index.last_created_at is not None:
+        query = query.filter(model.MerchantDescriptionPattern.created_at >= index.last_created_at - RELOAD_OVERLAP)
+    for row in query.all():
+        index.add(row.sanitized_description, row.merchant_id, row.name)
+        if index.last_created_at is None or row.created_at > index.last_created_at:
+            index.last_created_at = row.created_at
+
+
+_MERCHANT_PATTERN_INDEX = _CachedMerchantPatternIndex()
+
+
+def get_merchant_pattern_index(db_session: SessionType) -> MerchantPatternIndex:
+    return _MERCHANT_PATTERN_INDEX.get(db_session)
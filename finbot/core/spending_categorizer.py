@@ -6,18 +6,23 @@ Categorizes transactions into the Plaid PFC taxonomy.
 import asyncio
 import json
 import logging
+from typing import Optional
 
-from openai import AsyncOpenAI
 from pydantic import BaseModel
 
 from finbot import model
-from finbot.core.environment import get_openai_api_key
+from finbot.core.description_sanitizer import sanitize_description
+from finbot.core.llm_gateway import LLMGateway, get_llm_gateway
+from finbot.core.llm_result_cache import LLMResultCache
 from finbot.core.spending_categories import PLAID_PFC_TAXONOMY, get_taxonomy_prompt_text
 from finbot.model import SessionType
+from finbot.model import repository as model_repository
 
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 25
+LLM_MODEL = "gpt-5-mini"
+PROMPT_VERSION = 1  # bump when the prompt changes, to invalidate cached results
 
 VALID_CATEGORIES: set[tuple[str, str]] = {(primary, detailed) for primary, detailed, _ in PLAID_PFC_TAXONOMY}
 
@@ -35,9 +40,10 @@ class CategorizeResponse(BaseModel):
 async def categorize_transaction_batch(
     transaction_ids: list[int],
     db_session: SessionType,
+    gateway: Optional[LLMGateway] = None,
 ) -> None:
-    api_key = get_openai_api_key()
-    if not api_key:
+    gateway = gateway or get_llm_gateway()
+    if gateway is None:
         logger.info("FINBOT_OPENAI_API_KEY not set, skipping LLM spending categorization")
         return
 
@@ -50,33 +56,76 @@ async def categorize_transaction_batch(
     if not entries:
         return
 
-    client = AsyncOpenAI(api_key=api_key)
-    semaphore = asyncio.Semaphore(8)
+    await categorize_transactions(entries, db_session, gateway)
+    db_session.flush()
+    model_repository.update_cash_flow_aggregates(
+        db_session, model_repository.find_transactions_days(db_session, transaction_ids)
+    )
 
-    # Build all batch slices and launch concurrently
-    batches = [entries[i : i + BATCH_SIZE] for i in range(0, len(entries), BATCH_SIZE)]
-    tasks = [_categorize_batch(client, batch, db_session, semaphore) for batch in batches]
-    await asyncio.gather(*tasks)
+
+async def categorize_transactions(
+    entries: list[model.TransactionHistoryEntry],
+    db_session: SessionType,
+    gateway: LLMGateway,
+) -> None:
+    llm_cache = LLMResultCache(db_session, task="spending_category", version=f"{LLM_MODEL}:{PROMPT_VERSION}")
+    cache_keys = {entry.id: cache_key for entry in entries if (cache_key := _get_cache_key(llm_cache, entry))}
+    cached_results = llm_cache.get_many(cache_keys.values())
+    uncached_entries = [
+        entry
+        for entry in entries
+        if entry.id not in cache_keys or not _apply_cached_category(entry, cached_results.get(cache_keys[entry.id]))
+    ]
+    llm_cache.log_stats()
+
+    if uncached_entries:
+        # Build all batch slices and launch concurrently
+        batches = [uncached_entries[i : i + BATCH_SIZE] for i in range(0, len(uncached_entries), BATCH_SIZE)]
+        tasks = [_categorize_batch(gateway, batch, db_session) for batch in batches]
+        categorized_ids = set().union(*await asyncio.gather(*tasks))
+
+        for entry in uncached_entries:
+            if entry.id in cache_keys and entry.id in categorized_ids:
+                llm_cache.put(
+                    cache_keys[entry.id],
+                    {"primary": entry.spending_category_primary, "detailed": entry.spending_category_detailed},
+                )
+    db_session.flush()
+
+
+def _get_cache_key(llm_cache: LLMResultCache, entry: model.TransactionHistoryEntry) -> Optional[str]:
+    sanitized = sanitize_description(entry.description)
+    if not sanitized:
+        return None
+    return llm_cache.make_key(sanitized, entry.amount, entry.currency)
+
+
+def _apply_cached_category(entry: model.TransactionHistoryEntry, cached_result: Optional[dict[str, str]]) -> bool:
+    if not cached_result or (cached_result["primary"], cached_result["detailed"]) not in VALID_CATEGORIES:
+        return False
+    entry.spending_category_primary = cached_result["primary"]
+    entry.spending_category_detailed = cached_result["detailed"]
+    entry.spending_category_source = "llm"
+    return True
 
 
 async def _categorize_batch(
-    client: AsyncOpenAI,
+    gateway: LLMGateway,
     entries: list[model.TransactionHistoryEntry],
     db_session: SessionType,
-    semaphore: asyncio.Semaphore,
-) -> None:
+) -> set[int]:
+    """Returns set of successfully categorized IDs."""
     entries_by_id = {entry.id: entry for entry in entries}
 
-    async with semaphore:
-        categorized_ids = await _call_and_apply(client, entries, entries_by_id)
+    categorized_ids = await _call_and_apply(gateway, entries, entries_by_id)
 
     # Retry uncategorized transactions once
     failed_ids = set(entries_by_id.keys()) - categorized_ids
     if failed_ids:
         retry_entries = [entries_by_id[eid] for eid in failed_ids]
         logger.info("Retrying %d uncategorized transactions", len(retry_entries))
-        async with semaphore:
-            retry_categorized = await _call_and_apply(client, retry_entries, entries_by_id)
+        retry_categorized = await _call_and_apply(gateway, retry_entries, entries_by_id)
+        categorized_ids |= retry_categorized
         still_failed = failed_ids - retry_categorized
         if still_failed:
             logger.warning(
@@ -86,10 +135,11 @@ async def _categorize_batch(
             )
 
     db_session.flush()
+    return categorized_ids
 
 
 async def _call_and_apply(
-    client: AsyncOpenAI,
+    gateway: LLMGateway,
     entries: list[model.TransactionHistoryEntry],
     entries_by_id: dict[int, model.TransactionHistoryEntry],
 ) -> set[int]:
@@ -119,13 +169,12 @@ TRANSACTIONS:
 For each transaction, return the id, primary category, and detailed category."""
 
     try:
-        response = await client.responses.parse(
-            model="gpt-5-mini",
-            input=[{"role": "user", "content": prompt}],
+        parsed = await gateway.parse(
+            caller="spending_categorizer",
+            model=LLM_MODEL,
+            prompt=prompt,
             text_format=CategorizeResponse,
         )
-
-        parsed = response.output_parsed
         if not parsed:
             return set()
 
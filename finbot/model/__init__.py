@@ -6,9 +6,11 @@ from typing import TYPE_CHECKING, Any, Optional, Type, TypeVar, cast
 
 import orjson
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     CheckConstraint,
     Column,
+    Date,
     ForeignKey,
     ForeignKeyConstraint,
     Index,
@@ -365,6 +367,23 @@ class UserAccountValuationHistoryEntry(Base):
         return float(self.valuation - self.total_liabilities)
 
 
+class UserAccountValuationRollupEntry(Base):
+    __tablename__ = "finbot_user_accounts_valuation_rollups"
+    user_account_id = Column(Integer, ForeignKey(UserAccount.id, ondelete="CASCADE"), primary_key=True)
+    frequency = Column(String(16), primary_key=True)
+    bucket_start = Column(DateTimeTz, primary_key=True)
+    bucket_end = Column(DateTimeTz, nullable=False)
+    valuation_period = Column(String(32), nullable=False)
+    period_start = Column(DateTimeTz, nullable=False)
+    period_end = Column(DateTimeTz, nullable=False)
+    first_value = Column(Numeric, nullable=False)
+    last_value = Column(Numeric, nullable=False)
+    min_value = Column(Numeric, nullable=False)
+    max_value = Column(Numeric, nullable=False)
+    created_at = Column(DateTimeTz, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTimeTz, onupdate=func.now())
+
+
 class LinkedAccountValuationHistoryEntry(Base):
     __tablename__ = "finbot_linked_accounts_valuation_history_entries"
     history_entry_id = Column(
@@ -505,12 +524,16 @@ class TransactionsSnapshotEntry(Base):
 
     @property
     def transactions(self) -> list[dict[str, Any]]:
-        return cast(list[dict[str, Any]], json.loads(zlib.decompress(self.transactions_data)))
+        return TransactionsSnapshotEntry.decompress_transactions(self.transactions_data)
 
     @staticmethod
     def compress_transactions(transactions: list[dict[str, Any]]) -> bytes:
         return zlib.compress(json.dumps(transactions).encode())
 
+    @staticmethod
+    def decompress_transactions(transactions_data: bytes) -> list[dict[str, Any]]:
+        return cast(list[dict[str, Any]], json.loads(zlib.decompress(transactions_data)))
+
 
 class Merchant(Base):
     __tablename__ = "finbot_merchants"
@@ -529,6 +552,10 @@ class Merchant(Base):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        Index("idx_merchants_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 
 class MerchantDescriptionPattern(Base):
     __tablename__ = "finbot_merchant_description_patterns"
@@ -545,6 +572,7 @@ class MerchantDescriptionPattern(Base):
             "sanitized_description",
             name="uidx_merchant_description_patterns_merchant_desc",
         ),
+        Index("idx_merchant_description_patterns_created_at", "created_at"),
     )
 
 
@@ -572,6 +600,8 @@ class TransactionHistoryEntry(Base):
     recurring_group_id = Column(Integer, ForeignKey("finbot_recurring_transaction_groups.id", ondelete="SET NULL"))
     provider_specific_data = Column(JSONEncoded)
     source_snapshot_id = Column(Integer, ForeignKey(UserAccountSnapshot.id, ondelete="SET NULL"))
+    # part of a (non rejected) transaction match, maintained by transactions matching
+    is_internal_transfer = Column(Boolean, nullable=False, default=False, server_default=expression.false())
     created_at = Column(DateTimeTz, server_default=func.now(), nullable=False)
     updated_at = Column(DateTimeTz, onupdate=func.now())
 
@@ -587,8 +617,28 @@ class TransactionHistoryEntry(Base):
             name="uidx_transactions_history_dedup",
         ),
         Index("idx_transactions_history_account_date", "linked_account_id", "transaction_date"),
+        Index(
+            "idx_transactions_history_account_date_external",
+            "linked_account_id",
+            "transaction_date",
+            postgresql_where=~is_internal_transfer,
+        ),
         Index("idx_transactions_history_merchant", "merchant_id"),
         Index("idx_transactions_history_recurring_group", "recurring_group_id"),
+        Index("idx_transactions_history_source_snapshot", "source_snapshot_id"),
+        Index("idx_transactions_history_abs_amount_date", func.abs(amount_snapshot_ccy), transaction_date),
+        Index(
+            "idx_transactions_history_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_transactions_history_counterparty_trgm",
+            "counterparty",
+            postgresql_using="gin",
+            postgresql_ops={"counterparty": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -645,6 +695,53 @@ class TransactionMatch(Base):
     )
 
 
+class CashFlowDailyAggregateEntry(Base):
+    """Transactions of a linked account aggregated per day, transaction type,
+    spending category and internal transfer flag. Maintained by transactions
+    post-processing (see `repository.update_cash_flow_aggregates`)"""
+
+    __tablename__ = "finbot_cash_flow_daily_aggregates"
+    id = Column(Integer, primary_key=True)
+    user_account_id = Column(Integer, ForeignKey(UserAccount.id, ondelete="CASCADE"), nullable=False)
+    linked_account_id = Column(Integer, ForeignKey(LinkedAccount.id, ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    transaction_type = Column(String(32), nullable=False)
+    spending_category_primary = Column(String(64))
+    is_internal_transfer = Column(Boolean, nullable=False)
+    inflows = Column(Numeric, nullable=False)
+    outflows = Column(Numeric, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    created_at = Column(DateTimeTz, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_cash_flow_daily_aggregates_user_day", "user_account_id", "day"),
+        Index("idx_cash_flow_daily_aggregates_account_day", "linked_account_id", "day"),
+    )
+
+
+class LLMResultCacheEntry(Base):
+    __tablename__ = "finbot_llm_results_cache"
+    cache_key = Column(String(64), primary_key=True)
+    task = Column(String(32), nullable=False)
+    version = Column(String(64), nullable=False)
+    result = Column(JSONEncoded, nullable=False)
+    created_at = Column(DateTimeTz, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTimeTz, onupdate=func.now())
+
+    __table_args__ = (Index("idx_llm_results_cache_task_version", "task", "version"),)
+
+
+class LargeObjectBlob(Base):
+    """Blobs written by `PostgresLargeObjectBlobStore`, tracked so that the blobs
+    orphaned by failed or abandoned workflows can be swept"""
+
+    __tablename__ = "finbot_large_object_blobs"
+    oid = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTimeTz, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("idx_large_object_blobs_created_at", "created_at"),)
+
+
 class GenericKeyValueStore(Base):
     __tablename__ = "finbot_generic_key_value_store"
     key = Column(String(64), primary_key=True)
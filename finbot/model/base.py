@@ -5,7 +5,7 @@ from functools import wraps
 from types import TracebackType
 from typing import Any, Callable, Iterator, ParamSpec, TypeAlias, TypeVar, cast
 
-from sqlalchemy import create_engine
+from sqlalchemy import DDL, create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -20,6 +20,9 @@ R = TypeVar("R")
 Base = declarative_base()
 BaseT = TypeVar("BaseT", bound=Base)
 
+# trigram indexes (text search) rely on the pg_trgm extension
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))  # type: ignore[no-untyped-call]
+
 SessionType: TypeAlias = Session
 
 
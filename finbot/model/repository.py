@@ -2,8 +2,10 @@
 import json
 from dataclasses import dataclass
 from datetime import date, datetime
+from itertools import batched
 from typing import (
     Any,
+    Iterable,
     Literal,
     Optional,
     Protocol,
@@ -37,6 +39,8 @@ from finbot.model import (
 )
 from finbot.providers.schema import AssetClass, AssetType
 
+CASH_FLOW_DAYS_PER_QUERY = 1000
+
 
 def get_user_account(
     session: SessionType,
@@ -150,31 +154,43 @@ class HistoricalValuationEntry:
 class ValuationGrouping(Protocol):
     datatype: str
     sql_grouping: str
+    sql_unit: str  # date_trunc field
+    sql_interval: str  # bucket duration
 
 
 class DailyValuationGrouping(ValuationGrouping):
     datatype = "datetime"
     sql_grouping = "fuahe.effective_at::timestamp::date"
+    sql_unit = "day"
+    sql_interval = "1 day"
 
 
 class WeeklyValuationGrouping(ValuationGrouping):
     datatype = "category"
     sql_grouping = "'W' || to_char(fuahe.effective_at, 'IW IYYY')"
+    sql_unit = "week"
+    sql_interval = "1 week"
 
 
 class MonthlyValuationGrouping(ValuationGrouping):
     datatype = "category"
     sql_grouping = "to_char(fuahe.effective_at, 'Month YYYY')"
+    sql_unit = "month"
+    sql_interval = "1 month"
 
 
 class QuarterlyValuationGrouping(ValuationGrouping):
     datatype = "category"
     sql_grouping = "'Q' || to_char(fuahe.effective_at, 'Q YYYY')"
+    sql_unit = "quarter"
+    sql_interval = "3 months"
 
 
 class YearlyValuationGrouping(ValuationGrouping):
     datatype = "category"
     sql_grouping = "extract(year from fuahe.effective_at)::text"
+    sql_unit = "year"
+    sql_interval = "1 year"
 
 
 def _get_valuation_grouping_from_frequency(
@@ -189,6 +205,55 @@ def _get_valuation_grouping_from_frequency(
     }[frequency]
 
 
+def update_user_account_valuation_rollups(
+    session: SessionType,
+    history_entry_id: int,
+) -> None:
+    """Fold a user account history entry into the valuation rollups (one bucket
+    per frequency), so that historical valuation queries do not need to scan
+    the whole valuation history.
+    """
+    rollup_entries = " union all ".join(
+        f"""
+        select fuahe.user_account_id,
+               '{frequency.value}',
+               date_trunc('{grouping.sql_unit}', fuahe.effective_at),
+               date_trunc('{grouping.sql_unit}', fuahe.effective_at) + interval '{grouping.sql_interval}',
+               ({grouping.sql_grouping})::text,
+               fuahe.effective_at,
+               fuahe.effective_at,
+               fuavhe.valuation,
+               fuavhe.valuation,
+               fuavhe.valuation,
+               fuavhe.valuation
+          from finbot_user_accounts_valuation_history_entries fuavhe
+          join finbot_user_accounts_history_entries fuahe
+            on fuavhe.history_entry_id = fuahe.id
+         where fuahe.id = :history_entry_id
+        """
+        for frequency in ValuationFrequency
+        for grouping in [_get_valuation_grouping_from_frequency(frequency)]
+    )
+    query = f"""
+        insert into finbot_user_accounts_valuation_rollups as r (
+            user_account_id, frequency, bucket_start, bucket_end, valuation_period,
+            period_start, period_end, first_value, last_value, min_value, max_value
+        )
+        {rollup_entries}
+        on conflict (user_account_id, frequency, bucket_start) do update
+           set first_value = case when excluded.period_start < r.period_start
+                                  then excluded.first_value else r.first_value end,
+               last_value = case when excluded.period_end >= r.period_end
+                                 then excluded.last_value else r.last_value end,
+               period_start = least(r.period_start, excluded.period_start),
+               period_end = greatest(r.period_end, excluded.period_end),
+               min_value = least(r.min_value, excluded.min_value),
+               max_value = greatest(r.max_value, excluded.max_value),
+               updated_at = now()
+    """
+    session.execute(text(query), {"history_entry_id": history_entry_id})
+
+
 def get_user_account_historical_valuation(
     session: SessionType,
     user_account_id: int,
@@ -196,56 +261,104 @@ def get_user_account_historical_valuation(
     to_time: Optional[datetime] = None,
     frequency: Optional[ValuationFrequency] = None,
 ) -> list[HistoricalValuationEntry]:
+    """Valuation periods fully contained in [from_time, to_time] are read from the
+    valuation rollups, only the (partial) periods at the edges of the requested
+    range are computed from the valuation history.
+    """
     frequency = frequency or ValuationFrequency.Daily
-    grouping = _get_valuation_grouping_from_frequency(frequency).sql_grouping
-    query_params: dict[str, Any] = {"user_account_id": user_account_id}
-    main_query = f"""
-        select distinct on ({grouping}) {grouping} as valuation_period,
+    grouping = _get_valuation_grouping_from_frequency(frequency)
+    query_params: dict[str, Any] = {
+        "user_account_id": user_account_id,
+        "frequency": frequency.value,
+        "from_time": from_time,
+        "to_time": to_time,
+    }
+    period_cast = "::date" if grouping.datatype == "datetime" else ""
+    # edges: history entries outside the full buckets (all entries in the range
+    # when it does not contain any full bucket, as then full_start >= full_end)
+    edges_condition = (
+        "(fuahe.effective_at < (select b.full_start from bounds b)"
+        " or fuahe.effective_at >= (select b.full_end from bounds b))"
+    )
+    if from_time:
+        edges_condition += " and fuahe.effective_at >= :from_time"
+    if to_time:
+        edges_condition += " and fuahe.effective_at <= :to_time"
+    rollup_query = f"""
+        select r.valuation_period{period_cast} as valuation_period,
+               r.period_start,
+               r.period_end,
+               r.first_value,
+               r.last_value,
+               r.min_value,
+               r.max_value
+          from finbot_user_accounts_valuation_rollups r
+         where r.user_account_id = :user_account_id
+           and r.frequency = :frequency
+           and r.bucket_start >= (select b.full_start from bounds b)
+           and r.bucket_end <= (select b.full_end from bounds b)
+    """
+    query = f"""
+        with bounds as (
+            -- start of the first, and end of the last, buckets fully contained in
+            -- [from_time, to_time] (unbounded when from_time / to_time is not set)
+            select coalesce(
+                       case date_trunc('{grouping.sql_unit}', cast(:from_time as timestamptz))
+                        when cast(:from_time as timestamptz) then cast(:from_time as timestamptz)
+                        else date_trunc('{grouping.sql_unit}', cast(:from_time as timestamptz))
+                             + interval '{grouping.sql_interval}'
+                       end,
+                       cast('-infinity' as timestamptz)
+                   ) as full_start,
+                   coalesce(
+                       date_trunc('{grouping.sql_unit}', cast(:to_time as timestamptz)),
+                       cast('infinity' as timestamptz)
+                   ) as full_end
+        )
+        select q.*,
+               (q.last_value - q.first_value) as abs_change,
+               case q.first_value
+                when 0.0 then null
+                else (q.last_value - q.first_value) / (q.first_value)
+               end as rel_change
+          from (({_historical_valuation_query(grouping, edges_condition)}) union all ({rollup_query})) q
+      order by q.period_start
+    """
+    return [HistoricalValuationEntry(**row_to_dict(row)) for row in session.execute(text(query), query_params)]
+
+
+def _historical_valuation_query(grouping: Type[ValuationGrouping], condition: str) -> str:
+    return f"""
+        select distinct on ({grouping.sql_grouping}) {grouping.sql_grouping} as valuation_period,
                first_value(fuahe.effective_at) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                    order by fuahe.effective_at
                ) as period_start,
                first_value(fuahe.effective_at) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                    order by fuahe.effective_at desc
                ) as period_end,
                first_value(fuavhe.valuation) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                    order by fuahe.effective_at
                ) as first_value,
                first_value(fuavhe.valuation) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                    order by fuahe.effective_at desc
                ) as last_value,
                min(fuavhe.valuation) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                ) as min_value,
                max(fuavhe.valuation) over (
-                   partition by {grouping}
+                   partition by {grouping.sql_grouping}
                ) as max_value
         from finbot_user_accounts_valuation_history_entries fuavhe
                  join finbot_user_accounts_history_entries fuahe
                    on fuavhe.history_entry_id = fuahe.id
         where fuahe.user_account_id = :user_account_id
           and fuahe.available
+          and {condition}
     """
-    if from_time:
-        query_params["from_time"] = from_time
-        main_query += " and fuahe.effective_at >= :from_time "
-    if to_time:
-        query_params["to_time"] = to_time
-        main_query += " and fuahe.effective_at <= :to_time "
-    query = f"""
-        select q.*,
-               (q.last_value - q.first_value) as abs_change,
-               case q.first_value
-                when 0.0 then null
-                else (q.last_value - q.first_value) / (q.first_value)
-               end as rel_change
-          from ({main_query}) q
-      order by q.period_start
-    """
-    return [HistoricalValuationEntry(**row_to_dict(row)) for row in session.execute(text(query), query_params)]
 
 
 @dataclass
@@ -628,3 +741,88 @@ def get_transaction_by_id(
         .first()
     )
     return txn
+
+
+# (linked_account_id, day)
+TransactionDay = tuple[int, date]
+
+
+def find_transactions_days(
+    session: SessionType,
+    transaction_ids: Iterable[int],
+) -> set[TransactionDay]:
+    query = """
+        select distinct th.linked_account_id,
+                        th.transaction_date::date as day
+          from finbot_transactions_history th
+         where th.id = any(:transaction_ids)
+    """
+    return {
+        (row.linked_account_id, row.day)
+        for row in session.execute(text(query), {"transaction_ids": list(transaction_ids)})
+    }
+
+
+def update_cash_flow_aggregates(
+    session: SessionType,
+    days: Iterable[TransactionDay],
+) -> None:
+    """Recompute the daily cash-flow aggregates of the given (linked account,
+    day) pairs from the transactions history (does not commit).
+
+    Concurrent updates of the same linked accounts are serialized (until the
+    caller commits) by locking the linked accounts rows.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    lock_query = """
+        select la.id
+          from finbot_linked_accounts la
+         where la.id = any(:linked_account_ids)
+      order by la.id
+           for no key update
+    """
+    session.execute(text(lock_query), {"linked_account_ids": sorted({day[0] for day in days})})
+    days_source = "unnest(cast(:linked_account_ids as integer[]), cast(:days as date[])) as d(linked_account_id, day)"
+    delete_query = f"""
+        delete from finbot_cash_flow_daily_aggregates a
+         using {days_source}
+         where a.linked_account_id = d.linked_account_id
+           and a.day = d.day
+    """
+    insert_query = f"""
+        insert into finbot_cash_flow_daily_aggregates (
+            user_account_id, linked_account_id, day, transaction_type, spending_category_primary,
+            is_internal_transfer, inflows, outflows, transaction_count
+        )
+        select la.user_account_id,
+               th.linked_account_id,
+               d.day,
+               th.transaction_type,
+               th.spending_category_primary,
+               th.is_internal_transfer,
+               coalesce(sum(case when th.amount_snapshot_ccy > 0 then th.amount_snapshot_ccy else 0 end), 0),
+               coalesce(sum(case when th.amount_snapshot_ccy < 0 then th.amount_snapshot_ccy else 0 end), 0),
+               count(*)
+          from {days_source}
+          join finbot_transactions_history th
+            on th.linked_account_id = d.linked_account_id
+           and th.transaction_date >= d.day
+           and th.transaction_date < d.day + 1
+          join finbot_linked_accounts la
+            on la.id = th.linked_account_id
+      group by la.user_account_id,
+               th.linked_account_id,
+               d.day,
+               th.transaction_type,
+               th.spending_category_primary,
+               th.is_internal_transfer
+    """
+    for chunk in batched(days, CASH_FLOW_DAYS_PER_QUERY):
+        params = {
+            "linked_account_ids": [linked_account_id for linked_account_id, _ in chunk],
+            "days": [day for _, day in chunk],
+        }
+        session.execute(text(delete_query), params)
+        session.execute(text(insert_query), params)
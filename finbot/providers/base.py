@@ -1,5 +1,7 @@
 import abc
-from typing import Any, Self
+import asyncio
+from functools import wraps
+from typing import Any, Awaitable, Callable, ClassVar, Concatenate, Coroutine, Hashable, ParamSpec, Self, TypeVar
 
 from pydantic import AwareDatetime
 
@@ -7,17 +9,74 @@ from finbot.core import schema as core_schema
 from finbot.providers.errors import RetiredProviderError
 from finbot.providers.schema import Account, Assets, Liabilities, Transactions
 
+P = ParamSpec("P")
+R = TypeVar("R")
+ProviderT = TypeVar("ProviderT", bound="ProviderBase")
+
+
+class ProviderSessionCache(object):
+    """Request-scoped cache of upstream responses, keyed by endpoint and
+    parameters. Concurrent requests for the same key share a single upstream
+    call, failed calls are not cached.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[Hashable, asyncio.Future[Any]] = {}
+        self.upstream_calls = 0
+        self.saved_calls = 0
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[R]]) -> R:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.saved_calls += 1
+            return await asyncio.shield(entry)
+        self.upstream_calls += 1
+        entry = asyncio.ensure_future(fetch())
+        entry.add_done_callback(lambda done: self._discard_if_failed(key, done))
+        self._entries[key] = entry
+        return await asyncio.shield(entry)
+
+    def _discard_if_failed(self, key: Hashable, entry: asyncio.Future[Any]) -> None:
+        if entry.cancelled() or entry.exception() is not None:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def session_cached(
+    func: Callable[Concatenate[ProviderT, P], Coroutine[Any, Any, R]],
+) -> Callable[Concatenate[ProviderT, P], Coroutine[Any, Any, R]]:
+    """Memoize an upstream call in the provider session cache, for the life of
+    the provider async context. Arguments must be hashable.
+    """
+
+    @wraps(func)
+    async def impl(self: ProviderT, /, *args: P.args, **kwargs: P.kwargs) -> R:
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+        return await self.session_cache.get_or_fetch(key, lambda: func(self, *args, **kwargs))
+
+    return impl
+
 
 class ProviderBase:
     description: str
     credentials_type: type[core_schema.BaseModel]
 
+    # Line items (see finbot.workflows.fetch_financial_data.schema.LineItem) which
+    # may be fetched concurrently once the provider is initialized, and the maximum
+    # number of line items fetched at the same time. Providers opt in explicitly,
+    # all other line items are fetched one after another.
+    concurrent_line_items: ClassVar[frozenset[str]] = frozenset()
+    max_concurrent_line_items: ClassVar[int] = 1
+
     def __init__(
         self,
         user_account_currency: core_schema.CurrencyCode,
         **kwargs: Any,
     ):
         self.user_account_currency = user_account_currency
+        self.session_cache = ProviderSessionCache()
 
     @classmethod
     def create(
@@ -32,11 +91,15 @@ class ProviderBase:
             **kwargs,
         )
 
+    @classmethod
+    def supports_concurrent_line_item(cls, line_item: str) -> bool:
+        return cls.max_concurrent_line_items > 1 and line_item in cls.concurrent_line_items
+
     async def __aenter__(self) -> Self:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore
-        pass
+        self.session_cache.clear()
 
     @abc.abstractmethod
     async def initialize(self) -> None:
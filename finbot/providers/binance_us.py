@@ -7,7 +7,7 @@ from pydantic import SecretStr
 from finbot.core.async_ import acollect, aexec
 from finbot.core.crypto_market import CryptoMarket
 from finbot.core.schema import BaseModel, CurrencyCode
-from finbot.providers.base import ProviderBase
+from finbot.providers.base import ProviderBase, session_cached
 from finbot.providers.errors import AuthenticationError
 from finbot.providers.schema import Account, AccountType, Asset, AssetClass, Assets, AssetsEntry, AssetType
 
@@ -23,6 +23,8 @@ class Credentials(BaseModel):
 class Api(ProviderBase):
     description = "Binance (US)"
     credentials_type = Credentials
+    concurrent_line_items = frozenset({"Accounts", "Assets"})
+    max_concurrent_line_items = 2
 
     def __init__(
         self,
@@ -36,6 +38,7 @@ class Api(ProviderBase):
         self._crypto_market = CryptoMarket()
         self._api: Binance | None = None
 
+    @session_cached
     async def _get_account(self) -> dict[str, Any]:
         assert self._api is not None
         account: dict[str, Any] = await aexec(self._api.get_account, recvWindow=RECV_WINDOW)
@@ -74,17 +77,19 @@ class Api(ProviderBase):
         )
 
     async def _iter_assets(self) -> AsyncGenerator[Asset]:
+        holdings: dict[str, float] = {}
         for entry in (await self._get_account())["balances"]:
             units = float(entry["free"]) + float(entry["locked"])
             if units > OWNERSHIP_UNITS_THRESHOLD:
-                symbol = entry["asset"]
-                value = units * await self._crypto_market.async_get_spot_cached(symbol, self._account_ccy)
-                yield Asset(
-                    name=symbol,
-                    type="cryptocurrency",
-                    asset_class=AssetClass.crypto,
-                    asset_type=AssetType.crypto_currency,
-                    units=units,
-                    value_in_account_ccy=value,
-                    currency=self._account_ccy,
-                )
+                holdings[entry["asset"]] = units
+        spots = await self._crypto_market.async_get_spots(list(holdings), self._account_ccy)
+        for symbol, units in holdings.items():
+            yield Asset(
+                name=symbol,
+                type="cryptocurrency",
+                asset_class=AssetClass.crypto,
+                asset_type=AssetType.crypto_currency,
+                units=units,
+                value_in_account_ccy=units * spots[symbol],
+                currency=self._account_ccy,
+            )
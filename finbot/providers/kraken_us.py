@@ -1,12 +1,14 @@
+import asyncio
 from typing import Any, AsyncGenerator
 
 import krakenex
+from cachetools import TTLCache
 from pydantic import SecretStr
 
 from finbot.core.async_ import acollect, aexec
 from finbot.core.errors import FinbotError
 from finbot.core.schema import BaseModel, CurrencyCode
-from finbot.providers.base import ProviderBase
+from finbot.providers.base import ProviderBase, session_cached
 from finbot.providers.errors import AuthenticationError
 from finbot.providers.schema import (
     Account,
@@ -21,6 +23,10 @@ from finbot.providers.schema import (
 OWNERSHIP_UNITS_THRESHOLD = 0.00001
 KRAKEN_CASH_SYMBOL_PREFIX = "Z"
 KRAKEN_CRYPTOCURRENCY_SYMBOL_PREFIX = "X"
+KRAKEN_CROSS_CCY = "USD"
+LAST_PRICES_TTL = 60
+
+_LAST_PRICES_CACHE: TTLCache[tuple[str, str], float] = TTLCache(maxsize=10_000, ttl=LAST_PRICES_TTL)
 
 
 class Credentials(BaseModel):
@@ -45,6 +51,8 @@ def _demangle_symbol(symbol: str) -> str:
 class Api(ProviderBase):
     description = "Kraken (UK)"
     credentials_type = Credentials
+    concurrent_line_items = frozenset({"Accounts", "Assets"})
+    max_concurrent_line_items = 2
 
     def __init__(
         self,
@@ -68,37 +76,46 @@ class Api(ProviderBase):
 
     async def _iter_assets(self) -> AsyncGenerator[Asset]:
         price_fetcher = KrakenPriceFetcher(self._api)
+        results = (await self._get_balance())["result"]
+        holdings = {
+            symbol: float(units) for symbol, units in results.items() if float(units) > OWNERSHIP_UNITS_THRESHOLD
+        }
+        rates = await price_fetcher.get_last_prices(
+            [_demangle_symbol(symbol) for symbol in holdings if not _is_cash(symbol)],
+            self._account_ccy,
+        )
+        for symbol, units in holdings.items():
+            demangled_symbol = _demangle_symbol(symbol)
+            if _is_cash(symbol):
+                currency_code = CurrencyCode.validate(demangled_symbol)
+                yield Asset.cash(
+                    currency=currency_code,
+                    is_domestic=currency_code == self.user_account_currency,
+                    amount=units,
+                )
+            else:
+                yield Asset(
+                    name=demangled_symbol,
+                    type="cryptocurrency",  # deprecated
+                    asset_class=AssetClass.crypto,
+                    asset_type=AssetType.crypto_currency,
+                    units=units,
+                    value_in_account_ccy=units * rates[demangled_symbol],
+                    currency=self._account_ccy,
+                )
+
+    @session_cached
+    async def _get_balance(self) -> dict[str, Any]:
         assert self._api is not None
-        results = (await aexec(self._api.query_private, "Balance"))["result"]
-        for symbol, units in results.items():
-            units = float(units)
-            if units > OWNERSHIP_UNITS_THRESHOLD:
-                demangled_symbol = _demangle_symbol(symbol)
-                if _is_cash(symbol):
-                    currency_code = CurrencyCode.validate(demangled_symbol)
-                    yield Asset.cash(
-                        currency=currency_code,
-                        is_domestic=currency_code == self.user_account_currency,
-                        amount=units,
-                    )
-                else:
-                    rate = await price_fetcher.get_last_price(demangled_symbol, self._account_ccy)
-                    yield Asset(
-                        name=demangled_symbol,
-                        type="cryptocurrency",  # deprecated
-                        asset_class=AssetClass.crypto,
-                        asset_type=AssetType.crypto_currency,
-                        units=units,
-                        value_in_account_ccy=units * rate,
-                        currency=self._account_ccy,
-                    )
+        results: dict[str, Any] = await aexec(self._api.query_private, "Balance")
+        return results
 
     async def initialize(self) -> None:
         self._api = krakenex.API(
             key=self._credentials.api_key.get_secret_value(),
             secret=self._credentials.private_key.get_secret_value(),
         )
-        results = self._api.query_private("Balance")
+        results = await self._get_balance()
         if results["error"]:
             raise AuthenticationError(_format_error(results["error"]))
 
@@ -117,6 +134,13 @@ class Api(ProviderBase):
 
 
 class KrakenPriceFetcher(object):
+    """Last traded prices from the Kraken public Ticker endpoint.
+
+    All requested pairs are priced with a single Ticker call, pairs which are not
+    listed by Kraken are priced through a USD cross. Prices are shared across
+    fetchers on the same worker for `LAST_PRICES_TTL` seconds.
+    """
+
     class Error(FinbotError):
         pass
 
@@ -131,11 +155,84 @@ class KrakenPriceFetcher(object):
         source_crypto_asset: str,
         target_ccy: str,
     ) -> float:
-        if source_crypto_asset == target_ccy:
-            return 1.0
-        pair_str = f"{source_crypto_asset}/{target_ccy}"
-        pair = f"{source_crypto_asset}{target_ccy}"
-        results = await aexec(self.api.query_public, "Ticker", {"pair": pair})
-        if results["error"]:
-            raise KrakenPriceFetcher.Error(f"{pair_str} " + _format_error(results["error"]))
-        return float(results["result"][list(results["result"].keys())[0]]["c"][0])
+        return (await self.get_last_prices([source_crypto_asset], target_ccy))[source_crypto_asset]
+
+    async def get_last_prices(
+        self,
+        source_crypto_assets: list[str],
+        target_ccy: str,
+    ) -> dict[str, float]:
+        prices: dict[str, float] = {}
+        for asset in source_crypto_assets:
+            if asset == target_ccy:
+                prices[asset] = 1.0
+            elif (asset, target_ccy) in _LAST_PRICES_CACHE:
+                prices[asset] = _LAST_PRICES_CACHE[(asset, target_ccy)]
+        missing = [asset for asset in dict.fromkeys(source_crypto_assets) if asset not in prices]
+        if not missing:
+            return prices
+        direct_prices = await self._query_tickers([(asset, target_ccy) for asset in missing])
+        for asset in missing:
+            if (asset, target_ccy) in direct_prices:
+                prices[asset] = direct_prices[(asset, target_ccy)]
+        missing = [asset for asset in missing if asset not in prices]
+        if missing:
+            prices.update(await self._get_last_prices_via_usd(missing, target_ccy))
+        for asset in source_crypto_assets:
+            _LAST_PRICES_CACHE[(asset, target_ccy)] = prices[asset]
+        return prices
+
+    async def _get_last_prices_via_usd(
+        self,
+        source_crypto_assets: list[str],
+        target_ccy: str,
+    ) -> dict[str, float]:
+        usd_pairs = {asset: (asset, KRAKEN_CROSS_CCY) for asset in source_crypto_assets}
+        target_pair = (target_ccy, KRAKEN_CROSS_CCY)
+        usd_prices = (
+            await self._query_tickers(list(usd_pairs.values()) + [target_pair])
+            if target_ccy != KRAKEN_CROSS_CCY
+            else {}
+        )
+        unpriced = [asset for (asset, usd_pair) in usd_pairs.items() if usd_pair not in usd_prices]
+        if unpriced or target_pair not in usd_prices:
+            raise KrakenPriceFetcher.Error(
+                "no price for " + ", ".join(f"{asset}/{target_ccy}" for asset in (unpriced or source_crypto_assets))
+            )
+        return {asset: usd_prices[usd_pair] / usd_prices[target_pair] for (asset, usd_pair) in usd_pairs.items()}
+
+    async def _query_tickers(self, pairs: list[tuple[str, str]]) -> dict[tuple[str, str], float]:
+        """Query last prices for all pairs in a single Ticker call. Kraken rejects
+        the whole call when any pair is unknown, in which case pairs are queried
+        individually (and concurrently), unknown pairs are left out of the results.
+        """
+        results = await aexec(self.api.query_public, "Ticker", {"pair": ",".join(f"{a}{b}" for (a, b) in pairs)})
+        if not results["error"]:
+            return _match_ticker_results(pairs, results["result"])
+        if len(pairs) == 1:
+            return {}
+        prices: dict[tuple[str, str], float] = {}
+        for pair_prices in await asyncio.gather(*(self._query_tickers([pair]) for pair in pairs)):
+            prices.update(pair_prices)
+        return prices
+
+
+def _match_ticker_results(
+    pairs: list[tuple[str, str]],
+    ticker_results: dict[str, Any],
+) -> dict[tuple[str, str], float]:
+    # Ticker results are keyed by Kraken pair names, which may carry the legacy
+    # X (cryptocurrency) / Z (cash) prefixes, e.g. XBTEUR -> XXBTZEUR
+    prices: dict[tuple[str, str], float] = {}
+    for source, target in pairs:
+        for candidate in (
+            f"{source}{target}",
+            f"{KRAKEN_CRYPTOCURRENCY_SYMBOL_PREFIX}{source}{KRAKEN_CASH_SYMBOL_PREFIX}{target}",
+            f"{KRAKEN_CASH_SYMBOL_PREFIX}{source}{KRAKEN_CASH_SYMBOL_PREFIX}{target}",
+        ):
+            if candidate in ticker_results:
+                prices[(source, target)] = float(ticker_results[candidate]["c"][0])
+                break
+    if len(pairs) == 1 and not prices and len(ticker_results) == 1:
+        prices[pairs[0]] = float(next(iter(ticker_results.values()))["c"][0])
+    return prices
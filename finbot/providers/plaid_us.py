@@ -28,6 +28,8 @@ class Credentials(BaseModel):
 class Api(ProviderBase):
     description = "Plaid, Open Banking (US)"
     credentials_type = Credentials
+    concurrent_line_items = frozenset({"Accounts", "Assets", "Liabilities"})
+    max_concurrent_line_items = 3
 
     def __init__(
         self,
@@ -127,6 +127,9 @@ class ConditionGuard(object):
 
 
 class PlaywrightProviderBase(ProviderBase, ABC):
+    # All line items are driven through a single browser page
+    concurrent_line_items = frozenset()
+
     def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
         self._launcher: BrowserLauncher | None = None
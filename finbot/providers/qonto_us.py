@@ -7,7 +7,7 @@ from finbot.core import qonto_api
 from finbot.core.qonto_api import QontoApi, Unauthorized
 from finbot.core.schema import BaseModel, CurrencyCode
 from finbot.core.utils import some
-from finbot.providers.base import ProviderBase
+from finbot.providers.base import ProviderBase, session_cached
 from finbot.providers.errors import AuthenticationError
 from finbot.providers.schema import (
     Account,
@@ -37,6 +37,8 @@ class AccountValue:
 class Api(ProviderBase):
     description = "Qonto (US)"
     credentials_type = Credentials
+    concurrent_line_items = frozenset({"Accounts", "Assets", "Transactions"})
+    max_concurrent_line_items = 3
 
     def __init__(
         self,
@@ -55,7 +57,7 @@ class Api(ProviderBase):
             secret_key=self._credentials.secret_key.get_secret_value(),
         )
         try:
-            organization = (await self._api.list_organizations())[0]
+            organization = await self._get_organization()
         except Unauthorized as e:
             raise AuthenticationError(str(e)) from e
         self._accounts = [
@@ -72,6 +74,10 @@ class Api(ProviderBase):
             for entry in organization.bank_accounts
         ]
 
+    @session_cached
+    async def _get_organization(self) -> qonto_api.Organization:
+        return (await some(self._api).list_organizations())[0]
+
     async def get_accounts(self) -> list[Account]:
         return [entry.account for entry in some(self._accounts)]
 
@@ -94,7 +100,7 @@ class Api(ProviderBase):
 
     async def get_transactions(self, from_date: AwareDatetime | None = None) -> Transactions:
         api = some(self._api)
-        organization = (await api.list_organizations())[0]
+        organization = await self._get_organization()
         all_transactions: list[Transaction] = []
         for bank_account in organization.bank_accounts:
             account_transactions: list[qonto_api.Transaction] = await api.list_transactions(
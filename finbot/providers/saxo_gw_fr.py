@@ -31,6 +31,8 @@ class Credentials(BaseModel):
 class Api(ProviderBase):
     description = "Saxo OpenAPI Gateway (FR)"
     credentials_type = Credentials
+    concurrent_line_items = frozenset({"Accounts", "Assets", "Transactions"})
+    max_concurrent_line_items = 3
 
     def __init__(
         self,
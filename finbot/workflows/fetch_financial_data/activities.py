@@ -1,3 +1,5 @@
+import asyncio
+
 from temporalio import activity
 
 from finbot.workflows.fetch_financial_data import schema
@@ -19,3 +21,25 @@ async def validate_credentials(
     from finbot.workflows.fetch_financial_data.service import FinancialDataFetcherService
 
     return await FinancialDataFetcherService().validate_credentials(request)
+
+
+@activity.defn(name="get_financial_data_claim_check")
+async def get_financial_data_claim_check(
+    request: schema.GetFinancialDataRequest,
+) -> schema.StoredFinancialDataRef:
+    """Same as `get_financial_data`, but the response is written to the blob store
+    and only a reference to it is returned (claim check)
+    """
+    from finbot.workflows.fetch_financial_data.claim_check import store_financial_data
+    from finbot.workflows.fetch_financial_data.service import FinancialDataFetcherService
+
+    response = await FinancialDataFetcherService().get_financial_data(request)
+    return await asyncio.to_thread(store_financial_data, response)
+
+
+@activity.defn(name="delete_expired_financial_data")
+def delete_expired_financial_data() -> int:
+    """Sweep the claim checks blobs orphaned by failed or abandoned workflows"""
+    from finbot.workflows.fetch_financial_data import claim_check
+
+    return claim_check.delete_expired_financial_data()
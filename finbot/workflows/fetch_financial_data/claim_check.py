@@ -0,0 +1,112 @@
+import zlib
+from datetime import timedelta
+from typing import Generator, Iterable
+
+from finbot.core.blob_store import BlobStore, get_blob_store
+from finbot.workflows.fetch_financial_data import schema
+
+# Line items results are written one per line, prefixed by their line item name,
+# so that readers only parse the results they are interested in.
+LINE_ITEM_SEPARATOR = b"\t"
+
+LineItemResultsType = (
+    type[schema.AccountsResults]
+    | type[schema.AssetsResults]
+    | type[schema.LiabilitiesResults]
+    | type[schema.TransactionsResults]
+)
+
+# Stored data is deleted once the snapshot is built (or failed to build), the blobs
+# orphaned by abandoned or timed out workflows are swept after this delay.
+STORED_FINANCIAL_DATA_TTL = timedelta(days=1)
+
+RESULTS_TYPES: dict[schema.LineItem, LineItemResultsType] = {
+    schema.LineItem.Accounts: schema.AccountsResults,
+    schema.LineItem.Assets: schema.AssetsResults,
+    schema.LineItem.Liabilities: schema.LiabilitiesResults,
+    schema.LineItem.Transactions: schema.TransactionsResults,
+}
+
+
+def store_financial_data(
+    response: schema.GetFinancialDataResponse,
+    blob_store: BlobStore | None = None,
+) -> schema.StoredFinancialDataRef:
+    blob_store = blob_store or get_blob_store()
+    results = [entry for entry in response.financial_data if not isinstance(entry, schema.LineItemError)]
+    return schema.StoredFinancialDataRef(
+        blob_key=blob_store.put(_compress(_iter_serialized_results(results))),
+        line_items_errors=[entry for entry in response.financial_data if isinstance(entry, schema.LineItemError)],
+        error=response.error,
+        upstream_calls_saved=response.upstream_calls_saved,
+    )
+
+
+def iter_stored_financial_data(
+    ref: schema.StoredFinancialDataRef,
+    line_items: Iterable[schema.LineItem],
+    blob_store: BlobStore | None = None,
+) -> Generator[schema.LineItemResults, None, None]:
+    """Stream (decompress and parse) the stored results of the requested line items"""
+    blob_store = blob_store or get_blob_store()
+    prefixes = {line_item.value.encode(): RESULTS_TYPES[line_item] for line_item in line_items}
+    for line in _iter_lines(_decompress(blob_store.iter_chunks(ref.blob_key))):
+        prefix, _, payload = line.partition(LINE_ITEM_SEPARATOR)
+        if results_type := prefixes.get(prefix):
+            yield results_type.model_validate_json(payload)
+
+
+def load_stored_financial_data(
+    ref: schema.StoredFinancialDataRef,
+    blob_store: BlobStore | None = None,
+) -> schema.GetFinancialDataResponse:
+    """Read back the full response in a single pass over the stored blob"""
+    results = iter_stored_financial_data(ref, RESULTS_TYPES.keys(), blob_store)
+    return schema.GetFinancialDataResponse(
+        financial_data=[*results, *ref.line_items_errors],
+        error=ref.error,
+        upstream_calls_saved=ref.upstream_calls_saved,
+    )
+
+
+def delete_stored_financial_data(
+    ref: schema.StoredFinancialDataRef,
+    blob_store: BlobStore | None = None,
+) -> None:
+    (blob_store or get_blob_store()).delete(ref.blob_key)
+
+
+def delete_expired_financial_data(blob_store: BlobStore | None = None) -> int:
+    return (blob_store or get_blob_store()).delete_older_than(STORED_FINANCIAL_DATA_TTL)
+
+
+def _iter_serialized_results(results: Iterable[schema.LineItemResults]) -> Generator[bytes, None, None]:
+    for entry in results:
+        yield entry.line_item.value.encode() + LINE_ITEM_SEPARATOR + entry.model_dump_json().encode() + b"\n"
+
+
+def _compress(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    compressor = zlib.compressobj()
+    for chunk in chunks:
+        yield compressor.compress(chunk)
+    yield compressor.flush()
+
+
+def _decompress(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    decompressor = zlib.decompressobj()
+    for chunk in chunks:
+        yield decompressor.decompress(chunk)
+    yield decompressor.flush()
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    pending: list[bytes] = []
+    for chunk in chunks:
+        lines = chunk.split(b"\n")
+        if len(lines) > 1:
+            yield b"".join(pending) + lines[0]
+            yield from lines[1:-1]
+            pending = []
+        pending.append(lines[-1])
+    if last_line := b"".join(pending):
+        yield last_line
@@ -64,3 +64,16 @@ class GetFinancialDataRequest(BaseModel):
 class GetFinancialDataResponse(BaseModel):
     financial_data: list[LineItemResults]
     error: ApplicationErrorData | None = None
+    upstream_calls_saved: int = 0
+
+
+class StoredFinancialDataRef(BaseModel):
+    """Claim check for a `GetFinancialDataResponse` written to the blob store:
+    only errors and metadata go through the workflow history, line items results
+    are streamed back from the blob store when needed.
+    """
+
+    blob_key: str
+    line_items_errors: list[LineItemError] = []
+    error: ApplicationErrorData | None = None
+    upstream_calls_saved: int = 0
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Any, cast
 
@@ -67,12 +68,51 @@ async def get_financial_data_impl(
 ) -> schema.GetFinancialDataResponse:
     async with provider_type.create(authentication_payload, user_account_currency) as provider_api:
         await provider_api.initialize()
+        financial_data = await fetch_line_items(
+            list(dict.fromkeys(line_items)),
+            provider_api,
+            transactions_from_date=transactions_from_date,
+        )
+        session_cache = provider_api.session_cache
+        logger.debug(
+            f"provider session cache: upstream_calls={session_cache.upstream_calls}"
+            f" saved_calls={session_cache.saved_calls}"
+        )
         return schema.GetFinancialDataResponse(
-            financial_data=[
-                await item_handler(line_item, provider_api, transactions_from_date=transactions_from_date)
-                for line_item in set(line_items)
-            ]
+            financial_data=financial_data,
+            upstream_calls_saved=session_cache.saved_calls,
+        )
+
+
+async def fetch_line_items(
+    line_items: list[schema.LineItem],
+    provider_api: ProviderBase,
+    transactions_from_date: AwareDatetime | None = None,
+) -> list[schema.LineItemResults]:
+    """Fetch line items from an initialized provider, results are returned in the
+    order of `line_items`.
+
+    Line items the provider declares as concurrent are fetched together (up to the
+    provider's `max_concurrent_line_items` at a time), the others are then fetched
+    one after another.
+    """
+    concurrent_items = [item for item in line_items if provider_api.supports_concurrent_line_item(item.value)]
+    sequential_items = [item for item in line_items if item not in concurrent_items]
+    semaphore = asyncio.Semaphore(provider_api.max_concurrent_line_items)
+
+    async def bounded_item_handler(item_type: schema.LineItem) -> schema.LineItemResults:
+        async with semaphore:
+            return await item_handler(item_type, provider_api, transactions_from_date=transactions_from_date)
+
+    results: dict[schema.LineItem, schema.LineItemResults] = dict(
+        zip(
+            concurrent_items,
+            await asyncio.gather(*(bounded_item_handler(item) for item in concurrent_items)),
         )
+    )
+    for item_type in sequential_items:
+        results[item_type] = await item_handler(item_type, provider_api, transactions_from_date=transactions_from_date)
+    return [results[item_type] for item_type in line_items]
 
 
 class FinancialDataFetcherService:
@@ -37,3 +37,16 @@ class GetFinancialDataWorkflow:
             retry_policy=TRY_ONCE,
             start_to_close_timeout=timedelta(minutes=2),
         )
+
+
+@workflow.defn(name="delete_expired_financial_data")
+class DeleteExpiredFinancialDataWorkflow:
+    @workflow.run
+    async def run(self) -> int:
+        from finbot.workflows.fetch_financial_data.activities import delete_expired_financial_data
+
+        return await workflow.execute_activity(
+            delete_expired_financial_data,
+            retry_policy=TRY_ONCE,
+            start_to_close_timeout=timedelta(minutes=5),
+        )
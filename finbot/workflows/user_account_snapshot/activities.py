@@ -50,9 +50,20 @@ def build_and_persist_final_snapshot(
     from finbot.workflows.user_account_snapshot import impl
 
     with ScopedSession() as db_session:
-        return impl.build_and_persist_final_snapshot(
+        summary = impl.build_and_persist_final_snapshot(
             user_account=impl.load_user_account(request.snapshot_meta.user_account_id, db_session),
             new_snapshot=some(db_session.query(UserAccountSnapshot).get(request.snapshot_meta.id)),
             raw_snapshot=request.raw_snapshot,
             db_session=db_session,
         )
+    impl.delete_stored_snapshot_data(request.raw_snapshot)
+    return summary
+
+
+@activity.defn(name="delete_stored_snapshot_data")
+def delete_stored_snapshot_data(
+    raw_snapshot: list[schema.LinkedAccountSnapshotResponse],
+) -> None:
+    from finbot.workflows.user_account_snapshot import impl
+
+    impl.delete_stored_snapshot_data(raw_snapshot)
@@ -16,6 +16,7 @@ from finbot.core.serialization import serialize
 from finbot.core.utils import some
 from finbot.model import PersistScope, SessionType
 from finbot.providers import schema as providers_schema
+from finbot.workflows.fetch_financial_data import claim_check
 from finbot.workflows.fetch_financial_data import schema as finbotwsrv_schema
 from finbot.workflows.user_account_snapshot import schema
 
@@ -57,41 +58,40 @@ class LinkedAccountSnapshotWrapper:
         self,
         snapshot: schema.LinkedAccountSnapshotResponse,
     ) -> None:
+        if isinstance(snapshot.snapshot_data, finbotwsrv_schema.StoredFinancialDataRef):
+            raise ValueError("stored snapshot data must be loaded first (see load_stored_snapshot_data)")
         self.snapshot = snapshot
-        self.snapshot_data = snapshot.snapshot_data
+        self.snapshot_data: finbotwsrv_schema.GetFinancialDataResponse | ApplicationErrorData = snapshot.snapshot_data
         self.linked_account_id = snapshot.request.linked_account_id
 
     def iter_errors(
         self,
     ) -> Generator[SnapshotErrorEntry, None, None]:
-        if isinstance(self.snapshot_data, finbotwsrv_schema.GetFinancialDataResponse) and self.snapshot_data.error:
-            yield SnapshotErrorEntry(scope="linked_account", error=self.snapshot_data.error)
-            return
-        elif isinstance(self.snapshot_data, ApplicationErrorData):
+        if isinstance(self.snapshot_data, ApplicationErrorData):
             yield SnapshotErrorEntry(scope="linked_account", error=self.snapshot_data)
             return
-        for entry in self.snapshot_data.financial_data:
-            if isinstance(entry, finbotwsrv_schema.LineItemError):
-                yield SnapshotErrorEntry(
-                    scope=f"linked_account.{entry.line_item.name}",
-                    error=entry.error,
-                )
+        if self.snapshot_data.error:
+            yield SnapshotErrorEntry(scope="linked_account", error=self.snapshot_data.error)
+            return
+        for entry in self._iter_line_items_errors():
+            yield SnapshotErrorEntry(
+                scope=f"linked_account.{entry.line_item.name}",
+                error=entry.error,
+            )
 
     def iter_sub_accounts(
         self,
     ) -> Generator[providers_schema.Account, None, None]:
-        if isinstance(self.snapshot_data, ApplicationErrorData):
-            return
-        for snapshot_entry in self.snapshot_data.financial_data:
+        for snapshot_entry in self._iter_line_items_results(finbotwsrv_schema.LineItem.Accounts):
             if isinstance(snapshot_entry, finbotwsrv_schema.AccountsResults):
                 yield from iter(snapshot_entry.results)
 
     def iter_sub_accounts_items_entries(
         self,
     ) -> Generator[providers_schema.AssetsEntry | providers_schema.LiabilitiesEntry, None, None]:
-        if isinstance(self.snapshot_data, ApplicationErrorData):
-            return
-        for snapshot_entry in self.snapshot_data.financial_data:
+        for snapshot_entry in self._iter_line_items_results(
+            finbotwsrv_schema.LineItem.Assets, finbotwsrv_schema.LineItem.Liabilities
+        ):
             if isinstance(snapshot_entry, (finbotwsrv_schema.AssetsResults, finbotwsrv_schema.LiabilitiesResults)):
                 for result_entry in snapshot_entry.results:
                     yield result_entry
@@ -99,12 +99,24 @@ class LinkedAccountSnapshotWrapper:
     def iter_transactions(
         self,
     ) -> Generator[providers_schema.Transaction, None, None]:
-        if isinstance(self.snapshot_data, ApplicationErrorData):
-            return
-        for entry in self.snapshot_data.financial_data:
+        for entry in self._iter_line_items_results(finbotwsrv_schema.LineItem.Transactions):
             if isinstance(entry, finbotwsrv_schema.TransactionsResults):
                 yield from entry.results
 
+    def _iter_line_items_errors(self) -> Generator[finbotwsrv_schema.LineItemError, None, None]:
+        if isinstance(self.snapshot_data, finbotwsrv_schema.GetFinancialDataResponse):
+            for entry in self.snapshot_data.financial_data:
+                if isinstance(entry, finbotwsrv_schema.LineItemError):
+                    yield entry
+
+    def _iter_line_items_results(
+        self, *line_items: finbotwsrv_schema.LineItem
+    ) -> Generator[finbotwsrv_schema.LineItemResults, None, None]:
+        if isinstance(self.snapshot_data, finbotwsrv_schema.GetFinancialDataResponse):
+            for entry in self.snapshot_data.financial_data:
+                if not isinstance(entry, finbotwsrv_schema.LineItemError) and entry.line_item in line_items:
+                    yield entry
+
 
 def collect_transaction_xccys(
     raw_snapshot: list[schema.LinkedAccountSnapshotResponse],
@@ -118,6 +130,37 @@ def collect_transaction_xccys(
                 xccys.add(fx_market.Xccy(domestic=txn.currency, foreign=target_ccy))
 
 
+def count_upstream_calls_saved(raw_snapshot: list[schema.LinkedAccountSnapshotResponse]) -> int:
+    return sum(
+        entry.snapshot_data.upstream_calls_saved
+        for entry in raw_snapshot
+        if not isinstance(entry.snapshot_data, ApplicationErrorData)
+    )
+
+
+def load_stored_snapshot_data(
+    raw_snapshot: list[schema.LinkedAccountSnapshotResponse],
+) -> list[schema.LinkedAccountSnapshotResponse]:
+    """Read back the snapshot data stored as a claim check, once per linked account,
+    so that the successive passes over the raw snapshot do not decode it again
+    """
+    return [
+        entry.model_copy(update={"snapshot_data": claim_check.load_stored_financial_data(entry.snapshot_data)})
+        if isinstance(entry.snapshot_data, finbotwsrv_schema.StoredFinancialDataRef)
+        else entry
+        for entry in raw_snapshot
+    ]
+
+
+def delete_stored_snapshot_data(raw_snapshot: list[schema.LinkedAccountSnapshotResponse]) -> None:
+    for entry in raw_snapshot:
+        if isinstance(entry.snapshot_data, finbotwsrv_schema.StoredFinancialDataRef):
+            try:
+                claim_check.delete_stored_financial_data(entry.snapshot_data)
+            except Exception:
+                logger.exception(f"failed to delete stored snapshot data blob_key={entry.snapshot_data.blob_key}")
+
+
 def visit_snapshot_tree(
     raw_snapshot: list[schema.LinkedAccountSnapshotResponse],
     visitor: SnapshotTreeVisitor,
@@ -418,6 +461,11 @@ def build_and_persist_final_snapshot(
     db_session: SessionType,
 ) -> schema.SnapshotSummary:
     persist_scope = PersistScope(db_session)
+    raw_snapshot = load_stored_snapshot_data(raw_snapshot)
+    logger.info(
+        f"provider session caches saved {count_upstream_calls_saved(raw_snapshot)} upstream calls"
+        f" for snapshot_id={new_snapshot.id}"
+    )
     xccy_collector = XccyCollector(core_schema.CurrencyCode(new_snapshot.requested_ccy))
     visit_snapshot_tree(raw_snapshot, xccy_collector)
     collect_transaction_xccys(raw_snapshot, core_schema.CurrencyCode(new_snapshot.requested_ccy), xccy_collector.xccys)
@@ -4,7 +4,7 @@ from pydantic import AwareDatetime
 
 from finbot.core.schema import ApplicationErrorData, BaseModel, CurrencyCode, LinkedAccountId
 from finbot.providers.schema import ProviderId
-from finbot.workflows.fetch_financial_data.schema import GetFinancialDataResponse, LineItem
+from finbot.workflows.fetch_financial_data.schema import GetFinancialDataResponse, LineItem, StoredFinancialDataRef
 
 DEFAULT_MAX_LINKED_ACCOUNT_SNAPSHOT_RETRIES = 3
 DEFAULT_SNAPSHOT_TIMEOUT = timedelta(minutes=10)
@@ -52,12 +52,13 @@ class LinkedAccountSnapshotRequest(BaseModel):
 
 class LinkedAccountSnapshotResponse(BaseModel):
     request: LinkedAccountSnapshotRequest
-    snapshot_data: GetFinancialDataResponse | ApplicationErrorData
+    snapshot_data: GetFinancialDataResponse | StoredFinancialDataRef | ApplicationErrorData
 
 
 class TakeRawSnapshotRequest(BaseModel):
     user_account_id: int
     linked_account_ids: list[LinkedAccountId] | None
+    claim_check: bool = True
 
 
 class TakeRawSnapshotResponse(BaseModel):
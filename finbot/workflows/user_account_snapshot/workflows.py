@@ -31,29 +31,49 @@ class TakeUserAccountRawSnapshotWorkflow:
             retry_policy=TRY_ONCE,
             start_to_close_timeout=timedelta(seconds=5.0),
         )
+        # runs started before the claim check was introduced replay the inline activity
+        claim_check = request.claim_check and workflow.patched("claim-check")
         results: list[LinkedAccountSnapshotResponse] = await asyncio.gather(
-            *[self.snapshot_linked_account(request) for request in requests]
+            *[self.snapshot_linked_account(linked_account_request, claim_check) for linked_account_request in requests]
         )
         return TakeRawSnapshotResponse(entries=results)
 
     @classmethod
-    async def snapshot_linked_account(cls, request: LinkedAccountSnapshotRequest) -> LinkedAccountSnapshotResponse:
-        from finbot.workflows.fetch_financial_data.activities import get_financial_data
-        from finbot.workflows.fetch_financial_data.schema import GetFinancialDataRequest
+    async def snapshot_linked_account(
+        cls,
+        request: LinkedAccountSnapshotRequest,
+        claim_check: bool,
+    ) -> LinkedAccountSnapshotResponse:
+        from finbot.workflows.fetch_financial_data.activities import get_financial_data, get_financial_data_claim_check
+        from finbot.workflows.fetch_financial_data.schema import (
+            GetFinancialDataRequest,
+            GetFinancialDataResponse,
+            StoredFinancialDataRef,
+        )
 
+        financial_data_request = GetFinancialDataRequest(
+            provider_id=request.provider_id,
+            encrypted_credentials=request.encrypted_credentials,
+            items=request.line_items,
+            user_account_currency=request.user_account_currency,
+            transactions_from_date=request.transactions_from_date,
+        )
         try:
-            snapshot_data = await workflow.execute_activity(
-                get_financial_data,
-                GetFinancialDataRequest(
-                    provider_id=request.provider_id,
-                    encrypted_credentials=request.encrypted_credentials,
-                    items=request.line_items,
-                    user_account_currency=request.user_account_currency,
-                    transactions_from_date=request.transactions_from_date,
-                ),
-                retry_policy=TRY_ONCE,
-                start_to_close_timeout=request.timeout,
-            )
+            snapshot_data: GetFinancialDataResponse | StoredFinancialDataRef
+            if claim_check:
+                snapshot_data = await workflow.execute_activity(
+                    get_financial_data_claim_check,
+                    financial_data_request,
+                    retry_policy=TRY_ONCE,
+                    start_to_close_timeout=request.timeout,
+                )
+            else:
+                snapshot_data = await workflow.execute_activity(
+                    get_financial_data,
+                    financial_data_request,
+                    retry_policy=TRY_ONCE,
+                    start_to_close_timeout=request.timeout,
+                )
         except Exception as e:
             workflow.logger.exception(f"Failed to take snapshot of account {request.linked_account_id}")
             return LinkedAccountSnapshotResponse(request=request, snapshot_data=ApplicationErrorData.from_exception(e))
@@ -75,6 +95,7 @@ class TakeUserAccountSnapshotWorkflow:
             BuildAndPersistFinalSnapshotActivityRequest,
             build_and_persist_final_snapshot,
             create_empty_snapshot,
+            delete_stored_snapshot_data,
         )
 
         new_snapshot_meta: SnapshotMetadata = await workflow.execute_activity(
@@ -92,14 +113,25 @@ class TakeUserAccountSnapshotWorkflow:
             retry_policy=TRY_ONCE,
             task_timeout=request.timeout,
         )
-        return TakeSnapshotResponse(
-            snapshot=await workflow.execute_activity(
-                build_and_persist_final_snapshot,
-                BuildAndPersistFinalSnapshotActivityRequest(
-                    snapshot_meta=new_snapshot_meta,
-                    raw_snapshot=raw_snapshot.entries,
-                ),
-                retry_policy=TRY_ONCE,
-                start_to_close_timeout=timedelta(seconds=60.0),
+        try:
+            return TakeSnapshotResponse(
+                snapshot=await workflow.execute_activity(
+                    build_and_persist_final_snapshot,
+                    BuildAndPersistFinalSnapshotActivityRequest(
+                        snapshot_meta=new_snapshot_meta,
+                        raw_snapshot=raw_snapshot.entries,
+                    ),
+                    retry_policy=TRY_ONCE,
+                    start_to_close_timeout=timedelta(seconds=60.0),
+                )
             )
-        )
+        except Exception:
+            # the stored snapshot data is only deleted by the build activity on success
+            if workflow.patched("delete-stored-snapshot-data-on-failure"):
+                await workflow.execute_activity(
+                    delete_stored_snapshot_data,
+                    raw_snapshot.entries,
+                    retry_policy=TRY_ONCE,
+                    start_to_close_timeout=timedelta(seconds=30.0),
+                )
+            raise
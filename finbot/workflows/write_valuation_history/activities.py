@@ -1,7 +1,12 @@
+from typing import TYPE_CHECKING
+
 from temporalio import activity
 
 from finbot.workflows.write_valuation_history import schema
 
+if TYPE_CHECKING:
+    from finbot.workflows.write_valuation_history import post_processing
+
 
 @activity.defn(name="write_history")
 def write_history(
@@ -12,3 +17,59 @@ def write_history(
 
     with ScopedSession() as session:
         return ValuationHistoryWriterService(session).write_history(request)
+
+
+@activity.defn(name="consolidate_transactions")
+def consolidate_transactions(
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.workflows.write_valuation_history import post_processing
+
+    return _run_post_processing_stage(post_processing.consolidate_transactions, request)
+
+
+@activity.defn(name="enrich_merchants")
+def enrich_merchants(
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.workflows.write_valuation_history import post_processing
+
+    return _run_post_processing_stage(post_processing.enrich_merchants, request)
+
+
+@activity.defn(name="categorize_transactions")
+def categorize_transactions(
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.workflows.write_valuation_history import post_processing
+
+    return _run_post_processing_stage(post_processing.categorize_transactions, request)
+
+
+@activity.defn(name="match_transactions")
+def match_transactions(
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.workflows.write_valuation_history import post_processing
+
+    return _run_post_processing_stage(post_processing.match_transactions, request)
+
+
+@activity.defn(name="detect_recurring_transactions")
+def detect_recurring_transactions(
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.workflows.write_valuation_history import post_processing
+
+    return _run_post_processing_stage(post_processing.detect_recurring_transactions, request)
+
+
+def _run_post_processing_stage(
+    stage: "post_processing.StageType",
+    request: schema.PostProcessingStageRequest,
+) -> schema.PostProcessingStageReport:
+    from finbot.model import ScopedSession
+    from finbot.workflows.write_valuation_history.post_processing import run_stage
+
+    with ScopedSession() as session:
+        return run_stage(stage, request, session)
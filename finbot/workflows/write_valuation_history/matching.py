@@ -1,11 +1,21 @@
 import asyncio
 import json
 import logging
-from datetime import timedelta
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query
 
 from finbot import model
 from finbot.model import SessionType
+from finbot.model import repository as model_repository
+
+if TYPE_CHECKING:
+    from finbot.core.llm_gateway import LLMGateway
 
 logger = logging.getLogger(__name__)
 
@@ -14,14 +24,22 @@ INFLOW_TYPES = {"transfer_in", "deposit"}
 CANONICAL_PAIRS = {("transfer_out", "transfer_in"), ("transfer_in", "transfer_out")}
 MAX_DATE_DIFF = timedelta(days=7)
 AMOUNT_TOLERANCE = Decimal("0.01")
+SEED_WINDOWS_PER_QUERY = 200
 
 # Type alias for a scored candidate: (confidence, date_diff_secs, outflow, inflow)
 Candidate = tuple[Decimal, float, model.TransactionHistoryEntry, model.TransactionHistoryEntry]
 
+# Type alias for an inflow in its amount bucket: (transaction_date, position, abs amount, inflow)
+BucketedInflow = tuple[datetime, int, Decimal, model.TransactionHistoryEntry]
+
+# Type alias for preloaded linked account names: linked_account_id -> account_name
+LinkedAccountNames = dict[int, str | None]
+
 
 def _compute_confidence(
     outflow: model.TransactionHistoryEntry,
     inflow: model.TransactionHistoryEntry,
+    account_names: LinkedAccountNames,
 ) -> Decimal:
     score = Decimal("0.50")
     date_diff = abs((outflow.transaction_date - inflow.transaction_date).total_seconds())
@@ -31,17 +49,13 @@ def _compute_confidence(
         score += Decimal("0.15")
     if (outflow.transaction_type, inflow.transaction_type) in CANONICAL_PAIRS:
         score += Decimal("0.10")
-    if outflow.counterparty and inflow.linked_account:
-        if (
-            inflow.linked_account.account_name
-            and outflow.counterparty.lower() in inflow.linked_account.account_name.lower()
-        ):
+    inflow_account_name = account_names.get(inflow.linked_account_id)
+    if outflow.counterparty and inflow_account_name:
+        if outflow.counterparty.lower() in inflow_account_name.lower():
             score += Decimal("0.05")
-    if inflow.counterparty and outflow.linked_account:
-        if (
-            outflow.linked_account.account_name
-            and inflow.counterparty.lower() in outflow.linked_account.account_name.lower()
-        ):
+    outflow_account_name = account_names.get(outflow.linked_account_id)
+    if inflow.counterparty and outflow_account_name:
+        if inflow.counterparty.lower() in outflow_account_name.lower():
             score += Decimal("0.05")
     return min(score, Decimal("1.00"))
 
@@ -49,33 +63,64 @@ def _compute_confidence(
 def _build_candidates(
     outflows: list[model.TransactionHistoryEntry],
     inflows: list[model.TransactionHistoryEntry],
+    account_names: LinkedAccountNames,
 ) -> list[Candidate]:
+    """Score all (outflow, inflow) pairs within the amount and date tolerances.
+
+    Inflows are grouped in amount buckets (of the amount tolerance width) and
+    sorted by date within each bucket, once. The inflows of each outflow are then
+    found by bisecting on dates in the (at most three) buckets overlapping its
+    amount tolerance window, rather than comparing every outflow with every inflow.
+    """
+    inflows_by_bucket: dict[int, list[BucketedInflow]] = defaultdict(list)
+    for position, in_txn in enumerate(inflows):
+        if in_txn.amount_snapshot_ccy is not None:
+            in_amount = abs(in_txn.amount_snapshot_ccy)
+            inflows_by_bucket[_get_amount_bucket(in_amount)].append(
+                (in_txn.transaction_date, position, in_amount, in_txn)
+            )
+    buckets: dict[int, tuple[list[datetime], list[BucketedInflow]]] = {}
+    for bucket, entries in inflows_by_bucket.items():
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        buckets[bucket] = ([entry[0] for entry in entries], entries)
+
     candidates: list[Candidate] = []
     for out_txn in outflows:
-        for in_txn in inflows:
+        if out_txn.amount_snapshot_ccy is None:
+            continue
+        out_amount = abs(out_txn.amount_snapshot_ccy)
+        window: list[BucketedInflow] = []
+        for bucket in range(
+            _get_amount_bucket(out_amount - AMOUNT_TOLERANCE),
+            _get_amount_bucket(out_amount + AMOUNT_TOLERANCE) + 1,
+        ):
+            if bucket not in buckets:
+                continue
+            dates, entries = buckets[bucket]
+            lower = bisect_left(dates, out_txn.transaction_date - MAX_DATE_DIFF)
+            upper = bisect_right(dates, out_txn.transaction_date + MAX_DATE_DIFF)
+            window.extend(entry for entry in entries[lower:upper] if abs(entry[2] - out_amount) <= AMOUNT_TOLERANCE)
+        # inflows are visited in their original order, so that tied candidates keep their order
+        for _, _, _, in_txn in sorted(window, key=lambda entry: entry[1]):
             if (
                 out_txn.linked_account_id == in_txn.linked_account_id
                 and out_txn.sub_account_id == in_txn.sub_account_id
             ):
                 continue
-            out_amount = abs(out_txn.amount_snapshot_ccy) if out_txn.amount_snapshot_ccy is not None else None
-            in_amount = abs(in_txn.amount_snapshot_ccy) if in_txn.amount_snapshot_ccy is not None else None
-            if out_amount is None or in_amount is None:
-                continue
-            if abs(out_amount - in_amount) > AMOUNT_TOLERANCE:
-                continue
             date_diff = abs(out_txn.transaction_date - in_txn.transaction_date)
-            if date_diff > MAX_DATE_DIFF:
-                continue
-            confidence = _compute_confidence(out_txn, in_txn)
+            confidence = _compute_confidence(out_txn, in_txn, account_names)
             candidates.append((confidence, date_diff.total_seconds(), out_txn, in_txn))
     candidates.sort(key=lambda c: (-c[0], c[1]))
     return candidates
 
 
+def _get_amount_bucket(amount: Decimal) -> int:
+    return int(amount // AMOUNT_TOLERANCE)
+
+
 def _find_tied_candidates(
     current: Candidate,
-    candidates: list[Candidate],
+    candidates_by_score: dict[tuple[Decimal, float], list[Candidate]],
     matched_outflow_ids: set[int],
     matched_inflow_ids: set[int],
 ) -> list[Candidate]:
@@ -84,10 +129,8 @@ def _find_tied_candidates(
     confidence, date_diff_secs, out_txn, in_txn = current
     return [
         c
-        for c in candidates
+        for c in candidates_by_score[(confidence, date_diff_secs)]
         if c != current
-        and c[0] == confidence
-        and c[1] == date_diff_secs
         and (c[2].id == out_txn.id or c[3].id == in_txn.id)
         and c[2].id not in matched_outflow_ids
         and c[3].id not in matched_inflow_ids
@@ -154,6 +197,9 @@ def _resolve_with_greedy(
     new_matches: list[model.TransactionMatch] = []
     raw_ambiguous_groups: list[list[Candidate]] = []
     seen_ambiguous: set[int] = set()  # outflow/inflow IDs already in an ambiguous group
+    candidates_by_score: dict[tuple[Decimal, float], list[Candidate]] = defaultdict(list)
+    for candidate in candidates:
+        candidates_by_score[(candidate[0], candidate[1])].append(candidate)
 
     for candidate in candidates:
         confidence, date_diff_secs, out_txn, in_txn = candidate
@@ -168,7 +214,7 @@ def _resolve_with_greedy(
             seen_ambiguous.add(in_txn.id)
             continue
 
-        tied = _find_tied_candidates(candidate, candidates, matched_outflow_ids, matched_inflow_ids)
+        tied = _find_tied_candidates(candidate, candidates_by_score, matched_outflow_ids, matched_inflow_ids)
         if tied:
             group = [candidate] + tied
             outflow_ids = {c[2].id for c in group}
@@ -199,24 +245,25 @@ def _resolve_with_greedy(
 def _resolve_ambiguous_with_llm(
     ambiguous_groups: list[list[Candidate]],
     user_account_id: int,
+    account_names: LinkedAccountNames,
 ) -> list[model.TransactionMatch]:
     """Use an LLM to disambiguate tied candidate groups."""
-    from finbot.core.environment import get_openai_api_key
+    from finbot.core.llm_gateway import get_llm_gateway
 
-    api_key = get_openai_api_key()
-    if not api_key:
+    gateway = get_llm_gateway()
+    if gateway is None:
         logger.info("FINBOT_OPENAI_API_KEY not set, skipping LLM match disambiguation")
         return []
 
-    return asyncio.run(_resolve_ambiguous_with_llm_async(ambiguous_groups, user_account_id, api_key))
+    return asyncio.run(_resolve_ambiguous_with_llm_async(ambiguous_groups, user_account_id, account_names, gateway))
 
 
 async def _resolve_ambiguous_with_llm_async(
     ambiguous_groups: list[list[Candidate]],
     user_account_id: int,
-    api_key: str,
+    account_names: LinkedAccountNames,
+    gateway: "LLMGateway",
 ) -> list[model.TransactionMatch]:
-    from openai import AsyncOpenAI
     from pydantic import BaseModel
 
     class MatchPair(BaseModel):
@@ -226,7 +273,6 @@ async def _resolve_ambiguous_with_llm_async(
     class DisambiguationResponse(BaseModel):
         matches: list[MatchPair]
 
-    client = AsyncOpenAI(api_key=api_key)
     all_matches: list[model.TransactionMatch] = []
 
     for group in ambiguous_groups:
@@ -247,7 +293,7 @@ async def _resolve_ambiguous_with_llm_async(
                 "amount": float(txn.amount),
                 "currency": txn.currency,
                 "description": txn.description,
-                "account": txn.linked_account.account_name if txn.linked_account else None,
+                "account": account_names.get(txn.linked_account_id),
                 "sub_account": txn.sub_account_id,
             }
             for txn in outflows_by_id.values()
@@ -260,7 +306,7 @@ async def _resolve_ambiguous_with_llm_async(
                 "amount": float(txn.amount),
                 "currency": txn.currency,
                 "description": txn.description,
-                "account": txn.linked_account.account_name if txn.linked_account else None,
+                "account": account_names.get(txn.linked_account_id),
                 "sub_account": txn.sub_account_id,
             }
             for txn in inflows_by_id.values()
@@ -280,13 +326,12 @@ Match each outflow to its corresponding inflow. Each transaction can only appear
 confident about - it's better to skip uncertain matches than to pair incorrectly."""
 
         try:
-            response = await client.responses.parse(
+            parsed = await gateway.parse(
+                caller="transaction_matching",
                 model="gpt-5-mini",
-                input=[{"role": "user", "content": prompt}],
+                prompt=prompt,
                 text_format=DisambiguationResponse,
             )
-
-            parsed = response.output_parsed
             if not parsed:
                 continue
 
@@ -337,7 +382,8 @@ def _run_matching(
     if not outflows or not inflows:
         return 0
 
-    candidates = _build_candidates(outflows, inflows)
+    account_names = _load_linked_account_names(user_account_id, db_session)
+    candidates = _build_candidates(outflows, inflows, account_names)
     new_matches, ambiguous_groups = _resolve_with_greedy(candidates, user_account_id)
 
     if ambiguous_groups:
@@ -346,70 +392,169 @@ def _run_matching(
             len(ambiguous_groups),
         )
         try:
-            llm_matches = _resolve_ambiguous_with_llm(ambiguous_groups, user_account_id)
+            llm_matches = _resolve_ambiguous_with_llm(ambiguous_groups, user_account_id, account_names)
             new_matches.extend(llm_matches)
         except Exception:
             logger.exception("LLM disambiguation failed (non-fatal)")
 
     if new_matches:
+        transactions_by_id = {txn.id: txn for txn in outflows + inflows}
+        for match in new_matches:
+            transactions_by_id[match.outflow_transaction_id].is_internal_transfer = True
+            transactions_by_id[match.inflow_transaction_id].is_internal_transfer = True
         db_session.add_all(new_matches)
+        db_session.flush()
+        matched_ids = [
+            txn_id for match in new_matches for txn_id in (match.outflow_transaction_id, match.inflow_transaction_id)
+        ]
+        model_repository.update_cash_flow_aggregates(
+            db_session, model_repository.find_transactions_days(db_session, matched_ids)
+        )
         db_session.commit()
         logger.info("created %d transaction matches for user_account_id=%d", len(new_matches), user_account_id)
 
     return len(new_matches)
 
 
-def _query_unmatched(
+def _load_linked_account_names(
     user_account_id: int,
     db_session: SessionType,
-) -> tuple[list[model.TransactionHistoryEntry], list[model.TransactionHistoryEntry]]:
-    already_matched_outflow = db_session.query(model.TransactionMatch.outflow_transaction_id).filter(
-        model.TransactionMatch.match_status != "rejected"
-    )
-    already_matched_inflow = db_session.query(model.TransactionMatch.inflow_transaction_id).filter(
-        model.TransactionMatch.match_status != "rejected"
-    )
+) -> LinkedAccountNames:
+    return {
+        linked_account_id: account_name
+        for (linked_account_id, account_name) in db_session.query(
+            model.LinkedAccount.id,
+            model.LinkedAccount.account_name,
+        )
+        .filter(model.LinkedAccount.user_account_id == user_account_id)
+        .all()
+    }
+
 
-    base_query = (
+def _query_unmatched_transactions(
+    user_account_id: int,
+    outflows: bool,
+    db_session: SessionType,
+) -> Query[model.TransactionHistoryEntry]:
+    """Outflows (or inflows) not yet part of a (non rejected) match"""
+    transaction_types = OUTFLOW_TYPES if outflows else INFLOW_TYPES
+    query: Query[model.TransactionHistoryEntry] = (
         db_session.query(model.TransactionHistoryEntry)
         .join(  # type: ignore[no-untyped-call]
             model.LinkedAccount,
             model.TransactionHistoryEntry.linked_account_id == model.LinkedAccount.id,
         )
         .filter(model.LinkedAccount.user_account_id == user_account_id)
+        .filter(model.TransactionHistoryEntry.transaction_type.in_(transaction_types))
+        .filter(model.TransactionHistoryEntry.is_internal_transfer.is_(False))  # type: ignore[no-untyped-call]
     )
+    return query
+
+
+def _query_unmatched(
+    user_account_id: int,
+    db_session: SessionType,
+) -> tuple[list[model.TransactionHistoryEntry], list[model.TransactionHistoryEntry]]:
+    outflows = _query_unmatched_transactions(user_account_id, True, db_session).all()
+    inflows = _query_unmatched_transactions(user_account_id, False, db_session).all()
+    return outflows, inflows
+
+
+def _query_counterparts(
+    seeds: list[model.TransactionHistoryEntry],
+    user_account_id: int,
+    outflows: bool,
+    db_session: SessionType,
+) -> list[model.TransactionHistoryEntry]:
+    """Unmatched outflows (or inflows) within the amount and date
+    tolerances of any of the seed transactions (served by the
+    abs(amount_snapshot_ccy), transaction_date index)"""
+    windows = [
+        and_(
+            func.abs(model.TransactionHistoryEntry.amount_snapshot_ccy).between(
+                abs(seed.amount_snapshot_ccy) - AMOUNT_TOLERANCE,
+                abs(seed.amount_snapshot_ccy) + AMOUNT_TOLERANCE,
+            ),
+            model.TransactionHistoryEntry.transaction_date.between(
+                seed.transaction_date - MAX_DATE_DIFF,
+                seed.transaction_date + MAX_DATE_DIFF,
+            ),
+        )
+        for seed in seeds
+        if seed.amount_snapshot_ccy is not None
+    ]
+    counterparts: list[model.TransactionHistoryEntry] = []
+    for offset in range(0, len(windows), SEED_WINDOWS_PER_QUERY):
+        counterparts.extend(
+            _query_unmatched_transactions(user_account_id, outflows, db_session)
+            .filter(or_(*windows[offset : offset + SEED_WINDOWS_PER_QUERY]))
+            .all()
+        )
+    return counterparts
+
+
+def _merge_transactions(*transaction_lists: list[model.TransactionHistoryEntry]) -> list[model.TransactionHistoryEntry]:
+    transactions_by_id = {txn.id: txn for transactions in transaction_lists for txn in transactions}
+    return [transactions_by_id[txn_id] for txn_id in sorted(transactions_by_id)]
+
 
-    outflows = (
-        base_query.filter(model.TransactionHistoryEntry.transaction_type.in_(OUTFLOW_TYPES))
-        .filter(model.TransactionHistoryEntry.id.notin_(already_matched_outflow))
+def _query_snapshot_unmatched(
+    snapshot_id: int,
+    user_account_id: int,
+    db_session: SessionType,
+) -> tuple[list[model.TransactionHistoryEntry], list[model.TransactionHistoryEntry]]:
+    """Unmatched transactions inserted or updated by the snapshot (seeds), along
+    with the unmatched transactions they could be matched with (counterparts).
+
+    Counterparts of both directions are loaded, so that older unmatched
+    transactions still compete with the seeds for their counterparts.
+    """
+    seed_outflows = (
+        _query_unmatched_transactions(user_account_id, True, db_session)
+        .filter(model.TransactionHistoryEntry.source_snapshot_id == snapshot_id)
         .all()
     )
-
-    inflows = (
-        base_query.filter(model.TransactionHistoryEntry.transaction_type.in_(INFLOW_TYPES))
-        .filter(model.TransactionHistoryEntry.id.notin_(already_matched_inflow))
+    seed_inflows = (
+        _query_unmatched_transactions(user_account_id, False, db_session)
+        .filter(model.TransactionHistoryEntry.source_snapshot_id == snapshot_id)
         .all()
     )
-
-    return outflows, inflows
+    seeds = seed_outflows + seed_inflows
+    if not seeds:
+        return [], []
+    counterpart_outflows = _query_counterparts(seeds, user_account_id, True, db_session)
+    counterpart_inflows = _query_counterparts(seeds, user_account_id, False, db_session)
+    logger.info(
+        "incremental matching for snapshot_id=%d: %d seed transactions, %d counterparts",
+        snapshot_id,
+        len(seeds),
+        len(counterpart_outflows) + len(counterpart_inflows),
+    )
+    return (
+        _merge_transactions(seed_outflows, counterpart_outflows),
+        _merge_transactions(seed_inflows, counterpart_inflows),
+    )
 
 
 def match_transactions(
     snapshot_id: int,
     db_session: SessionType,
 ) -> int:
-    """Match outflow/inflow transaction pairs for the user account that owns the snapshot.
+    """Match outflow/inflow transaction pairs involving the transactions
+    inserted or updated by the snapshot (incremental, see `backfill_matches`
+    for a full rescan).
 
     Returns the number of new matches created.
     """
     snapshot: model.UserAccountSnapshot = db_session.query(model.UserAccountSnapshot).filter_by(id=snapshot_id).one()
     user_account_id = snapshot.user_account_id
-    outflows, inflows = _query_unmatched(user_account_id, db_session)
+    outflows, inflows = _query_snapshot_unmatched(snapshot_id, user_account_id, db_session)
     return _run_matching(outflows, inflows, user_account_id, db_session)
 
 
 def backfill_matches(db_session: SessionType) -> int:
-    """Run matching for all user accounts that have transaction history.
+    """Run matching for all user accounts that have transaction history, over
+    all their unmatched transactions (full rescan).
 
     Returns total number of new matches created.
     """
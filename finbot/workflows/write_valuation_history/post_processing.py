@@ -0,0 +1,104 @@
+"""Transactions post-processing, run after the valuation history entry is published.
+
+Each stage runs as its own activity. All stages update the transactions rows,
+matching and categorization also recompute the cash-flow aggregates of their
+days, so stages run one after the other:
+
+    consolidation
+      └── transfers matching
+            └── merchant enrichment
+                  └── spending categorization
+                        └── recurring detection
+
+Stages are non-fatal: a failed stage is reported, later stages still run.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from finbot import model
+from finbot.model import SessionType
+from finbot.workflows.write_valuation_history import matching, recurring, schema, transactions
+
+logger = logging.getLogger(__name__)
+
+StageType = Callable[[schema.PostProcessingStageRequest, SessionType], list[int]]
+
+
+def consolidate_transactions(request: schema.PostProcessingStageRequest, db_session: SessionType) -> list[int]:
+    """Dedup + FX convert + upsert, returns the new uncategorized transactions"""
+    new_uncategorized_ids = transactions.consolidate_transactions(
+        snapshot_id=request.snapshot_id,
+        db_session=db_session,
+    )
+    if new_uncategorized_ids:
+        logger.info(f"consolidated {len(new_uncategorized_ids)} new transactions")
+    return new_uncategorized_ids
+
+
+def enrich_merchants(request: schema.PostProcessingStageRequest, db_session: SessionType) -> list[int]:
+    from finbot.core.merchant_enricher import enrich_transactions_with_merchants
+
+    if request.transaction_ids:
+        asyncio.run(enrich_transactions_with_merchants(request.transaction_ids, db_session))
+        db_session.commit()
+    return []
+
+
+def categorize_transactions(request: schema.PostProcessingStageRequest, db_session: SessionType) -> list[int]:
+    from finbot.core.spending_categorizer import categorize_transaction_batch
+
+    if request.transaction_ids:
+        asyncio.run(categorize_transaction_batch(request.transaction_ids, db_session))
+        db_session.commit()
+    return []
+
+
+def match_transactions(request: schema.PostProcessingStageRequest, db_session: SessionType) -> list[int]:
+    match_count = matching.match_transactions(
+        snapshot_id=request.snapshot_id,
+        db_session=db_session,
+    )
+    if match_count:
+        logger.info(f"matched {match_count} transaction pairs")
+    return []
+
+
+def detect_recurring_transactions(request: schema.PostProcessingStageRequest, db_session: SessionType) -> list[int]:
+    snapshot: model.UserAccountSnapshot = (
+        db_session.query(model.UserAccountSnapshot).filter_by(id=request.snapshot_id).one()
+    )
+    recurring_count = recurring.detect_recurring_transactions(
+        user_account_id=snapshot.user_account_id,
+        db_session=db_session,
+        snapshot_id=request.snapshot_id,
+    )
+    if recurring_count:
+        logger.info(f"detected {recurring_count} recurring transaction groups")
+    return []
+
+
+def run_stage(
+    stage: StageType,
+    request: schema.PostProcessingStageRequest,
+    db_session: SessionType,
+) -> schema.PostProcessingStageReport:
+    started_at = time.perf_counter()
+    try:
+        transaction_ids = stage(request, db_session)
+        succeeded = True
+    except Exception:
+        logger.exception(f"transactions post-processing stage {stage.__name__} failed (non-fatal)")
+        db_session.rollback()
+        transaction_ids = []
+        succeeded = False
+    duration = time.perf_counter() - started_at
+    logger.info(f"transactions post-processing stage {stage.__name__} done in {duration:.2f}s (succeeded={succeeded})")
+    return schema.PostProcessingStageReport(
+        stage=stage.__name__,
+        succeeded=succeeded,
+        duration_seconds=duration,
+        transaction_ids=transaction_ids,
+    )
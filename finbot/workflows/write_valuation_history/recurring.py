@@ -4,13 +4,14 @@ import logging
 from collections import defaultdict
 from decimal import Decimal
 from statistics import mean, stdev
+from typing import Optional
 
 from pydantic import BaseModel
 from rapidfuzz import fuzz
 
 from finbot import model
 from finbot.core.description_sanitizer import sanitize_description
-from finbot.core.environment import get_openai_api_key
+from finbot.core.llm_gateway import get_llm_gateway
 from finbot.model import SessionType
 
 logger = logging.getLogger(__name__)
@@ -231,13 +232,19 @@ def _create_or_update_group(
 def detect_recurring_transactions(
     user_account_id: int,
     db_session: SessionType,
+    snapshot_id: Optional[int] = None,
 ) -> int:
     """Detect recurring transaction groups for a user account.
 
-    Returns the number of active recurring groups.
+    Groups of a (merchant_id, currency) key only depend on the transactions of
+    this key. When `snapshot_id` is provided, only the keys of the payments
+    inserted or updated by the snapshot are re-detected (incremental), otherwise
+    all keys are rebuilt.
+
+    Returns the number of active recurring groups (of the re-detected keys).
     """
     # Query all payment/purchase transactions with a merchant
-    all_transactions = (
+    transactions_query = (
         db_session.query(model.TransactionHistoryEntry)
         .join(  # type: ignore[no-untyped-call]
             model.LinkedAccount,
@@ -248,23 +255,52 @@ def detect_recurring_transactions(
             model.TransactionHistoryEntry.transaction_type.in_(PAYMENT_TYPES),
             model.TransactionHistoryEntry.merchant_id.isnot(None),  # type: ignore[no-untyped-call]
         )
-        .order_by(
+    )
+    existing_groups_query = db_session.query(model.RecurringTransactionGroup).filter_by(user_account_id=user_account_id)
+
+    touched_keys: Optional[set[tuple[int, str]]] = None
+    if snapshot_id is not None:
+        touched_keys = set(
+            db_session.query(model.TransactionHistoryEntry.merchant_id, model.TransactionHistoryEntry.currency)
+            .filter(
+                model.TransactionHistoryEntry.source_snapshot_id == snapshot_id,
+                model.TransactionHistoryEntry.transaction_type.in_(PAYMENT_TYPES),
+                model.TransactionHistoryEntry.merchant_id.isnot(None),  # type: ignore[no-untyped-call]
+            )
+            .distinct()
+            .all()
+        )
+        if not touched_keys:
+            return 0
+        touched_merchant_ids = {merchant_id for (merchant_id, _) in touched_keys}
+        transactions_query = transactions_query.filter(
+            model.TransactionHistoryEntry.merchant_id.in_(touched_merchant_ids)
+        )
+        existing_groups_query = existing_groups_query.filter(
+            model.RecurringTransactionGroup.merchant_id.in_(touched_merchant_ids)
+        )
+
+    all_transactions = [
+        txn
+        for txn in transactions_query.order_by(
             model.TransactionHistoryEntry.merchant_id,
             model.TransactionHistoryEntry.currency,
             model.TransactionHistoryEntry.transaction_date,
-        )
-        .all()
-    )
+        ).all()
+        if touched_keys is None or (txn.merchant_id, txn.currency) in touched_keys
+    ]
 
     # Group by (merchant_id, currency)
     groups_by_key: dict[tuple[int, str], list[model.TransactionHistoryEntry]] = defaultdict(list)
     for txn in all_transactions:
         groups_by_key[(txn.merchant_id, txn.currency)].append(txn)
 
-    # Load existing recurring groups for this user
-    existing_groups: list[model.RecurringTransactionGroup] = (
-        db_session.query(model.RecurringTransactionGroup).filter_by(user_account_id=user_account_id).all()
-    )
+    # Load existing recurring groups for this user (and the re-detected keys)
+    existing_groups: list[model.RecurringTransactionGroup] = [
+        group
+        for group in existing_groups_query.all()
+        if touched_keys is None or (group.merchant_id, group.currency) in touched_keys
+    ]
 
     active_group_ids: set[int] = set()
     transaction_to_group: dict[int, int] = {}  # txn.id -> group.id
@@ -303,7 +339,7 @@ def detect_recurring_transactions(
                 db_session=db_session,
             )
 
-    # Update recurring_group_id on all transactions for this user
+    # Update recurring_group_id on all (re-detected) transactions for this user
     for txn in all_transactions:
         new_group_id = transaction_to_group.get(txn.id)
         if txn.recurring_group_id != new_group_id:
@@ -353,15 +389,11 @@ async def _annotate_groups_with_llm(
     groups: list[model.RecurringTransactionGroup],
     db_session: SessionType,
 ) -> None:
-    api_key = get_openai_api_key()
-    if not api_key:
+    gateway = get_llm_gateway()
+    if gateway is None:
         logger.info("FINBOT_OPENAI_API_KEY not set, skipping recurring group annotation")
         return
 
-    from openai import AsyncOpenAI
-
-    client = AsyncOpenAI(api_key=api_key)
-
     groups_data = []
     groups_by_id: dict[int, model.RecurringTransactionGroup] = {}
     for group in groups:
@@ -425,13 +457,12 @@ GROUPS:
 {json.dumps(groups_data)}"""
 
     try:
-        response = await client.responses.parse(
+        parsed = await gateway.parse(
+            caller="recurring_annotation",
             model="gpt-5-mini",
-            input=[{"role": "user", "content": prompt}],
+            prompt=prompt,
             text_format=GroupAnnotationsResponse,
         )
-
-        parsed = response.output_parsed
         if not parsed:
             return
 
@@ -452,7 +483,7 @@ GROUPS:
 
 
 def backfill_recurring_transactions(db_session: SessionType) -> int:
-    """Run recurring detection for all user accounts that have transaction history.
+    """Rebuild recurring groups for all user accounts that have transaction history.
 
     Returns total number of recurring groups detected.
     """
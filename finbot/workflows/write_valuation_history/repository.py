@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 import json
 from collections import defaultdict
 from datetime import date
@@ -123,6 +124,103 @@ class ConsistencySnapshotEmptySubAccountEntry(ConsistencySnapshotEntryHeader):
 ConsistencySnapshotEntry: TypeAlias = ConsistencySnapshotItemEntry | ConsistencySnapshotEmptySubAccountEntry
 
 
+@dataclasses.dataclass(frozen=True)
+class ConsistentSnapshotAggregates:
+    user_account_valuation: Decimal
+    user_account_liabilities: Decimal
+    linked_accounts_valuation: dict[LinkedAccountValuationDescriptor, Decimal]
+    sub_accounts_valuation: dict[SubAccountValuationDescriptor, SubAccountValuationAgg]
+
+
+@dataclasses.dataclass(frozen=True)
+class ConsistentSnapshotColumns:
+    """Column-oriented view of a consistent snapshot: value columns hold one
+    value per snapshot entry, `entry_sub_account` the (index of the) sub account
+    each entry belongs to, and `sub_account_linked_account` the (index of the)
+    linked account each sub account belongs to.
+    """
+
+    linked_accounts: list[LinkedAccountValuationDescriptor]
+    sub_accounts: list[SubAccountValuationDescriptor]
+    sub_account_linked_account: list[int]
+    entry_sub_account: list[int]
+    value_snapshot_ccy: list[Decimal]
+    value_sub_account_ccy: list[Decimal]
+
+    @staticmethod
+    def from_entries(entries: list[ConsistencySnapshotEntry]) -> "ConsistentSnapshotColumns":
+        linked_accounts: list[LinkedAccountValuationDescriptor] = []
+        linked_account_index: dict[tuple[int, int], int] = {}
+        sub_accounts: list[SubAccountValuationDescriptor] = []
+        sub_account_index: dict[tuple[Any, ...], int] = {}
+        sub_account_linked_account: list[int] = []
+        entry_sub_account: list[int] = []
+        value_snapshot_ccy: list[Decimal] = []
+        value_sub_account_ccy: list[Decimal] = []
+        for entry in entries:
+            sub_account_key = (
+                entry.linked_account_id,
+                entry.sub_account_id,
+                entry.sub_account_ccy,
+                entry.sub_account_description,
+                entry.sub_account_type,
+                entry.sub_account_sub_type,
+            )
+            sub_account = sub_account_index.get(sub_account_key)
+            if sub_account is None:
+                linked_account_key = (entry.linked_account_id, entry.snapshot_id)
+                linked_account = linked_account_index.get(linked_account_key)
+                if linked_account is None:
+                    linked_account = linked_account_index[linked_account_key] = len(linked_accounts)
+                    linked_accounts.append(entry.linked_account_valuation_descriptor)
+                sub_account = sub_account_index[sub_account_key] = len(sub_accounts)
+                sub_accounts.append(entry.sub_account_valuation_descriptor)
+                sub_account_linked_account.append(linked_account)
+            entry_sub_account.append(sub_account)
+            value_snapshot_ccy.append(entry.get_value_snapshot_ccy())
+            value_sub_account_ccy.append(entry.get_value_sub_account_ccy())
+        return ConsistentSnapshotColumns(
+            linked_accounts=linked_accounts,
+            sub_accounts=sub_accounts,
+            sub_account_linked_account=sub_account_linked_account,
+            entry_sub_account=entry_sub_account,
+            value_snapshot_ccy=value_snapshot_ccy,
+            value_sub_account_ccy=value_sub_account_ccy,
+        )
+
+    def aggregate(self) -> ConsistentSnapshotAggregates:
+        """Single pass group-by over the value columns (sub account level), then
+        folds sub accounts totals into linked account and user account totals.
+        """
+        sub_accounts_snapshot_ccy = [Decimal(0)] * len(self.sub_accounts)
+        sub_accounts_sub_account_ccy = [Decimal(0)] * len(self.sub_accounts)
+        liabilities = Decimal(0)
+        for sub_account, value_snapshot_ccy, value_sub_account_ccy in zip(
+            self.entry_sub_account, self.value_snapshot_ccy, self.value_sub_account_ccy
+        ):
+            sub_accounts_snapshot_ccy[sub_account] += value_snapshot_ccy
+            sub_accounts_sub_account_ccy[sub_account] += value_sub_account_ccy
+            if value_snapshot_ccy < 0:
+                liabilities += value_snapshot_ccy
+        linked_accounts_snapshot_ccy = [Decimal(0)] * len(self.linked_accounts)
+        for linked_account, value_snapshot_ccy in zip(self.sub_account_linked_account, sub_accounts_snapshot_ccy):
+            linked_accounts_snapshot_ccy[linked_account] += value_snapshot_ccy
+        return ConsistentSnapshotAggregates(
+            user_account_valuation=sum(linked_accounts_snapshot_ccy, Decimal(0)),
+            user_account_liabilities=liabilities,
+            linked_accounts_valuation=dict(zip(self.linked_accounts, linked_accounts_snapshot_ccy)),
+            sub_accounts_valuation={
+                descriptor: SubAccountValuationAgg(
+                    value_sub_account_ccy=value_sub_account_ccy,
+                    value_snapshot_ccy=value_snapshot_ccy,
+                )
+                for (descriptor, value_sub_account_ccy, value_snapshot_ccy) in zip(
+                    self.sub_accounts, sub_accounts_sub_account_ccy, sub_accounts_snapshot_ccy
+                )
+            },
+        )
+
+
 @dataclasses.dataclass(frozen=True)
 class ConsistentSnapshot:
     snapshot_data: list[ConsistencySnapshotEntry]
@@ -130,49 +228,82 @@ class ConsistentSnapshot:
     def __len__(self) -> int:
         return len(self.snapshot_data)
 
+    @functools.cached_property
+    def columns(self) -> ConsistentSnapshotColumns:
+        return ConsistentSnapshotColumns.from_entries(self.snapshot_data)
+
+    @functools.cached_property
+    def aggregates(self) -> ConsistentSnapshotAggregates:
+        return self.columns.aggregate()
+
     def get_user_account_valuation(self) -> Decimal:
-        return Decimal(sum(entry.get_value_snapshot_ccy() for entry in self.snapshot_data))
+        return self.aggregates.user_account_valuation
 
     def get_user_account_liabilities(self) -> Decimal:
-        return Decimal(
-            sum(entry.get_value_snapshot_ccy() for entry in self.snapshot_data if entry.get_value_snapshot_ccy() < 0)
-        )
+        return self.aggregates.user_account_liabilities
 
     def get_linked_accounts_valuation(
         self,
     ) -> dict[LinkedAccountValuationDescriptor, Decimal]:
-        result: dict[LinkedAccountValuationDescriptor, Decimal] = defaultdict(Decimal)
-        for entry in self.snapshot_data:
-            result[entry.linked_account_valuation_descriptor] += entry.get_value_snapshot_ccy()
-        return result
+        return self.aggregates.linked_accounts_valuation
 
     def get_sub_accounts_valuation(
         self,
     ) -> dict[SubAccountValuationDescriptor, SubAccountValuationAgg]:
-        result: dict[SubAccountValuationDescriptor, SubAccountValuationAgg] = defaultdict(SubAccountValuationAgg)
-        for entry in self.snapshot_data:
-            result[entry.sub_account_valuation_descriptor].agg(
-                value_sub_account_ccy=entry.get_value_sub_account_ccy(),
-                value_snapshot_ccy=entry.get_value_snapshot_ccy(),
-            )
-        return result
+        return self.aggregates.sub_accounts_valuation
+
+
+@dataclasses.dataclass(frozen=True)
+class ValuationChangeHorizon:
+    name: str  # matching model.ValuationChangeEntry column
+    reference_date: str  # SQL expression, relative to :valuation_date
+
+
+VALUATION_CHANGE_HORIZONS: tuple[ValuationChangeHorizon, ...] = (
+    ValuationChangeHorizon("change_1hour", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '1 hour'"),
+    ValuationChangeHorizon("change_1day", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '1 day'"),
+    ValuationChangeHorizon("change_1week", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '1 week'"),
+    ValuationChangeHorizon("change_1month", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '1 month'"),
+    ValuationChangeHorizon("change_6months", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '6 months'"),
+    ValuationChangeHorizon("change_1year", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '1 year'"),
+    ValuationChangeHorizon("change_2years", "CAST(:valuation_date AS TIMESTAMPTZ) - INTERVAL '2 years'"),
+)
 
 
 @dataclasses.dataclass(frozen=True)
 class ReferenceHistoryEntryIds:
     baseline_id: int
-    change_1h_id: int
-    change_1d_id: int
-    change_1w_id: int
-    change_1m_id: int
-    change_6m_id: int
-    change_1y_id: int
-    change_2y_id: int
+    reference_ids: dict[str, int | None]  # horizon name -> history entry id
+
+    @property
+    def history_entry_ids(self) -> list[int]:
+        return [self.baseline_id] + [ref_id for ref_id in self.reference_ids.values() if ref_id is not None]
+
+    def get_horizons_by_reference_id(self) -> dict[int, list[str]]:
+        horizons: dict[int, list[str]] = defaultdict(list)
+        for horizon, ref_id in self.reference_ids.items():
+            if ref_id is not None:
+                horizons[ref_id].append(horizon)
+        return horizons
+
+
+# SQL types of the valuation entries key columns, as compared in `_get_valuation_changes`
+_VALUATION_KEY_TYPES = {
+    "linked_account_id": "INTEGER",
+    "sub_account_id": "TEXT",
+    "item_type": "TEXT",
+    "name": "TEXT",
+}
 
 
 class ReportRepository(object):
-    def __init__(self, db_session: SessionType):
+    def __init__(
+        self,
+        db_session: SessionType,
+        horizons: tuple[ValuationChangeHorizon, ...] = VALUATION_CHANGE_HORIZONS,
+    ):
         self._db_session = db_session
+        self._horizons = horizons
 
     def get_consistent_snapshot_data(self, snapshot_id: int) -> ConsistentSnapshot:
         query = """
@@ -235,302 +366,184 @@ class ReportRepository(object):
     def get_reference_history_entry_ids(
         self, baseline_id: int, user_account_id: int, valuation_date: date
     ) -> ReferenceHistoryEntryIds:
-        """Return user account history entry identifiers for different 'reference'
-        dates in the past (1 day, 1 month, 6 months, 1 year, 2 years)
+        """Return user account history entry identifiers for each configured
+        valuation change horizon (i.e. latest available entry effective at, or
+        before, the horizon reference date).
         """
-        query = """
-            SELECT c1h.id AS change_1h_id,
-                   c1d.id AS change_1d_id,
-                   c1w.id AS change_1w_id,
-                   c1m.id AS change_1m_id,
-                   c6m.id AS change_6m_id,
-                   c1y.id AS change_1y_id,
-                   c2y.id AS change_2y_id
-            FROM (VALUES (1)) AS dummy (pk)
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '1 hour')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c1h ON dummy.pk = c1h.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '1 day')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c1d ON dummy.pk = c1d.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '1 week')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c1w ON dummy.pk = c1w.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '1 month')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c1m ON dummy.pk = c1m.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '6 months')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c6m ON dummy.pk = c6m.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '1 year')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c1y ON dummy.pk = c1y.pk
-            LEFT JOIN (
-                SELECT 1 AS pk, id
-                FROM finbot_user_accounts_history_entries
-                WHERE effective_at <= (:valuation_date - INTERVAL '2 years')
-                AND user_account_id = :user_account_id
-                AND available
-                ORDER BY effective_at DESC
-                LIMIT 1
-            ) AS c2y ON dummy.pk = c2y.pk
+        horizons_values = ", ".join(
+            f"(:horizon_{index}, {horizon.reference_date})" for (index, horizon) in enumerate(self._horizons)
+        )
+        query = f"""
+            SELECT horizons.name AS horizon,
+                   (
+                       SELECT id
+                       FROM finbot_user_accounts_history_entries
+                       WHERE effective_at <= horizons.reference_date
+                       AND user_account_id = :user_account_id
+                       AND available
+                       ORDER BY effective_at DESC
+                       LIMIT 1
+                   ) AS history_entry_id
+            FROM (VALUES {horizons_values}) AS horizons (name, reference_date)
         """
         results = self._db_session.execute(
             text(query),
-            {"user_account_id": user_account_id, "valuation_date": valuation_date},
+            {
+                "user_account_id": user_account_id,
+                "valuation_date": valuation_date,
+                **{f"horizon_{index}": horizon.name for (index, horizon) in enumerate(self._horizons)},
+            },
         )
-        raw_reference_ids = row_to_dict(next(results))
-        raw_reference_ids["baseline_id"] = baseline_id
-        return ReferenceHistoryEntryIds(**raw_reference_ids)
+        return ReferenceHistoryEntryIds(
+            baseline_id=baseline_id,
+            reference_ids={row.horizon: row.history_entry_id for row in results},
+        )
+
+    def allocate_valuation_change_ids(self, count: int) -> list[int]:
+        query = """
+            SELECT nextval(pg_get_serial_sequence('finbot_valuation_change_entries', 'id')) AS id
+              FROM generate_series(1, :count)
+        """
+        return [row.id for row in self._db_session.execute(text(query), {"count": count})]
 
     def get_user_account_valuation_change(
         self,
         reference_ids: ReferenceHistoryEntryIds,
+        baseline: Decimal | None = None,
     ) -> model.ValuationChangeEntry:
-        query = """
-            SELECT val.valuation - val_c1h.valuation AS change_1hour,
-                   val.valuation - val_c1d.valuation AS change_1day,
-                   val.valuation - val_c1w.valuation AS change_1week,
-                   val.valuation - val_c1m.valuation AS change_1month,
-                   val.valuation - val_c6m.valuation AS change_6months,
-                   val.valuation - val_c1y.valuation AS change_1year,
-                   val.valuation - val_c2y.valuation AS change_2years
-              FROM finbot_user_accounts_valuation_history_entries val
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c1h
-                ON val_c1h.history_entry_id = :change_1h_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c1d
-                ON val_c1d.history_entry_id = :change_1d_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c1w
-                ON val_c1w.history_entry_id = :change_1w_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c1m
-                ON val_c1m.history_entry_id = :change_1m_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c6m
-                ON val_c6m.history_entry_id = :change_6m_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c1y
-                ON val_c1y.history_entry_id = :change_1y_id
-         LEFT JOIN finbot_user_accounts_valuation_history_entries val_c2y
-                ON val_c2y.history_entry_id = :change_2y_id
-             WHERE val.history_entry_id = :baseline_id
-        """
-        row = next(self._db_session.execute(text(query), dataclasses.asdict(reference_ids)))
-        return model.ValuationChangeEntry(**row_to_dict(row))
+        changes = self._get_valuation_changes(
+            table="finbot_user_accounts_valuation_history_entries",
+            key_columns=[],
+            reference_ids=reference_ids,
+            baseline=None if baseline is None else {(): baseline},
+        )
+        return changes[()]
 
     def get_linked_accounts_valuation_change(
         self,
         reference_ids: ReferenceHistoryEntryIds,
+        baseline: dict[LinkedAccountKey, Decimal] | None = None,
     ) -> dict[LinkedAccountKey, model.ValuationChangeEntry]:
-        query = """
-            SELECT val.linked_account_id AS linked_account_id,
-                   val.valuation - val_c1h.valuation AS change_1hour,
-                   val.valuation - val_c1d.valuation AS change_1day,
-                   val.valuation - val_c1w.valuation AS change_1week,
-                   val.valuation - val_c1m.valuation AS change_1month,
-                   val.valuation - val_c6m.valuation AS change_6months,
-                   val.valuation - val_c1y.valuation AS change_1year,
-                   val.valuation - val_c2y.valuation AS change_2years
-              FROM finbot_linked_accounts_valuation_history_entries val
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c1h
-                ON val_c1h.linked_account_id = val.linked_account_id
-               AND val_c1h.history_entry_id = :change_1h_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c1d
-                ON val_c1d.linked_account_id = val.linked_account_id
-               AND val_c1d.history_entry_id = :change_1d_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c1w
-                ON val_c1w.linked_account_id = val.linked_account_id
-               AND val_c1w.history_entry_id = :change_1w_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c1m
-                ON val_c1m.linked_account_id = val.linked_account_id
-               AND val_c1m.history_entry_id = :change_1m_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c6m
-                ON val_c6m.linked_account_id = val.linked_account_id
-               AND val_c6m.history_entry_id = :change_6m_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c1y
-                ON val_c1y.linked_account_id = val.linked_account_id
-               AND val_c1y.history_entry_id = :change_1y_id
-         LEFT JOIN finbot_linked_accounts_valuation_history_entries val_c2y
-                ON val_c2y.linked_account_id = val.linked_account_id
-               AND val_c2y.history_entry_id = :change_2y_id
-             WHERE val.history_entry_id = :baseline_id
-        """
-        rows = self._db_session.execute(text(query), dataclasses.asdict(reference_ids))
-        results: dict[LinkedAccountKey, model.ValuationChangeEntry] = {}
-        for row in rows:
-            row = row_to_dict(row)
-            descriptor = LinkedAccountKey(linked_account_id=row["linked_account_id"])
-            results[descriptor] = model.ValuationChangeEntry(
-                **({k: v for k, v in row.items() if k.startswith("change_")})
-            )
-        return results
+        changes = self._get_valuation_changes(
+            table="finbot_linked_accounts_valuation_history_entries",
+            key_columns=["linked_account_id"],
+            reference_ids=reference_ids,
+            baseline=_to_key_tuples(baseline),
+        )
+        return {
+            LinkedAccountKey(linked_account_id=linked_account_id): change
+            for ((linked_account_id,), change) in changes.items()
+        }
 
     def get_sub_accounts_valuation_change(
         self,
         reference_ids: ReferenceHistoryEntryIds,
+        baseline: dict[SubAccountKey, Decimal] | None = None,
     ) -> dict[SubAccountKey, model.ValuationChangeEntry]:
-        query = """
-            SELECT val.linked_account_id AS linked_account_id,
-                   val.sub_account_id AS sub_account_id,
-                   val.valuation - val_c1h.valuation AS change_1hour,
-                   val.valuation - val_c1d.valuation AS change_1day,
-                   val.valuation - val_c1w.valuation AS change_1week,
-                   val.valuation - val_c1m.valuation AS change_1month,
-                   val.valuation - val_c6m.valuation AS change_6months,
-                   val.valuation - val_c1y.valuation AS change_1year,
-                   val.valuation - val_c2y.valuation AS change_2years
-              FROM finbot_sub_accounts_valuation_history_entries val
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c1h
-                ON val_c1h.linked_account_id = val.linked_account_id
-               AND val_c1h.sub_account_id = val.sub_account_id
-               AND val_c1h.history_entry_id = :change_1h_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c1d
-                ON val_c1d.linked_account_id = val.linked_account_id
-               AND val_c1d.sub_account_id = val.sub_account_id
-               AND val_c1d.history_entry_id = :change_1d_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c1w
-                ON val_c1w.linked_account_id = val.linked_account_id
-               AND val_c1w.sub_account_id = val.sub_account_id
-               AND val_c1w.history_entry_id = :change_1w_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c1m
-                ON val_c1m.linked_account_id = val.linked_account_id
-               AND val_c1m.sub_account_id = val.sub_account_id
-               AND val_c1m.history_entry_id = :change_1m_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c6m
-                ON val_c6m.linked_account_id = val.linked_account_id
-               AND val_c6m.sub_account_id = val.sub_account_id
-               AND val_c6m.history_entry_id = :change_6m_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c1y
-                ON val_c1y.linked_account_id = val.linked_account_id
-               AND val_c1y.sub_account_id = val.sub_account_id
-               AND val_c1y.history_entry_id = :change_1y_id
-         LEFT JOIN finbot_sub_accounts_valuation_history_entries val_c2y
-                ON val_c2y.linked_account_id = val.linked_account_id
-               AND val_c2y.sub_account_id = val.sub_account_id
-               AND val_c2y.history_entry_id = :change_2y_id
-             WHERE val.history_entry_id = :baseline_id
-        """
-        rows = self._db_session.execute(text(query), dataclasses.asdict(reference_ids))
-        results: dict[SubAccountKey, model.ValuationChangeEntry] = {}
-        for row in rows:
-            row = row_to_dict(row)
-            descriptor = SubAccountKey(
-                linked_account_id=row["linked_account_id"],
-                sub_account_id=row["sub_account_id"],
-            )
-            results[descriptor] = model.ValuationChangeEntry(
-                **({k: v for k, v in row.items() if k.startswith("change_")})
-            )
-        return results
+        changes = self._get_valuation_changes(
+            table="finbot_sub_accounts_valuation_history_entries",
+            key_columns=["linked_account_id", "sub_account_id"],
+            reference_ids=reference_ids,
+            baseline=_to_key_tuples(baseline),
+        )
+        return {
+            SubAccountKey(linked_account_id=linked_account_id, sub_account_id=sub_account_id): change
+            for ((linked_account_id, sub_account_id), change) in changes.items()
+        }
 
     def get_sub_accounts_items_valuation_change(
         self,
         reference_ids: ReferenceHistoryEntryIds,
+        baseline: dict[SubAccountItemKey, Decimal] | None = None,
     ) -> dict[SubAccountItemKey, model.ValuationChangeEntry]:
-        query = """
-            SELECT val.linked_account_id AS linked_account_id,
-                   val.sub_account_id AS sub_account_id,
-                   val.item_type AS item_type,
-                   val.name AS item_name,
-                   val.valuation - val_c1h.valuation AS change_1hour,
-                   val.valuation - val_c1d.valuation AS change_1day,
-                   val.valuation - val_c1w.valuation AS change_1week,
-                   val.valuation - val_c1m.valuation AS change_1month,
-                   val.valuation - val_c6m.valuation AS change_6months,
-                   val.valuation - val_c1y.valuation AS change_1year,
-                   val.valuation - val_c2y.valuation AS change_2years
-              FROM finbot_sub_accounts_items_valuation_history_entries val
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c1h
-                ON val_c1h.linked_account_id = val.linked_account_id
-               AND val_c1h.sub_account_id = val.sub_account_id
-               AND val_c1h.item_type = val.item_type
-               AND val_c1h.name = val.name
-               AND val_c1h.history_entry_id = :change_1h_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c1d
-                ON val_c1d.linked_account_id = val.linked_account_id
-               AND val_c1d.sub_account_id = val.sub_account_id
-               AND val_c1d.item_type = val.item_type
-               AND val_c1d.name = val.name
-               AND val_c1d.history_entry_id = :change_1d_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c1w
-                ON val_c1w.linked_account_id = val.linked_account_id
-               AND val_c1w.sub_account_id = val.sub_account_id
-               AND val_c1w.item_type = val.item_type
-               AND val_c1w.name = val.name
-               AND val_c1w.history_entry_id = :change_1w_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c1m
-                ON val_c1m.linked_account_id = val.linked_account_id
-               AND val_c1m.sub_account_id = val.sub_account_id
-               AND val_c1m.item_type = val.item_type
-               AND val_c1m.name = val.name
-               AND val_c1m.history_entry_id = :change_1m_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c6m
-                ON val_c6m.linked_account_id = val.linked_account_id
-               AND val_c6m.sub_account_id = val.sub_account_id
-               AND val_c6m.item_type = val.item_type
-               AND val_c6m.name = val.name
-               AND val_c6m.history_entry_id = :change_6m_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c1y
-                ON val_c1y.linked_account_id = val.linked_account_id
-               AND val_c1y.sub_account_id = val.sub_account_id
-               AND val_c1y.item_type = val.item_type
-               AND val_c1y.name = val.name
-               AND val_c1y.history_entry_id = :change_1y_id
-         LEFT JOIN finbot_sub_accounts_items_valuation_history_entries val_c2y
-                ON val_c2y.linked_account_id = val.linked_account_id
-               AND val_c2y.sub_account_id = val.sub_account_id
-               AND val_c2y.item_type = val.item_type
-               AND val_c2y.name = val.name
-               AND val_c2y.history_entry_id = :change_1y_id
-             WHERE val.history_entry_id = :baseline_id
+        changes = self._get_valuation_changes(
+            table="finbot_sub_accounts_items_valuation_history_entries",
+            key_columns=["linked_account_id", "sub_account_id", "item_type", "name"],
+            reference_ids=reference_ids,
+            baseline=_to_key_tuples(baseline),
+        )
+        return {
+            SubAccountItemKey(
+                linked_account_id=linked_account_id,
+                sub_account_id=sub_account_id,
+                item_type=item_type,
+                name=name,
+            ): change
+            for ((linked_account_id, sub_account_id, item_type, name), change) in changes.items()
+        }
+
+    def _get_valuation_changes(
+        self,
+        table: str,
+        key_columns: list[str],
+        reference_ids: ReferenceHistoryEntryIds,
+        baseline: dict[tuple[Any, ...], Decimal] | None = None,
+    ) -> dict[tuple[Any, ...], model.ValuationChangeEntry]:
+        """Compute the valuation change for every horizon and every entry (identified
+        by `key_columns`) of the baseline history entry, in a single scan of `table`.
+        Entries which do not exist in a reference history entry get no change for
+        the corresponding horizon(s).
+
+        Baseline valuations are read from `table`, unless they are given (by key) in
+        `baseline`: changes can then be computed before the baseline is written.
         """
-        rows = self._db_session.execute(text(query), dataclasses.asdict(reference_ids))
-        results: dict[SubAccountItemKey, model.ValuationChangeEntry] = {}
-        for row in rows:
-            row = row_to_dict(row)
-            descriptor = SubAccountItemKey(
-                linked_account_id=row["linked_account_id"],
-                sub_account_id=row["sub_account_id"],
-                item_type=row["item_type"],
-                name=row["item_name"],
-            )
-            results[descriptor] = model.ValuationChangeEntry(
-                **({k: v for k, v in row.items() if k.startswith("change_")})
+        keys = "".join(f"CAST(val.{column} AS {_VALUATION_KEY_TYPES[column]}) AS {column}, " for column in key_columns)
+        partition_by = "PARTITION BY " + ", ".join(f"val.{column}" for column in key_columns) if key_columns else ""
+        params: dict[str, Any] = {
+            "baseline_id": reference_ids.baseline_id,
+            "history_entry_ids": reference_ids.history_entry_ids,
+        }
+        baseline_rows = ""
+        if baseline is not None:
+            params["history_entry_ids"] = list(reference_ids.get_horizons_by_reference_id())
+            params["baseline"] = json.dumps(
+                [
+                    {**dict(zip(key_columns, key, strict=True)), "valuation": str(valuation)}
+                    for (key, valuation) in baseline.items()
+                ]
             )
-        return results
+            record_columns = "".join(f"{column} {_VALUATION_KEY_TYPES[column]}, " for column in key_columns)
+            baseline_rows = f"""
+                UNION ALL
+                SELECT {keys}CAST(:baseline_id AS INTEGER) AS history_entry_id, val.valuation
+                  FROM jsonb_to_recordset(CAST(:baseline AS JSONB)) AS val ({record_columns}valuation NUMERIC)
+            """
+        query = f"""
+            SELECT {"".join(f"changes.{column}, " for column in key_columns)}
+                   changes.history_entry_id AS history_entry_id,
+                   changes.change AS change
+              FROM (
+                SELECT {"".join(f"val.{column}, " for column in key_columns)}
+                       val.history_entry_id AS history_entry_id,
+                       FIRST_VALUE(val.valuation) OVER by_key - val.valuation AS change,
+                       BOOL_OR(val.history_entry_id = :baseline_id) OVER by_key AS in_baseline
+                  FROM (
+                    SELECT {keys}val.history_entry_id, val.valuation
+                      FROM {table} val
+                     WHERE val.history_entry_id = ANY(:history_entry_ids)
+                    {baseline_rows}
+                  ) AS val
+                WINDOW by_key AS ({partition_by} ORDER BY val.history_entry_id = :baseline_id DESC)
+              ) AS changes
+             WHERE changes.in_baseline
+        """
+        rows = self._db_session.execute(text(query), params)
+        horizons_by_reference_id = reference_ids.get_horizons_by_reference_id()
+        changes: dict[tuple[Any, ...], dict[str, Decimal | None]] = {}
+        for row in rows:
+            key = tuple(getattr(row, column) for column in key_columns)
+            key_changes = changes.setdefault(key, {horizon: None for horizon in reference_ids.reference_ids})
+            for horizon in horizons_by_reference_id.get(row.history_entry_id, []):
+                key_changes[horizon] = row.change
+        return {key: model.ValuationChangeEntry(**key_changes) for (key, key_changes) in changes.items()}
+
+
+def _to_key_tuples(
+    valuations: dict[Any, Decimal] | None,
+) -> dict[tuple[Any, ...], Decimal] | None:
+    if valuations is None:
+        return None
+    return {dataclasses.astuple(key): valuation for (key, valuation) in valuations.items()}
 
 
 def _parse_provider_specific_data(raw_data: str | None) -> dict[str, Any] | None:
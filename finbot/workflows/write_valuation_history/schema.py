@@ -18,3 +18,23 @@ class WriteHistoryRequest(BaseModel):
 
 class WriteHistoryResponse(BaseModel):
     report: NewHistoryEntryReport
+
+
+class PostProcessTransactionsRequest(BaseModel):
+    snapshot_id: int
+
+
+class PostProcessingStageRequest(BaseModel):
+    snapshot_id: int
+    transaction_ids: list[int] = []
+
+
+class PostProcessingStageReport(BaseModel):
+    stage: str
+    succeeded: bool
+    duration_seconds: float
+    transaction_ids: list[int] = []
+
+
+class PostProcessTransactionsResponse(BaseModel):
+    stages: list[PostProcessingStageReport]
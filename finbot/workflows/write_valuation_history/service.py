@@ -1,17 +1,23 @@
-import asyncio
+import itertools
 import json
 import logging
+from datetime import datetime
 from typing import Any, Generator, cast
 
+from sqlalchemy.dialects.postgresql import insert
+
 from finbot import model
 from finbot.core import schema as core_schema
 from finbot.core.serialization import pretty_dump, reinterpret_as_pydantic
 from finbot.core.utils import some
 from finbot.model import PersistScope, SessionType
-from finbot.workflows.write_valuation_history import matching, recurring, repository, schema, transactions
+from finbot.model import repository as model_repository
+from finbot.workflows.write_valuation_history import repository, schema
 
 logger = logging.getLogger(__name__)
 
+BULK_INSERT_CHUNK_SIZE = 1000
+
 
 def deserialize_provider_specific_data(raw_data: str | None) -> dict[str, Any] | None:
     if raw_data is None:
@@ -19,27 +25,27 @@ def deserialize_provider_specific_data(raw_data: str | None) -> dict[str, Any] |
     return cast(dict[str, Any], json.loads(raw_data))
 
 
-def iter_sub_account_item_valuation_history_entries(
+def iter_sub_account_item_valuation_history_rows(
     consistent_snapshot: repository.ConsistentSnapshot,
-) -> Generator[model.SubAccountItemValuationHistoryEntry, None, None]:
+) -> Generator[dict[str, Any], None, None]:
     for entry in consistent_snapshot.snapshot_data:
         if isinstance(entry, repository.ConsistencySnapshotItemEntry):
-            yield model.SubAccountItemValuationHistoryEntry(
-                linked_account_id=entry.linked_account_id,
-                sub_account_id=entry.sub_account_id,
-                item_type=entry.item_type,
-                name=entry.item_name,
-                item_subtype=entry.item_subtype,
-                asset_class=entry.item_asset_class,
-                asset_type=entry.item_asset_type,
-                units=entry.item_units,
-                valuation=entry.value_snapshot_ccy,
-                valuation_sub_account_ccy=entry.value_sub_account_ccy,
-                valuation_item_ccy=entry.value_item_ccy,
-                currency=entry.item_currency,
-                isin_code=entry.item_isin_code,
-                provider_specific_data=entry.item_provider_specific_data,
-            )
+            yield {
+                "linked_account_id": entry.linked_account_id,
+                "sub_account_id": entry.sub_account_id,
+                "item_type": entry.item_type,
+                "name": entry.item_name,
+                "item_subtype": entry.item_subtype,
+                "asset_class": entry.item_asset_class,
+                "asset_type": entry.item_asset_type,
+                "units": entry.item_units,
+                "valuation": entry.value_snapshot_ccy,
+                "valuation_sub_account_ccy": entry.value_sub_account_ccy,
+                "valuation_item_ccy": entry.value_item_ccy,
+                "currency": entry.item_currency,
+                "isin_code": entry.item_isin_code,
+                "provider_specific_data": entry.item_provider_specific_data,
+            }
 
 
 def write_history_impl(
@@ -69,189 +75,161 @@ def write_history_impl(
         history_entry.user_account_id = snapshot.user_account_id
         history_entry.available = False
 
-    logging.info("handling basic valuation")
-
-    user_account_valuation = consistent_snapshot.get_user_account_valuation()
-    with persist_scope(history_entry):
-        history_entry.user_account_valuation_history_entry = model.UserAccountValuationHistoryEntry(
-            valuation=consistent_snapshot.get_user_account_valuation(),
-            total_liabilities=consistent_snapshot.get_user_account_liabilities(),
-        )
+    user_account_valuation_change = _write_valuation_entries(
+        history_entry, consistent_snapshot, valuation_date, repo, db_session
+    )
 
-    linked_accounts_valuation = consistent_snapshot.get_linked_accounts_valuation()
-    logging.debug(pretty_dump(linked_accounts_valuation))
-
-    with persist_scope(history_entry):
-        history_entry.linked_accounts_valuation_history_entries.extend(
-            [
-                model.LinkedAccountValuationHistoryEntry(
-                    linked_account_id=descriptor.linked_account_id,
-                    effective_snapshot_id=descriptor.snapshot_id,
-                    valuation=valuation,
-                )
-                for (descriptor, valuation) in linked_accounts_valuation.items()
-            ]
-        )
+    logging.info("new history entry added and enabled successfully")
 
-    sub_accounts_valuation = consistent_snapshot.get_sub_accounts_valuation()
-    logging.debug(pretty_dump(sub_accounts_valuation))
-
-    with persist_scope(history_entry):
-        history_entry.sub_accounts_valuation_history_entries.extend(
-            [
-                model.SubAccountValuationHistoryEntry(
-                    linked_account_id=descriptor.linked_account_id,
-                    sub_account_id=descriptor.sub_account_id,
-                    sub_account_ccy=descriptor.sub_account_ccy,
-                    sub_account_description=descriptor.sub_account_description,
-                    sub_account_type=descriptor.sub_account_type,
-                    sub_account_sub_type=descriptor.sub_account_sub_type,
-                    valuation=valuation.value_snapshot_ccy,
-                    valuation_sub_account_ccy=valuation.value_sub_account_ccy,
-                )
-                for (descriptor, valuation) in sub_accounts_valuation.items()
-            ]
+    return schema.WriteHistoryResponse(
+        report=schema.NewHistoryEntryReport(
+            history_entry_id=history_entry.id,
+            valuation_date=valuation_date,
+            valuation_currency=history_entry.valuation_ccy,
+            user_account_valuation=float(consistent_snapshot.get_user_account_valuation()),
+            valuation_change=reinterpret_as_pydantic(core_schema.ValuationChange, user_account_valuation_change),
         )
+    )
 
-    with persist_scope(history_entry):
-        history_entry.sub_accounts_items_valuation_history_entries.extend(
-            list(iter_sub_account_item_valuation_history_entries(consistent_snapshot))
-        )
 
+def _write_valuation_entries(
+    history_entry: model.UserAccountHistoryEntry,
+    consistent_snapshot: repository.ConsistentSnapshot,
+    valuation_date: datetime,
+    repo: repository.ReportRepository,
+    db_session: SessionType,
+) -> model.ValuationChangeEntry:
+    """Compute valuation changes upfront (from the reference history entries
+    valuations and the snapshot valuations) and bulk insert all valuation entries,
+    along with their valuation changes, in a single transaction which also makes
+    the history entry available.
+    """
     logging.info("handling valuation change calculations")
 
     reference_history_entry_ids = repo.get_reference_history_entry_ids(
         baseline_id=history_entry.id,
-        user_account_id=snapshot.user_account_id,
+        user_account_id=history_entry.user_account_id,
         valuation_date=valuation_date,
     )
 
     logging.info("reference history entry ids")
     logging.debug(pretty_dump(reference_history_entry_ids))
 
-    user_account_valuation_change = repo.get_user_account_valuation_change(reference_history_entry_ids)
+    user_account_valuation = consistent_snapshot.get_user_account_valuation()
+    user_account_row: dict[str, Any] = {
+        "history_entry_id": history_entry.id,
+        "valuation": user_account_valuation,
+        "total_liabilities": consistent_snapshot.get_user_account_liabilities(),
+    }
+    linked_account_rows: list[dict[str, Any]] = [
+        {
+            "history_entry_id": history_entry.id,
+            "linked_account_id": descriptor.linked_account_id,
+            "effective_snapshot_id": descriptor.snapshot_id,
+            "valuation": valuation,
+        }
+        for (descriptor, valuation) in consistent_snapshot.get_linked_accounts_valuation().items()
+    ]
+    sub_account_rows: list[dict[str, Any]] = [
+        {
+            "history_entry_id": history_entry.id,
+            "linked_account_id": descriptor.linked_account_id,
+            "sub_account_id": descriptor.sub_account_id,
+            "sub_account_ccy": descriptor.sub_account_ccy,
+            "sub_account_description": descriptor.sub_account_description,
+            "sub_account_type": descriptor.sub_account_type,
+            "sub_account_sub_type": descriptor.sub_account_sub_type,
+            "valuation": valuation.value_snapshot_ccy,
+            "valuation_sub_account_ccy": valuation.value_sub_account_ccy,
+        }
+        for (descriptor, valuation) in consistent_snapshot.get_sub_accounts_valuation().items()
+    ]
+    item_rows: list[dict[str, Any]] = [
+        {"history_entry_id": history_entry.id, **row}
+        for row in iter_sub_account_item_valuation_history_rows(consistent_snapshot)
+    ]
+
+    linked_account_keys = [
+        repository.LinkedAccountKey(linked_account_id=row["linked_account_id"]) for row in linked_account_rows
+    ]
+    sub_account_keys = [
+        repository.SubAccountKey(linked_account_id=row["linked_account_id"], sub_account_id=row["sub_account_id"])
+        for row in sub_account_rows
+    ]
+    item_keys = [
+        repository.SubAccountItemKey(
+            linked_account_id=row["linked_account_id"],
+            sub_account_id=row["sub_account_id"],
+            item_type=row["item_type"].name,
+            name=row["name"],
+        )
+        for row in item_rows
+    ]
+
+    user_account_valuation_change = repo.get_user_account_valuation_change(
+        reference_history_entry_ids, baseline=user_account_valuation
+    )
 
     logging.info("fetched user account valuation change")
     logging.debug(pretty_dump(user_account_valuation_change))
 
-    with persist_scope(history_entry):
-        history_entry.user_account_valuation_history_entry.valuation_change = user_account_valuation_change
-
-    linked_accounts_valuation_change = repo.get_linked_accounts_valuation_change(reference_history_entry_ids)
+    linked_accounts_valuation_change = repo.get_linked_accounts_valuation_change(
+        reference_history_entry_ids,
+        baseline={key: row["valuation"] for (key, row) in zip(linked_account_keys, linked_account_rows)},
+    )
 
     logging.info("fetched linked accounts valuation change")
-    logging.debug(pretty_dump(linked_accounts_valuation_change))
-
-    with persist_scope(history_entry):
-        for linked_accounts_valuation_history_entry in history_entry.linked_accounts_valuation_history_entries:
-            linked_accounts_valuation_history_entry.valuation_change = linked_accounts_valuation_change[
-                repository.LinkedAccountKey(linked_account_id=linked_accounts_valuation_history_entry.linked_account_id)
-            ]
 
-    sub_accounts_valuation_change = repo.get_sub_accounts_valuation_change(reference_history_entry_ids)
+    sub_accounts_valuation_change = repo.get_sub_accounts_valuation_change(
+        reference_history_entry_ids,
+        baseline={key: row["valuation"] for (key, row) in zip(sub_account_keys, sub_account_rows)},
+    )
 
     logging.info("fetched sub accounts valuation change")
-    logging.debug(pretty_dump(sub_accounts_valuation_change))
-
-    with persist_scope(history_entry):
-        for entry in history_entry.sub_accounts_valuation_history_entries:
-            entry.valuation_change = sub_accounts_valuation_change[
-                repository.SubAccountKey(
-                    linked_account_id=entry.linked_account_id,
-                    sub_account_id=entry.sub_account_id,
-                )
-            ]
 
-    sub_accounts_items_valuation_change = repo.get_sub_accounts_items_valuation_change(reference_history_entry_ids)
+    sub_accounts_items_valuation_change = repo.get_sub_accounts_items_valuation_change(
+        reference_history_entry_ids,
+        baseline={key: row["valuation"] for (key, row) in zip(item_keys, item_rows)},
+    )
 
     logging.info("fetched sub accounts items valuation change")
-    logging.debug(pretty_dump(sub_accounts_items_valuation_change))
-
-    with persist_scope(history_entry):
-        for sub_accounts_items_valuation_history_entry in history_entry.sub_accounts_items_valuation_history_entries:
-            sub_accounts_items_valuation_history_entry.valuation_change = sub_accounts_items_valuation_change[
-                repository.SubAccountItemKey(
-                    linked_account_id=sub_accounts_items_valuation_history_entry.linked_account_id,
-                    sub_account_id=sub_accounts_items_valuation_history_entry.sub_account_id,
-                    item_type=sub_accounts_items_valuation_history_entry.item_type.name,
-                    name=sub_accounts_items_valuation_history_entry.name,
-                )
-            ]
-
-    with persist_scope(history_entry):
-        history_entry.available = True
 
-    logging.info("new history entry added and enabled successfully")
-
-    # Consolidate transactions (dedup + FX convert + upsert)
-    try:
-        new_uncategorized_ids = transactions.consolidate_transactions(
-            snapshot_id=snapshot_id,
-            db_session=db_session,
-        )
-        if new_uncategorized_ids:
-            logging.info(f"consolidated {len(new_uncategorized_ids)} new transactions")
-            _enrich_merchants(new_uncategorized_ids, db_session)
-            _categorize_new_transactions(new_uncategorized_ids, db_session)
-            db_session.commit()
-    except Exception:
-        logging.exception("failed to consolidate transactions (non-fatal)")
-
-    # Match transfer pairs across accounts
-    try:
-        match_count = matching.match_transactions(
-            snapshot_id=snapshot_id,
-            db_session=db_session,
+    # in the same order as the valuation entries rows
+    valuation_changes: list[dict[str, Any]] = [
+        change.serialize()
+        for change in itertools.chain(
+            [user_account_valuation_change],
+            (linked_accounts_valuation_change[key] for key in linked_account_keys),
+            (sub_accounts_valuation_change[key] for key in sub_account_keys),
+            (sub_accounts_items_valuation_change[key] for key in item_keys),
         )
-        if match_count:
-            logging.info(f"matched {match_count} transaction pairs")
-    except Exception:
-        logging.exception("failed to match transactions (non-fatal)")
-
-    # Detect recurring transactions
-    try:
-        recurring_count = recurring.detect_recurring_transactions(
-            user_account_id=snapshot.user_account_id,
-            db_session=db_session,
-        )
-        if recurring_count:
-            logging.info(f"detected {recurring_count} recurring transaction groups")
-    except Exception:
-        logging.exception("failed to detect recurring transactions (non-fatal)")
-
-    return schema.WriteHistoryResponse(
-        report=schema.NewHistoryEntryReport(
-            history_entry_id=history_entry.id,
-            valuation_date=valuation_date,
-            valuation_currency=history_entry.valuation_ccy,
-            user_account_valuation=float(user_account_valuation),
-            valuation_change=reinterpret_as_pydantic(core_schema.ValuationChange, user_account_valuation_change),
-        )
-    )
-
-
-def _enrich_merchants(
-    transaction_ids: list[int],
-    db_session: SessionType,
-) -> None:
-    from finbot.core.merchant_enricher import enrich_transactions_with_merchants
-
-    try:
-        asyncio.run(enrich_transactions_with_merchants(transaction_ids, db_session))
-    except Exception:
-        logging.exception("merchant enrichment failed (non-fatal)")
-
-
-def _categorize_new_transactions(
-    transaction_ids: list[int],
-    db_session: SessionType,
-) -> None:
-    from finbot.core.spending_categorizer import categorize_transaction_batch
+    ]
+
+    logging.info(f"writing {len(valuation_changes)} valuation entries")
+
+    with PersistScope(db_session)(history_entry):
+        valuation_change_ids = repo.allocate_valuation_change_ids(len(valuation_changes))
+        for valuation_change, valuation_change_id in zip(valuation_changes, valuation_change_ids, strict=True):
+            valuation_change["id"] = valuation_change_id
+        for row, valuation_change_id in zip(
+            itertools.chain([user_account_row], linked_account_rows, sub_account_rows, item_rows),
+            valuation_change_ids,
+            strict=True,
+        ):
+            row["valuation_change_id"] = valuation_change_id
+        for entry_type, rows in [
+            (model.ValuationChangeEntry, valuation_changes),
+            (model.UserAccountValuationHistoryEntry, [user_account_row]),
+            (model.LinkedAccountValuationHistoryEntry, linked_account_rows),
+            (model.SubAccountValuationHistoryEntry, sub_account_rows),
+            (model.SubAccountItemValuationHistoryEntry, item_rows),
+        ]:
+            for chunk in itertools.batched(rows, BULK_INSERT_CHUNK_SIZE):
+                db_session.execute(insert(entry_type).values(list(chunk)))
+        model_repository.update_user_account_valuation_rollups(db_session, history_entry.id)
+        history_entry.available = True
 
-    try:
-        asyncio.run(categorize_transaction_batch(transaction_ids, db_session))
-    except Exception:
-        logging.exception("LLM spending categorization failed (non-fatal)")
+    return user_account_valuation_change
 
 
 class ValuationHistoryWriterService(object):
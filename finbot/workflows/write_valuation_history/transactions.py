@@ -1,36 +1,77 @@
 import logging
+from dataclasses import dataclass, field
 from decimal import Decimal
+from itertools import batched
+from typing import Any, Iterable
 
+from sqlalchemy import Date, cast, tuple_
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.sql import text
+from sqlalchemy.sql import literal_column
 
 from finbot import model
 from finbot.model import SessionType
+from finbot.model import repository as model_repository
 from finbot.providers.schema import TransactionType
 
 logger = logging.getLogger(__name__)
 
+# Each upserted row binds ~20 parameters, this keeps every statement well under
+# the 65535 bind parameters limit supported by Postgres.
+UPSERT_CHUNK_SIZE = 1000
+
+TransactionKey = tuple[int, str, str]
+
+
+@dataclass(frozen=True)
+class RawTransactionsBatch:
+    linked_account_id: int
+    transactions: list[dict[str, Any]]
+
+
+@dataclass
+class UpsertStats:
+    inserted: int = 0
+    updated: int = 0
+    # (linked account, day) of the upserted rows, before and after the upsert
+    days: set[model_repository.TransactionDay] = field(default_factory=set)
+
 
 def consolidate_transactions(
     snapshot_id: int,
     db_session: SessionType,
+    chunk_size: int = UPSERT_CHUNK_SIZE,
 ) -> list[int]:
     """Consolidate raw transaction snapshot entries into the permanent history table.
 
-    Returns the IDs of newly inserted (not updated) TransactionHistoryEntry rows.
+    All raw entries in the snapshot are decoded and FX converted in a single pass,
+    then upserted in chunks of `chunk_size` rows. Each chunk is a single
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, so no follow-up
+    query is needed to find out which rows were inserted or updated.
+
+    Returns the IDs of consolidated TransactionHistoryEntry rows which are not
+    categorized yet.
     """
-    # 1. Read raw transaction snapshot entries for this snapshot
-    raw_entries: list[model.TransactionsSnapshotEntry] = (
-        db_session.query(model.TransactionsSnapshotEntry)
-        .join(  # type: ignore[no-untyped-call]
-            model.LinkedAccountSnapshotEntry,
-            model.TransactionsSnapshotEntry.linked_account_snapshot_entry_id == model.LinkedAccountSnapshotEntry.id,
+    # 1. Read and decode raw transaction snapshot entries for this snapshot
+    raw_batches = [
+        RawTransactionsBatch(
+            linked_account_id=linked_account_id,
+            transactions=model.TransactionsSnapshotEntry.decompress_transactions(transactions_data),
         )
-        .filter(model.LinkedAccountSnapshotEntry.snapshot_id == snapshot_id)
-        .all()
-    )
+        for (linked_account_id, transactions_data) in (
+            db_session.query(
+                model.LinkedAccountSnapshotEntry.linked_account_id,
+                model.TransactionsSnapshotEntry.transactions_data,
+            )
+            .join(  # type: ignore[no-untyped-call]
+                model.LinkedAccountSnapshotEntry,
+                model.TransactionsSnapshotEntry.linked_account_snapshot_entry_id == model.LinkedAccountSnapshotEntry.id,
+            )
+            .filter(model.LinkedAccountSnapshotEntry.snapshot_id == snapshot_id)
+            .all()
+        )
+    ]
 
-    if not raw_entries:
+    if not raw_batches:
         logger.info("no transaction snapshot entries found for snapshot_id=%d", snapshot_id)
         return []
 
@@ -43,100 +84,173 @@ def consolidate_transactions(
     snapshot: model.UserAccountSnapshot = db_session.query(model.UserAccountSnapshot).filter_by(id=snapshot_id).one()
     target_ccy = snapshot.requested_ccy
 
-    # 4. Process each raw entry
-    new_ids: list[int] = []
-    for raw_entry in raw_entries:
-        linked_account_id = raw_entry.linked_account_snapshot_entry.linked_account_id
-        transactions = raw_entry.transactions
-
-        for txn_data in transactions:
-            txn_type = TransactionType(txn_data["transaction_type"])
-            amount = Decimal(str(txn_data["amount"]))
-            currency = txn_data["currency"]
-
-            # FX conversion
-            amount_snapshot_ccy = _convert_amount(amount, currency, target_ccy, xccy_rates)
-
-            # Determine spending category source
-            spending_source = None
-            if txn_data.get("spending_category_primary"):
-                spending_source = "provider"
-
-            # Upsert using INSERT ... ON CONFLICT DO UPDATE
-            stmt = pg_insert(model.TransactionHistoryEntry).values(
-                linked_account_id=linked_account_id,
-                sub_account_id=txn_data["account_id"],
-                provider_transaction_id=txn_data["transaction_id"],
-                transaction_date=txn_data["transaction_date"],
-                transaction_type=txn_type.value,
-                amount=amount,
-                amount_snapshot_ccy=amount_snapshot_ccy,
-                currency=currency,
-                description=txn_data.get("description", "")[:512],
-                symbol=txn_data.get("symbol"),
-                units=Decimal(str(txn_data["units"])) if txn_data.get("units") is not None else None,
-                unit_price=Decimal(str(txn_data["unit_price"])) if txn_data.get("unit_price") is not None else None,
-                fee=Decimal(str(txn_data["fee"])) if txn_data.get("fee") is not None else None,
-                counterparty=txn_data.get("counterparty"),
-                spending_category_primary=txn_data.get("spending_category_primary"),
-                spending_category_detailed=txn_data.get("spending_category_detailed"),
-                spending_category_source=spending_source,
-                provider_specific_data=txn_data.get("provider_specific"),
-                source_snapshot_id=snapshot_id,
-            )
-
-            # ON CONFLICT: update most fields but preserve spending categories if already set
-            stmt = stmt.on_conflict_do_update(
-                constraint="uidx_transactions_history_dedup",
-                set_={
-                    "transaction_date": stmt.excluded.transaction_date,
-                    "transaction_type": stmt.excluded.transaction_type,
-                    "amount": stmt.excluded.amount,
-                    "amount_snapshot_ccy": stmt.excluded.amount_snapshot_ccy,
-                    "currency": stmt.excluded.currency,
-                    "description": stmt.excluded.description,
-                    "symbol": stmt.excluded.symbol,
-                    "units": stmt.excluded.units,
-                    "unit_price": stmt.excluded.unit_price,
-                    "fee": stmt.excluded.fee,
-                    "counterparty": stmt.excluded.counterparty,
-                    "provider_specific_data": stmt.excluded.provider_specific_data,
-                    "source_snapshot_id": stmt.excluded.source_snapshot_id,
-                },
-            )
-
-            result = db_session.execute(stmt)
-            db_session.flush()
-
-            # Check if this was an insert (not an update) — collect for LLM categorization
-            if result.rowcount == 1:
-                # Retrieve the inserted/updated row's ID
-                row = db_session.execute(
-                    text(
-                        "SELECT id, spending_category_source FROM finbot_transactions_history"
-                        " WHERE linked_account_id = :la_id"
-                        " AND sub_account_id = :sa_id"
-                        " AND provider_transaction_id = :ptid"
-                    ),
-                    {
-                        "la_id": linked_account_id,
-                        "sa_id": txn_data["account_id"],
-                        "ptid": txn_data["transaction_id"],
-                    },
-                ).fetchone()
-                if row and row[1] is None:
-                    new_ids.append(row[0])
+    # 4. Build (FX converted) rows for all transactions in the snapshot
+    rows = build_transaction_rows(
+        raw_batches=raw_batches,
+        snapshot_id=snapshot_id,
+        target_ccy=target_ccy,
+        xccy_rates=xccy_rates,
+    )
 
+    # 5. Upsert rows in chunks
+    new_ids, stats = upsert_transaction_rows(rows, db_session, chunk_size)
+    model_repository.update_cash_flow_aggregates(db_session, stats.days)
     db_session.commit()
 
     logger.info(
-        "consolidated transactions for snapshot_id=%d: %d new uncategorized entries",
+        "consolidated transactions for snapshot_id=%d: %d inserted, %d updated, %d uncategorized entries",
         snapshot_id,
+        stats.inserted,
+        stats.updated,
         len(new_ids),
     )
     return new_ids
 
 
+def build_transaction_rows(
+    raw_batches: Iterable[RawTransactionsBatch],
+    snapshot_id: int,
+    target_ccy: str,
+    xccy_rates: dict[str, Decimal],
+) -> list[dict[str, Any]]:
+    """Convert raw provider transactions to `finbot_transactions_history` rows.
+
+    Transactions are de-duplicated on the history table unique key (a single
+    upsert statement cannot affect the same row twice), the last occurrence wins.
+    """
+    rows: dict[TransactionKey, dict[str, Any]] = {}
+    for raw_batch in raw_batches:
+        for txn_data in raw_batch.transactions:
+            row = _build_transaction_row(
+                txn_data=txn_data,
+                linked_account_id=raw_batch.linked_account_id,
+                snapshot_id=snapshot_id,
+                target_ccy=target_ccy,
+                xccy_rates=xccy_rates,
+            )
+            rows[(row["linked_account_id"], row["sub_account_id"], row["provider_transaction_id"])] = row
+    return list(rows.values())
+
+
+def upsert_transaction_rows(
+    rows: list[dict[str, Any]],
+    db_session: SessionType,
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> tuple[list[int], UpsertStats]:
+    """Upsert `finbot_transactions_history` rows (does not commit).
+
+    Returns the IDs of upserted rows which are not categorized yet, along with
+    the number of inserted and updated rows and the days they touched.
+    """
+    stats = UpsertStats()
+    uncategorized_ids: list[int] = []
+    for chunk in batched(rows, chunk_size):
+        # an updated row may move to another day, its current day is stale as well
+        stats.days.update(_find_existing_rows_days(list(chunk), db_session))
+        for row in db_session.execute(_build_upsert_statement(list(chunk))):
+            stats.days.add((row.linked_account_id, row.day))
+            if row.inserted:
+                stats.inserted += 1
+            else:
+                stats.updated += 1
+            if row.spending_category_source is None:
+                uncategorized_ids.append(row.id)
+    return uncategorized_ids, stats
+
+
+def _build_transaction_row(
+    txn_data: dict[str, Any],
+    linked_account_id: int,
+    snapshot_id: int,
+    target_ccy: str,
+    xccy_rates: dict[str, Decimal],
+) -> dict[str, Any]:
+    txn_type = TransactionType(txn_data["transaction_type"])
+    amount = Decimal(str(txn_data["amount"]))
+    currency = txn_data["currency"]
+    return {
+        "linked_account_id": linked_account_id,
+        "sub_account_id": txn_data["account_id"],
+        "provider_transaction_id": txn_data["transaction_id"],
+        "transaction_date": txn_data["transaction_date"],
+        "transaction_type": txn_type.value,
+        "amount": amount,
+        "amount_snapshot_ccy": _convert_amount(amount, currency, target_ccy, xccy_rates),
+        "currency": currency,
+        "description": txn_data.get("description", "")[:512],
+        "symbol": txn_data.get("symbol"),
+        "units": _decimal_or_none(txn_data.get("units")),
+        "unit_price": _decimal_or_none(txn_data.get("unit_price")),
+        "fee": _decimal_or_none(txn_data.get("fee")),
+        "counterparty": txn_data.get("counterparty"),
+        "spending_category_primary": txn_data.get("spending_category_primary"),
+        "spending_category_detailed": txn_data.get("spending_category_detailed"),
+        "spending_category_source": "provider" if txn_data.get("spending_category_primary") else None,
+        "provider_specific_data": txn_data.get("provider_specific"),
+        "source_snapshot_id": snapshot_id,
+    }
+
+
+def _build_upsert_statement(rows: list[dict[str, Any]]) -> Any:
+    stmt = pg_insert(model.TransactionHistoryEntry).values(rows)
+
+    # ON CONFLICT: update most fields but preserve spending categories if already set
+    stmt = stmt.on_conflict_do_update(
+        constraint="uidx_transactions_history_dedup",
+        set_={
+            "transaction_date": stmt.excluded.transaction_date,
+            "transaction_type": stmt.excluded.transaction_type,
+            "amount": stmt.excluded.amount,
+            "amount_snapshot_ccy": stmt.excluded.amount_snapshot_ccy,
+            "currency": stmt.excluded.currency,
+            "description": stmt.excluded.description,
+            "symbol": stmt.excluded.symbol,
+            "units": stmt.excluded.units,
+            "unit_price": stmt.excluded.unit_price,
+            "fee": stmt.excluded.fee,
+            "counterparty": stmt.excluded.counterparty,
+            "provider_specific_data": stmt.excluded.provider_specific_data,
+            "source_snapshot_id": stmt.excluded.source_snapshot_id,
+        },
+    )
+
+    # xmax is only set on the returned row version when the upsert took the UPDATE path
+    return stmt.returning(
+        model.TransactionHistoryEntry.id,
+        model.TransactionHistoryEntry.linked_account_id,
+        cast(model.TransactionHistoryEntry.transaction_date, Date).label("day"),
+        model.TransactionHistoryEntry.spending_category_source,
+        literal_column("(xmax = 0)").label("inserted"),
+    )
+
+
+def _find_existing_rows_days(
+    rows: list[dict[str, Any]],
+    db_session: SessionType,
+) -> set[model_repository.TransactionDay]:
+    return {
+        (linked_account_id, day)
+        for (linked_account_id, day) in db_session.query(
+            model.TransactionHistoryEntry.linked_account_id,
+            cast(model.TransactionHistoryEntry.transaction_date, Date),
+        )
+        .filter(
+            tuple_(
+                model.TransactionHistoryEntry.linked_account_id,
+                model.TransactionHistoryEntry.sub_account_id,
+                model.TransactionHistoryEntry.provider_transaction_id,
+            ).in_([(row["linked_account_id"], row["sub_account_id"], row["provider_transaction_id"]) for row in rows])
+        )
+        .distinct()  # type: ignore[no-untyped-call]
+    }
+
+
+def _decimal_or_none(value: Any) -> Decimal | None:
+    if value is None:
+        return None
+    return Decimal(str(value))
+
+
 def _convert_amount(
     amount: Decimal,
     currency: str,
@@ -1,9 +1,22 @@
 from datetime import timedelta
+from typing import Callable
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
+from temporalio.workflow import ParentClosePolicy
 
-from finbot.workflows.write_valuation_history.schema import WriteHistoryRequest, WriteHistoryResponse
+from finbot.core.temporal_ import TRY_ONCE
+from finbot.workflows.write_valuation_history.schema import (
+    PostProcessingStageReport,
+    PostProcessingStageRequest,
+    PostProcessTransactionsRequest,
+    PostProcessTransactionsResponse,
+    WriteHistoryRequest,
+    WriteHistoryResponse,
+)
+
+PostProcessingActivityType = Callable[[PostProcessingStageRequest], PostProcessingStageReport]
 
 
 @workflow.defn(name="write_valuation_history")
@@ -12,7 +25,7 @@ class WriteValuationHistoryWorkflow:
     async def run(self, request: WriteHistoryRequest) -> WriteHistoryResponse:
         from finbot.workflows.write_valuation_history.activities import write_history
 
-        return await workflow.execute_activity(
+        response = await workflow.execute_activity(
             write_history,
             request,
             retry_policy=RetryPolicy(
@@ -20,3 +33,70 @@ class WriteValuationHistoryWorkflow:
             ),
             start_to_close_timeout=timedelta(seconds=1200.0),
         )
+        # transactions post-processing (LLM bound) runs after the valuation is published
+        # (runs started before that change post-processed transactions in write_history)
+        if workflow.patched("post-process-transactions-child-workflow"):
+            await workflow.start_child_workflow(
+                PostProcessTransactionsWorkflow.run,
+                PostProcessTransactionsRequest(snapshot_id=request.snapshot_id),
+                retry_policy=TRY_ONCE,
+                parent_close_policy=ParentClosePolicy.ABANDON,
+            )
+        return response
+
+
+@workflow.defn(name="post_process_transactions")
+class PostProcessTransactionsWorkflow:
+    @workflow.run
+    async def run(self, request: PostProcessTransactionsRequest) -> PostProcessTransactionsResponse:
+        from finbot.workflows.write_valuation_history.activities import (
+            categorize_transactions,
+            consolidate_transactions,
+            detect_recurring_transactions,
+            enrich_merchants,
+            match_transactions,
+        )
+
+        snapshot_request = PostProcessingStageRequest(snapshot_id=request.snapshot_id)
+        consolidation = await self.run_stage(consolidate_transactions, snapshot_request)
+        new_transactions_request = PostProcessingStageRequest(
+            snapshot_id=request.snapshot_id,
+            transaction_ids=consolidation.transaction_ids,
+        )
+
+        # all stages update the same transactions rows (matching and categorization
+        # also the cash-flow aggregates of their days), so they run one after the other
+        stages = [
+            consolidation,
+            await self.run_stage(match_transactions, snapshot_request),
+            await self.run_stage(enrich_merchants, new_transactions_request),
+            await self.run_stage(categorize_transactions, new_transactions_request),
+            await self.run_stage(detect_recurring_transactions, snapshot_request),
+        ]
+        for stage in stages:
+            workflow.logger.info(
+                f"post-processing stage {stage.stage} took {stage.duration_seconds:.2f}s (succeeded={stage.succeeded})"
+            )
+        return PostProcessTransactionsResponse(stages=stages)
+
+    @classmethod
+    async def run_stage(
+        cls,
+        stage_activity: PostProcessingActivityType,
+        request: PostProcessingStageRequest,
+    ) -> PostProcessingStageReport:
+        started_at = workflow.now()
+        try:
+            return await workflow.execute_activity(
+                stage_activity,
+                request,
+                retry_policy=TRY_ONCE,
+                start_to_close_timeout=timedelta(seconds=1200.0),
+            )
+        except ActivityError:
+            workflow.logger.exception(f"post-processing activity {stage_activity.__name__} failed")
+            return PostProcessingStageReport(
+                stage=stage_activity.__name__,
+                succeeded=False,
+                duration_seconds=(workflow.now() - started_at).total_seconds(),
+            )
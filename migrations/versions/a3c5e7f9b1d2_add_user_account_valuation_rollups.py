@@ -0,0 +1,74 @@
+"""add user account valuation rollups
+
+Revision ID: a3c5e7f9b1d2
+Revises: f1c8a3d27b50
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b1d2'
+down_revision = 'f1c8a3d27b50'
+branch_labels = None
+depends_on = None
+
+
+# frequency, date_trunc unit, bucket interval, period label (as in finbot.model.repository)
+ROLLUP_FREQUENCIES = [
+    ('Daily', 'day', '1 day', "fuahe.effective_at::timestamp::date::text"),
+    ('Weekly', 'week', '1 week', "'W' || to_char(fuahe.effective_at, 'IW IYYY')"),
+    ('Monthly', 'month', '1 month', "to_char(fuahe.effective_at, 'Month YYYY')"),
+    ('Quarterly', 'quarter', '3 months', "'Q' || to_char(fuahe.effective_at, 'Q YYYY')"),
+    ('Yearly', 'year', '1 year', "extract(year from fuahe.effective_at)::text"),
+]
+
+
+def upgrade():
+    op.create_table(
+        'finbot_user_accounts_valuation_rollups',
+        sa.Column('user_account_id', sa.Integer(), sa.ForeignKey('finbot_user_accounts.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('frequency', sa.String(16), primary_key=True),
+        sa.Column('bucket_start', TIMESTAMP(timezone=True), primary_key=True),
+        sa.Column('bucket_end', TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('valuation_period', sa.String(32), nullable=False),
+        sa.Column('period_start', TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('period_end', TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('first_value', sa.Numeric(), nullable=False),
+        sa.Column('last_value', sa.Numeric(), nullable=False),
+        sa.Column('min_value', sa.Numeric(), nullable=False),
+        sa.Column('max_value', sa.Numeric(), nullable=False),
+        sa.Column('created_at', TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', TIMESTAMP(timezone=True)),
+    )
+
+    for frequency, unit, interval, label in ROLLUP_FREQUENCIES:
+        op.execute(f"""
+            INSERT INTO finbot_user_accounts_valuation_rollups (
+                user_account_id, frequency, bucket_start, bucket_end, valuation_period,
+                period_start, period_end, first_value, last_value, min_value, max_value
+            )
+            SELECT fuahe.user_account_id,
+                   '{frequency}',
+                   date_trunc('{unit}', fuahe.effective_at),
+                   date_trunc('{unit}', fuahe.effective_at) + interval '{interval}',
+                   min({label}),
+                   min(fuahe.effective_at),
+                   max(fuahe.effective_at),
+                   (array_agg(fuavhe.valuation ORDER BY fuahe.effective_at))[1],
+                   (array_agg(fuavhe.valuation ORDER BY fuahe.effective_at DESC))[1],
+                   min(fuavhe.valuation),
+                   max(fuavhe.valuation)
+              FROM finbot_user_accounts_valuation_history_entries fuavhe
+              JOIN finbot_user_accounts_history_entries fuahe
+                ON fuavhe.history_entry_id = fuahe.id
+             WHERE fuahe.available
+          GROUP BY fuahe.user_account_id, date_trunc('{unit}', fuahe.effective_at)
+        """)
+
+
+def downgrade():
+    op.drop_table('finbot_user_accounts_valuation_rollups')
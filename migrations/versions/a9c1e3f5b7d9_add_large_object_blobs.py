@@ -0,0 +1,31 @@
+"""add large object blobs
+
+Revision ID: a9c1e3f5b7d9
+Revises: f8a0d2e4b6c7
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c1e3f5b7d9'
+down_revision = 'f8a0d2e4b6c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'finbot_large_object_blobs',
+        sa.Column('oid', sa.BigInteger(), primary_key=True),
+        sa.Column('created_at', TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('idx_large_object_blobs_created_at', 'finbot_large_object_blobs', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('idx_large_object_blobs_created_at', table_name='finbot_large_object_blobs')
+    op.drop_table('finbot_large_object_blobs')
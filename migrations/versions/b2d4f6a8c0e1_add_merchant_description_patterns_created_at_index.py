@@ -0,0 +1,27 @@
+"""add merchant description patterns created_at index
+
+Revision ID: b2d4f6a8c0e1
+Revises: a9c1e3f5b7d9
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c0e1'
+down_revision = 'a9c1e3f5b7d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_merchant_description_patterns_created_at',
+        'finbot_merchant_description_patterns',
+        ['created_at'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_merchant_description_patterns_created_at', table_name='finbot_merchant_description_patterns')
@@ -0,0 +1,37 @@
+"""add llm results cache
+
+Revision ID: b4d6f8a0c2e3
+Revises: a3c5e7f9b1d2
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+
+from finbot.core.db.types import JSONEncoded
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d6f8a0c2e3'
+down_revision = 'a3c5e7f9b1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'finbot_llm_results_cache',
+        sa.Column('cache_key', sa.String(64), primary_key=True),
+        sa.Column('task', sa.String(32), nullable=False),
+        sa.Column('version', sa.String(64), nullable=False),
+        sa.Column('result', JSONEncoded(), nullable=False),
+        sa.Column('created_at', TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', TIMESTAMP(timezone=True)),
+    )
+    op.create_index('idx_llm_results_cache_task_version', 'finbot_llm_results_cache', ['task', 'version'])
+
+
+def downgrade():
+    op.drop_index('idx_llm_results_cache_task_version', table_name='finbot_llm_results_cache')
+    op.drop_table('finbot_llm_results_cache')
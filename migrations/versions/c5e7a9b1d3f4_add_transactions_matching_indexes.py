@@ -0,0 +1,30 @@
+"""add transactions matching indexes
+
+Revision ID: c5e7a9b1d3f4
+Revises: b4d6f8a0c2e3
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e7a9b1d3f4'
+down_revision = 'b4d6f8a0c2e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_transactions_history_source_snapshot', 'finbot_transactions_history', ['source_snapshot_id'])
+    op.create_index(
+        'idx_transactions_history_abs_amount_date',
+        'finbot_transactions_history',
+        [sa.text('abs(amount_snapshot_ccy)'), 'transaction_date'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_transactions_history_abs_amount_date', table_name='finbot_transactions_history')
+    op.drop_index('idx_transactions_history_source_snapshot', table_name='finbot_transactions_history')
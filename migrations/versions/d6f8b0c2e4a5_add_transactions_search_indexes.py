@@ -0,0 +1,46 @@
+"""add transactions search indexes
+
+Revision ID: d6f8b0c2e4a5
+Revises: c5e7a9b1d3f4
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f8b0c2e4a5'
+down_revision = 'c5e7a9b1d3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'idx_transactions_history_description_trgm',
+        'finbot_transactions_history',
+        ['description'],
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'idx_transactions_history_counterparty_trgm',
+        'finbot_transactions_history',
+        ['counterparty'],
+        postgresql_using='gin',
+        postgresql_ops={'counterparty': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'idx_merchants_name_trgm',
+        'finbot_merchants',
+        ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('idx_merchants_name_trgm', table_name='finbot_merchants')
+    op.drop_index('idx_transactions_history_counterparty_trgm', table_name='finbot_transactions_history')
+    op.drop_index('idx_transactions_history_description_trgm', table_name='finbot_transactions_history')
@@ -0,0 +1,41 @@
+"""add transactions is_internal_transfer
+
+Revision ID: e7f9c1d3a5b6
+Revises: d6f8b0c2e4a5
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f9c1d3a5b6'
+down_revision = 'd6f8b0c2e4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'finbot_transactions_history',
+        sa.Column('is_internal_transfer', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    )
+    op.execute("""
+        UPDATE finbot_transactions_history th
+           SET is_internal_transfer = true
+          FROM finbot_transaction_matches tm
+         WHERE tm.match_status != 'rejected'
+           AND th.id IN (tm.outflow_transaction_id, tm.inflow_transaction_id)
+    """)
+    op.create_index(
+        'idx_transactions_history_account_date_external',
+        'finbot_transactions_history',
+        ['linked_account_id', 'transaction_date'],
+        postgresql_where=sa.text('NOT is_internal_transfer'),
+    )
+
+
+def downgrade():
+    op.drop_index('idx_transactions_history_account_date_external', table_name='finbot_transactions_history')
+    op.drop_column('finbot_transactions_history', 'is_internal_transfer')
@@ -0,0 +1,75 @@
+"""add cash flow daily aggregates
+
+Revision ID: f8a0d2e4b6c7
+Revises: e7f9c1d3a5b6
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a0d2e4b6c7'
+down_revision = 'e7f9c1d3a5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'finbot_cash_flow_daily_aggregates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_account_id', sa.Integer(), nullable=False),
+        sa.Column('linked_account_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('transaction_type', sa.String(32), nullable=False),
+        sa.Column('spending_category_primary', sa.String(64), nullable=True),
+        sa.Column('is_internal_transfer', sa.Boolean(), nullable=False),
+        sa.Column('inflows', sa.Numeric(), nullable=False),
+        sa.Column('outflows', sa.Numeric(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_account_id'], ['finbot_user_accounts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['linked_account_id'], ['finbot_linked_accounts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute("""
+        INSERT INTO finbot_cash_flow_daily_aggregates (
+            user_account_id, linked_account_id, day, transaction_type, spending_category_primary,
+            is_internal_transfer, inflows, outflows, transaction_count
+        )
+        SELECT la.user_account_id,
+               th.linked_account_id,
+               th.transaction_date::date,
+               th.transaction_type,
+               th.spending_category_primary,
+               th.is_internal_transfer,
+               COALESCE(SUM(CASE WHEN th.amount_snapshot_ccy > 0 THEN th.amount_snapshot_ccy ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN th.amount_snapshot_ccy < 0 THEN th.amount_snapshot_ccy ELSE 0 END), 0),
+               COUNT(*)
+          FROM finbot_transactions_history th
+          JOIN finbot_linked_accounts la ON la.id = th.linked_account_id
+         GROUP BY la.user_account_id,
+                  th.linked_account_id,
+                  th.transaction_date::date,
+                  th.transaction_type,
+                  th.spending_category_primary,
+                  th.is_internal_transfer
+    """)
+    op.create_index(
+        'idx_cash_flow_daily_aggregates_user_day',
+        'finbot_cash_flow_daily_aggregates',
+        ['user_account_id', 'day'],
+    )
+    op.create_index(
+        'idx_cash_flow_daily_aggregates_account_day',
+        'finbot_cash_flow_daily_aggregates',
+        ['linked_account_id', 'day'],
+    )
+
+
+def downgrade():
+    op.drop_index('idx_cash_flow_daily_aggregates_account_day', table_name='finbot_cash_flow_daily_aggregates')
+    op.drop_index('idx_cash_flow_daily_aggregates_user_day', table_name='finbot_cash_flow_daily_aggregates')
+    op.drop_table('finbot_cash_flow_daily_aggregates')
@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import threading
+from datetime import date
+from typing import Any, AsyncIterator
+
+import orjson
+import pytest
+from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam, ChatCompletionToolParam
+
+from finbot.apps.appwsrv.agent import runner, tool_cache
+from finbot.apps.appwsrv.agent import schema as agent_schema
+from finbot.apps.appwsrv.agent import tools as agent_tools
+from finbot.apps.appwsrv.agent.tools.base import NoArgs, ToolResult, ToolSpec
+from finbot.core.llm_gateway import FakeLLMBackend, LLMGateway
+from finbot.core.schema import BaseModel
+
+
+def make_version(last_history_entry_id: int) -> tool_cache.DataVersion:
+    return tool_cache.DataVersion(
+        last_history_entry_id=last_history_entry_id,
+        last_transaction_id=None,
+        last_account_change=None,
+        today=date(2026, 1, 1),
+    )
+
+
+def make_chunk(delta: dict[str, Any], finish_reason: str | None = None) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "fake",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+    )
+
+
+class TwoRoundsBackend(FakeLLMBackend):
+    """Requests two tool calls in the first round, then answers"""
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: list[ChatCompletionMessageParam],
+        tools: list[ChatCompletionToolParam],
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        self.requests.append((model, ""))
+        if len(self.requests) == 1:
+            tool_calls = [
+                {"index": i, "id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": "{}"}}
+                for i, name in enumerate(["first_tool", "second_tool"])
+            ]
+            yield make_chunk({"tool_calls": tool_calls})
+            yield make_chunk({}, finish_reason="tool_calls")
+        else:
+            yield make_chunk({"content": "done"}, finish_reason="stop")
+
+
+def test_tool_calls_of_a_round_run_concurrently_and_report_in_order(monkeypatch: pytest.MonkeyPatch):
+    # both handlers must be running at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def make_tool(name: str) -> ToolSpec[NoArgs]:
+        def handler(args: NoArgs) -> ToolResult:
+            barrier.wait()
+            return ToolResult(payload={"tool": name}, summary=name)
+
+        return ToolSpec(
+            name=name,
+            description=name,
+            args_model=NoArgs,
+            icon="search",
+            label=name,
+            is_render_tool=True,
+            handler=handler,
+        )
+
+    for name in ("first_tool", "second_tool"):
+        monkeypatch.setitem(agent_tools.TOOLS_BY_NAME, name, make_tool(name))
+    gateway = LLMGateway(TwoRoundsBackend())
+    monkeypatch.setattr(runner, "get_llm_gateway", lambda: gateway)
+    monkeypatch.setattr(runner, "_load_context", lambda user_account_id: (make_version(1), "system prompt"))
+
+    async def run() -> list[tuple[str, dict[str, Any]]]:
+        events = []
+        async for sse in runner.stream_agent_response(1, [agent_schema.ChatMessage(role="user", content="hi")]):
+            event_line, data_line = sse.decode().strip().split("\n")
+            events.append((event_line.removeprefix("event: "), orjson.loads(data_line.removeprefix("data: "))))
+        return events
+
+    events = asyncio.run(run())
+    assert [(event, data.get("id"), data.get("status")) for event, data in events] == [
+        ("assistant_message_start", None, None),
+        ("tool_call_start", "call_0", None),
+        ("tool_call_start", "call_1", None),
+        ("tool_call_end", "call_0", "done"),
+        ("tool_call_end", "call_1", "done"),
+        ("text_delta", None, None),
+        ("done", None, None),
+    ]
+
+
+class LimitArgs(BaseModel):
+    limit: int = 10
+
+
+def test_data_tool_results_are_cached_until_data_version_changes(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(runner, "ScopedSession", contextlib.nullcontext)
+    calls: list[int] = []
+
+    def handler(session: Any, user_account_id: int, args: LimitArgs) -> ToolResult:
+        calls.append(args.limit)
+        return ToolResult(payload={"limit": args.limit}, summary="")
+
+    spec = ToolSpec(
+        name="cached_data_tool",
+        description="",
+        args_model=LimitArgs,
+        icon="search",
+        label="",
+        is_render_tool=False,
+        handler=handler,
+    )
+    first = runner._run_tool(spec, 1, make_version(1), {})
+    assert runner._run_tool(spec, 1, make_version(1), {"limit": 10}) is first
+    runner._run_tool(spec, 2, make_version(1), {})
+    runner._run_tool(spec, 1, make_version(1), {"limit": 5})
+    runner._run_tool(spec, 1, make_version(2), {})
+    assert calls == [10, 10, 5, 10]
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable
+
+import pytest
+
+from finbot import model
+from finbot.apps.appwsrv.reports.transactions.report import (
+    _decode_transactions_cursor,
+    _to_search_pattern,
+    encode_transactions_cursor,
+    get_cash_flow_summary,
+    get_cash_flow_time_series,
+    get_transaction_filter_options,
+)
+from finbot.apps.appwsrv.reports.transactions.schema import FilterOption
+from finbot.core.errors import InvalidUserInput
+from finbot.model import SessionType
+from finbot.model import repository as model_repository
+
+
+def test_transactions_cursor_round_trip():
+    transaction_date = datetime(2026, 3, 14, 9, 26, 53, 589793, tzinfo=timezone.utc)
+    cursor = encode_transactions_cursor(transaction_date, 42)
+    assert _decode_transactions_cursor(cursor) == (transaction_date, 42)
+
+
+def test_invalid_transactions_cursor_is_rejected():
+    with pytest.raises(InvalidUserInput):
+        _decode_transactions_cursor("not a cursor")
+
+
+def test_search_pattern_matches_wildcards_literally():
+    assert _to_search_pattern("netflix") == "%netflix%"
+    assert _to_search_pattern("50%_off") == "%50\\%\\_off%"
+
+
+def test_filter_options_facets_exclude_their_own_filter(
+    db_session: SessionType,
+    sample_user_account: model.UserAccount,
+    make_linked_account: Callable[[str], model.LinkedAccount],
+):
+    user_account = sample_user_account
+    current, savings, unused = [
+        make_linked_account(name) for name in ("Current account", "Savings account", "Unused account")
+    ]
+    carrefour, netflix = model.Merchant(name="Carrefour"), model.Merchant(name="Netflix")
+    db_session.add_all([current, savings, unused, carrefour, netflix])
+    db_session.flush()
+    db_session.add_all(
+        [
+            model.TransactionHistoryEntry(
+                linked_account_id=linked_account.id,
+                sub_account_id="SA",
+                provider_transaction_id=f"T{i}",
+                transaction_date=datetime(2026, 3, 1 + i, tzinfo=timezone.utc),
+                transaction_type="payment" if amount < 0 else "deposit",
+                amount=Decimal(amount),
+                amount_snapshot_ccy=Decimal(amount),
+                currency="EUR",
+                description=f"T{i}",
+                spending_category_primary=category,
+                merchant_id=merchant.id if merchant else None,
+            )
+            for i, (linked_account, category, merchant, amount) in enumerate(
+                [
+                    (current, "FOOD_AND_DRINK", carrefour, -50),
+                    (current, "FOOD_AND_DRINK", netflix, -15),
+                    (savings, "FOOD_AND_DRINK", carrefour, -30),
+                    (savings, "ENTERTAINMENT", None, 200),
+                ]
+            )
+        ]
+    )
+    db_session.commit()
+
+    def counts(options: list[FilterOption]) -> dict[str, int]:
+        return {option.label: option.transaction_count for option in options if option.transaction_count}
+
+    filter_options = get_transaction_filter_options(
+        db_session,
+        user_account.id,
+        linked_account_id=[current.id],
+        spending_category=["FOOD_AND_DRINK"],
+        merchant_name=["Carrefour"],
+    )
+    assert {option.label: option.transaction_count for option in filter_options.accounts} == {
+        "Current account": 1,
+        "Savings account": 1,
+        "Unused account": 0,
+    }
+    assert counts(filter_options.categories) == {"Food & Drink": 1}
+    assert counts(filter_options.merchants) == {"Carrefour": 1, "Netflix": 1}
+    assert (filter_options.credit_count, filter_options.debit_count) == (0, 1)
+    assert filter_options.amount_max == 50.0
+
+    filter_options = get_transaction_filter_options(db_session, user_account.id, amount_sign="credit")
+    assert counts(filter_options.accounts) == {"Savings account": 1}
+    assert (filter_options.credit_count, filter_options.debit_count) == (1, 3)
+
+
+def test_cash_flow_reports_combine_daily_aggregates_and_edge_days(
+    db_session: SessionType,
+    sample_user_account: model.UserAccount,
+    make_linked_account: Callable[[str], model.LinkedAccount],
+):
+    user_account = sample_user_account
+    linked_account = make_linked_account("Current account")
+    db_session.add(linked_account)
+    db_session.commit()
+
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    transactions = [
+        model.TransactionHistoryEntry(
+            linked_account_id=linked_account.id,
+            sub_account_id="SA",
+            provider_transaction_id=f"T{i}",
+            transaction_date=start + timedelta(hours=7 * i),
+            transaction_type="deposit" if i % 3 == 0 else "payment",
+            amount=Decimal(amount),
+            amount_snapshot_ccy=Decimal(amount),
+            currency="EUR",
+            description=f"T{i}",
+        )
+        for i, amount in enumerate(["100", "-20", "-5.5", "40", "-12", "-3", "250", "-80", "-1", "10"] * 3)
+    ]
+    db_session.add_all(transactions)
+    db_session.flush()
+    model_repository.update_cash_flow_aggregates(
+        db_session, model_repository.find_transactions_days(db_session, [txn.id for txn in transactions])
+    )
+    db_session.commit()
+
+    # partial first and last days, read from the transactions history
+    from_time = start + timedelta(hours=10)
+    to_time = start + timedelta(days=7, hours=15)
+    in_range = [txn for txn in transactions if from_time <= txn.transaction_date <= to_time]
+
+    summary = get_cash_flow_summary(db_session, user_account.id, from_time, to_time)
+    assert summary.net_cash_flow == pytest.approx(float(sum(txn.amount for txn in in_range)))
+
+    series = get_cash_flow_time_series(db_session, user_account.id, from_time, to_time, frequency="daily")
+    expected_days = sorted({txn.transaction_date.date().isoformat() for txn in in_range})
+    assert [entry.period for entry in series.entries] == expected_days
+    assert sum(entry.inflows for entry in series.entries) == pytest.approx(
+        float(sum(txn.amount for txn in in_range if txn.amount > 0))
+    )
@@ -1,4 +1,4 @@
-from typing import Generator
+from typing import Callable, Generator
 
 import pytest
 from sqlalchemy import create_engine
@@ -6,7 +6,7 @@ from sqlalchemy.orm import sessionmaker
 
 from finbot.core.environment import get_test_database_url
 from finbot.model import Base as ModelBase
-from finbot.model import SessionType
+from finbot.model import LinkedAccount, PersistScope, Provider, SessionType, UserAccount, UserAccountSettings
 
 
 @pytest.fixture(scope="function")
@@ -17,3 +17,49 @@ def db_session() -> Generator[SessionType, None, None]:
     yield session
     session.close()
     ModelBase.metadata.drop_all(engine)
+
+
+@pytest.fixture(scope="function")
+def sample_provider(
+    db_session: SessionType,
+) -> Provider:
+    provider: Provider
+    with PersistScope(db_session)(Provider()) as provider:
+        provider.id = "test_bank_fr"
+        provider.description = "Test provider"
+        provider.website_url = "https://test-bank.fr"
+        provider.credentials_schema = {}
+    return provider
+
+
+@pytest.fixture(scope="function")
+def sample_user_account(
+    db_session: SessionType,
+) -> UserAccount:
+    user_account: UserAccount
+    with PersistScope(db_session)(UserAccount()) as user_account:
+        user_account.email = "test@finbot.com"
+        user_account.password_hash = b"fake password hash"
+        user_account.full_name = "Test Account"
+        user_account.mobile_phone_number = "0000"
+        user_account.settings = UserAccountSettings(valuation_ccy="EUR")
+    return user_account
+
+
+@pytest.fixture(scope="function")
+def make_linked_account(
+    sample_user_account: UserAccount,
+    sample_provider: Provider,
+) -> Callable[[str], LinkedAccount]:
+    """Build (not persisted) linked accounts of the sample user account"""
+
+    def make(account_name: str) -> LinkedAccount:
+        return LinkedAccount(
+            user_account_id=sample_user_account.id,
+            provider_id=sample_provider.id,
+            account_name=account_name,
+            account_colour="#787878",
+            encrypted_credentials="",
+        )
+
+    return make
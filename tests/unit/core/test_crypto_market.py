@@ -0,0 +1,37 @@
+from typing import Any
+
+import pytest
+
+from finbot.core import crypto_market
+
+
+class FakeCoinGeckoAPI:
+    def __init__(self) -> None:
+        self.price_requests: list[Any] = []
+
+    def get_coins_list(self) -> list[dict[str, str]]:
+        return [{"symbol": "btc", "id": "bitcoin"}, {"symbol": "eth", "id": "ethereum"}]
+
+    def get_price(self, ids: Any, vs_currencies: str) -> dict[str, dict[str, float]]:
+        self.price_requests.append(ids)
+        prices = {"bitcoin": 50_000.0, "ethereum": 2_000.0}
+        return {coin_id: {vs_currencies: prices[coin_id]} for coin_id in ids}
+
+
+@pytest.fixture(autouse=True)
+def clear_spots_cache():
+    crypto_market._SPOTS_CACHE.clear()
+
+
+def test_get_spots_uses_a_single_upstream_call():
+    api = FakeCoinGeckoAPI()
+    market = crypto_market.CryptoMarket(impl=api)
+    assert market.get_spots(["BTC", "ETH"], "USD") == {"BTC": 50_000.0, "ETH": 2_000.0}
+    assert api.price_requests == [["bitcoin", "ethereum"]]
+
+
+def test_get_spots_is_cached_across_instances():
+    crypto_market.CryptoMarket(impl=FakeCoinGeckoAPI()).get_spots(["BTC"], "USD")
+    api = FakeCoinGeckoAPI()
+    assert crypto_market.CryptoMarket(impl=api).get_spots(["BTC", "ETH"], "USD") == {"BTC": 50_000.0, "ETH": 2_000.0}
+    assert api.price_requests == [["ethereum"]]
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+
+from finbot.core.fx_market import FxRatesProvider, FxRatesTable, Xccy
+from finbot.core.utils import now_utc
+
+
+def make_table(age: timedelta = timedelta(), usd_eur: float = 0.8) -> FxRatesTable:
+    return FxRatesTable(
+        base_ccy="USD",
+        rates={"USD": 1.0, "EUR": usd_eur, "GBP": 0.5},
+        fetched_at=now_utc() - age,
+    )
+
+
+class FakeStore:
+    def __init__(self, table: FxRatesTable | None = None):
+        self.table = table
+
+    def load(self) -> FxRatesTable | None:
+        return self.table
+
+    def save(self, table: FxRatesTable) -> None:
+        self.table = table
+
+
+class FakeFetcher:
+    def __init__(self, usd_eur: float = 0.8):
+        self.usd_eur = usd_eur
+        self.calls = 0
+
+    def __call__(self) -> FxRatesTable:
+        self.calls += 1
+        return make_table(usd_eur=self.usd_eur)
+
+
+@pytest.mark.parametrize(
+    "pair,expected_rate",
+    [
+        (Xccy("EUR", "EUR"), 1.0),
+        (Xccy("USD", "EUR"), 0.8),
+        (Xccy("EUR", "USD"), 1.25),
+        (Xccy("GBP", "EUR"), 1.6),
+        (Xccy("XXX", "EUR"), None),
+    ],
+)
+def test_fx_rates_table_triangulates_through_base(pair: Xccy, expected_rate: float | None):
+    rate = make_table().get_rate(pair)
+    assert rate == pytest.approx(expected_rate) if expected_rate else rate is None
+
+
+def test_serialized_fx_rates_table_round_trips():
+    table = make_table()
+    restored = FxRatesTable.deserialize(table.serialize())
+    assert (restored.base_ccy, restored.rates, restored.fetched_at) == (table.base_ccy, table.rates, table.fetched_at)
+
+
+def test_fresh_persisted_rates_are_served_without_upstream_call():
+    fetch = FakeFetcher()
+    provider = FxRatesProvider(fetch=fetch, store=FakeStore(make_table(age=timedelta(minutes=5))))
+    assert provider.get_table().get_rate(Xccy("USD", "EUR")) == 0.8
+    assert fetch.calls == 0
+
+
+def test_stale_rates_are_served_while_revalidating():
+    fetch = FakeFetcher(usd_eur=0.9)
+    store = FakeStore(make_table(age=timedelta(hours=2)))
+    provider = FxRatesProvider(fetch=fetch, store=store)
+    assert provider.get_table().get_rate(Xccy("USD", "EUR")) == 0.8
+    assert provider._revalidation is not None
+    provider._revalidation.join()
+    assert fetch.calls == 1
+    assert provider.get_table().get_rate(Xccy("USD", "EUR")) == 0.9
+    assert store.table is not None and store.table.rates["EUR"] == 0.9
+
+
+def test_expired_rates_are_refreshed_synchronously():
+    fetch = FakeFetcher(usd_eur=0.9)
+    provider = FxRatesProvider(fetch=fetch, store=FakeStore(make_table(age=timedelta(days=2))))
+    assert provider.get_table().get_rate(Xccy("USD", "EUR")) == 0.9
+    assert fetch.calls == 1
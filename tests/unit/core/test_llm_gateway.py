@@ -0,0 +1,107 @@
+import asyncio
+from typing import Optional
+
+from openai.types.chat import ChatCompletionChunk
+from pydantic import BaseModel
+
+from finbot.core.llm_gateway import FakeLLMBackend, LLMGateway, Priority, PriorityRateLimiter
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def echo(prompt: str, text_format: type[BaseModel]) -> Optional[BaseModel]:
+    return Answer(text=prompt.upper())
+
+
+def make_chunk(content: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "fake",
+            "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+        }
+    )
+
+
+def test_parse_coalesces_identical_in_flight_requests():
+    backend = FakeLLMBackend(parse_handler=echo, latency=0.05)
+    gateway = LLMGateway(backend)
+
+    async def run() -> list[Optional[Answer]]:
+        return await asyncio.gather(
+            gateway.parse("caller_a", "model", "hello", Answer),
+            gateway.parse("caller_b", "model", "hello", Answer),
+            gateway.parse("caller_b", "model", "bye", Answer),
+        )
+
+    results = asyncio.run(run())
+    assert [result.text if result else None for result in results] == ["HELLO", "HELLO", "BYE"]
+    assert sorted(prompt for _, prompt in backend.requests) == ["bye", "hello"]
+    stats = gateway.get_stats()
+    assert stats["caller_a"].requests + stats["caller_b"].requests == 2
+    assert stats["caller_a"].coalesced + stats["caller_b"].coalesced == 1
+
+
+def test_gateway_is_shared_across_event_loops():
+    backend = FakeLLMBackend(parse_handler=echo)
+    gateway = LLMGateway(backend)
+    first = asyncio.run(gateway.parse("caller", "model", "first", Answer))
+    second = asyncio.run(gateway.parse("caller", "model", "second", Answer))
+    assert first and first.text == "FIRST"
+    assert second and second.text == "SECOND"
+    assert gateway.get_stats()["caller"].requests == 2
+
+
+def test_stream_chat_relays_backend_chunks():
+    backend = FakeLLMBackend(chat_chunks=[make_chunk("Hello"), make_chunk(" world")])
+    gateway = LLMGateway(backend)
+
+    async def run() -> str:
+        text = ""
+        async for chunk in gateway.stream_chat("chat", "model", messages=[], tools=[]):
+            text += chunk.choices[0].delta.content or ""
+        return text
+
+    assert asyncio.run(run()) == "Hello world"
+    assert gateway.get_stats()["chat"].requests == 1
+
+
+def test_rate_limiter_serves_interactive_requests_first():
+    async def run() -> list[str]:
+        limiter = PriorityRateLimiter(rate=1000.0, burst=10, max_concurrency=1)
+        served: list[str] = []
+
+        async def request(name: str, priority: Priority) -> None:
+            await limiter.acquire(priority)
+            served.append(name)
+            await asyncio.sleep(0.01)
+            limiter.release()
+
+        await limiter.acquire(Priority.Background)  # occupy the only slot
+        tasks = [
+            asyncio.create_task(request("background_1", Priority.Background)),
+            asyncio.create_task(request("background_2", Priority.Background)),
+            asyncio.create_task(request("interactive", Priority.Interactive)),
+        ]
+        await asyncio.sleep(0.01)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return served
+
+    assert asyncio.run(run()) == ["interactive", "background_1", "background_2"]
+
+
+def test_rate_limiter_throttles_beyond_burst():
+    async def run() -> float:
+        limiter = PriorityRateLimiter(rate=20.0, burst=2, max_concurrency=10)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        for _ in range(4):
+            await limiter.acquire(Priority.Background)
+        return loop.time() - started_at
+
+    assert asyncio.run(run()) >= 0.09  # 2 requests from the burst, 2 more at 20/s
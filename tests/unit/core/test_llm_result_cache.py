@@ -0,0 +1,65 @@
+import asyncio
+from decimal import Decimal
+from typing import cast
+
+from pydantic import BaseModel
+
+from finbot import model
+from finbot.core.llm_gateway import FakeLLMBackend, LLMGateway
+from finbot.core.llm_result_cache import LLMResultCache
+from finbot.core.spending_categorizer import CategorizeResponse, TransactionCategoryResult, categorize_transactions
+from finbot.model import SessionType
+
+
+def categorize_as_groceries(prompt: str, text_format: type[BaseModel]) -> CategorizeResponse:
+    return CategorizeResponse(
+        results=[TransactionCategoryResult(id=1, primary="FOOD_AND_DRINK", detailed="FOOD_AND_DRINK_GROCERIES")]
+    )
+
+
+def make_transaction(transaction_id: int, amount: Decimal) -> model.TransactionHistoryEntry:
+    return model.TransactionHistoryEntry(
+        id=transaction_id,
+        description="TESCO STORES 1234 LONDON",
+        amount=amount,
+        currency="GBP",
+        transaction_type="purchase",
+    )
+
+
+def test_cache_key_depends_on_content_and_version():
+    cache = LLMResultCache(cast(SessionType, None), task="spending_category", version="1")
+    key = cache.make_key("TESCO STORES", Decimal("-12.50"), "GBP")
+    assert key == cache.make_key("TESCO STORES", Decimal("-3"), "gbp")
+    assert key != cache.make_key("TESCO STORES", Decimal("12.50"), "GBP")
+    assert key != cache.make_key("TESCO STORES", Decimal("-12.50"), "EUR")
+    assert key != LLMResultCache(cast(SessionType, None), task="spending_category", version="2").make_key(
+        "TESCO STORES", Decimal("-12.50"), "GBP"
+    )
+
+
+def test_categorization_reuses_cached_results(db_session: SessionType):
+    backend = FakeLLMBackend(parse_handler=categorize_as_groceries)
+    gateway = LLMGateway(backend)
+    first_entry = make_transaction(1, Decimal("-12.50"))
+    asyncio.run(categorize_transactions([first_entry], db_session, gateway))
+    assert len(backend.requests) == 1
+    assert first_entry.spending_category_detailed == "FOOD_AND_DRINK_GROCERIES"
+
+    repeat_entry = make_transaction(2, Decimal("-7.99"))
+    asyncio.run(categorize_transactions([repeat_entry], db_session, gateway))
+    assert len(backend.requests) == 1
+    assert repeat_entry.spending_category_primary == "FOOD_AND_DRINK"
+    assert repeat_entry.spending_category_detailed == "FOOD_AND_DRINK_GROCERIES"
+    assert repeat_entry.spending_category_source == "llm"
+
+
+def test_cache_reads_count_hits_and_misses(db_session: SessionType):
+    cache = LLMResultCache(db_session, task="spending_category", version="1")
+    cached_key = cache.make_key("TESCO STORES", Decimal("-12.50"), "GBP")
+    missing_key = cache.make_key("SAINSBURYS", Decimal("-12.50"), "GBP")
+    cache.put(cached_key, {"primary": "FOOD_AND_DRINK"})
+    db_session.commit()
+
+    assert cache.get_many([cached_key, missing_key, cached_key]) == {cached_key: {"primary": "FOOD_AND_DRINK"}}
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from rapidfuzz import fuzz, process
+
+from finbot import model
+from finbot.core.merchant_pattern_index import MerchantPatternIndex, PatternMatch, _load_patterns
+from finbot.core.utils import now_utc
+from finbot.model import SessionType
+
+
+def make_index() -> MerchantPatternIndex:
+    index = MerchantPatternIndex()
+    index.add("TESCO STORES", merchant_id=1, merchant_name="Tesco")
+    index.add("AMAZON MKTPLACE", merchant_id=2, merchant_name="Amazon")
+    index.add("AMAZON PRIME", merchant_id=2, merchant_name="Amazon")
+    index.add("SAINSBURYS", merchant_id=3, merchant_name="Sainsbury's")
+    return index
+
+
+def test_exact_pattern_match():
+    assert make_index().match("AMAZON PRIME") == [PatternMatch(pattern="AMAZON PRIME", score=100.0, merchant_id=2)]
+
+
+def test_fuzzy_pattern_match_ranks_best_candidate_first():
+    matches = make_index().match("STORES TESCO EXTRA")
+    assert matches[0].merchant_id == 1
+    assert matches[0].score >= 60
+    assert all(match.merchant_id != 3 for match in matches)
+
+
+def test_no_candidate_without_shared_ngrams():
+    assert make_index().match("QWXZ") == []
+
+
+def test_match_agrees_with_full_scan_on_large_index():
+    index = MerchantPatternIndex()
+    patterns = [f"MERCHANT {i} SHOP {i % 97}" for i in range(5000)]
+    for i, pattern in enumerate(patterns):
+        index.add(pattern, merchant_id=i, merchant_name=f"Merchant {i}")
+    for query in ["MERCHANT 1234 SHOP", "SHOP 12 MERCHANT 4012", "MERCHNT 777 SHOP 1"]:
+        expected = process.extractOne(query, patterns, scorer=fuzz.token_sort_ratio)
+        assert expected is not None
+        assert index.match(query)[0].score == expected[1]
+
+
+def test_incremental_load_picks_up_late_committed_patterns(db_session: SessionType):
+    tesco = model.Merchant(name="Tesco")
+    db_session.add(tesco)
+    db_session.commit()
+    index = MerchantPatternIndex()
+    db_session.add(model.MerchantDescriptionPattern(merchant_id=tesco.id, sanitized_description="TESCO STORES"))
+    db_session.commit()
+    _load_patterns(index, db_session)
+    assert index.get_merchant("TESCO STORES") == (tesco.id, "Tesco")
+
+    # created (transaction start) before the last load, committed after it
+    db_session.add(
+        model.MerchantDescriptionPattern(
+            merchant_id=tesco.id,
+            sanitized_description="TESCO EXPRESS",
+            created_at=now_utc() - timedelta(minutes=5),
+        )
+    )
+    db_session.commit()
+    _load_patterns(index, db_session)
+    assert index.get_merchant("TESCO EXPRESS") == (tesco.id, "Tesco")
+    assert len(index) == 2
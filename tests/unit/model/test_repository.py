@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+from sqlalchemy.sql import text
+
+from finbot.core.db.utils import row_to_dict
+from finbot.core.schema import ValuationFrequency
+from finbot.model import (
+    SessionType,
+    UserAccount,
+    UserAccountHistoryEntry,
+    UserAccountValuationHistoryEntry,
+    repository,
+)
+
+FROM_TIME = datetime(2024, 2, 14, 13, 0, tzinfo=timezone.utc)
+TO_TIME = datetime(2026, 2, 17, 9, 30, tzinfo=timezone.utc)
+
+
+def get_raw_historical_valuation(
+    session: SessionType,
+    user_account_id: int,
+    from_time: Optional[datetime],
+    to_time: Optional[datetime],
+    frequency: ValuationFrequency,
+) -> list[repository.HistoricalValuationEntry]:
+    """Reference implementation: all valuation periods are computed from the valuation history"""
+    grouping = repository._get_valuation_grouping_from_frequency(frequency)
+    condition = "true"
+    if from_time:
+        condition += " and fuahe.effective_at >= :from_time"
+    if to_time:
+        condition += " and fuahe.effective_at <= :to_time"
+    query = f"""
+        select q.*,
+               (q.last_value - q.first_value) as abs_change,
+               case q.first_value
+                when 0.0 then null
+                else (q.last_value - q.first_value) / (q.first_value)
+               end as rel_change
+          from ({repository._historical_valuation_query(grouping, condition)}) q
+      order by q.period_start
+    """
+    params = {"user_account_id": user_account_id, "from_time": from_time, "to_time": to_time}
+    return [repository.HistoricalValuationEntry(**row_to_dict(row)) for row in session.execute(text(query), params)]
+
+
+@pytest.mark.parametrize("frequency", list(ValuationFrequency))
+def test_historical_valuation_from_rollups_matches_valuation_history(
+    db_session: SessionType,
+    sample_user_account: UserAccount,
+    frequency: ValuationFrequency,
+):
+    # every ~9 days over 2.5 years, and exactly at (and right before) the start of some buckets
+    effective_times = [
+        datetime(2023, 11, 20, 8, 0, tzinfo=timezone.utc) + timedelta(days=9, hours=5) * i for i in range(95)
+    ]
+    for bucket_start in [datetime(2025, 1, 1), datetime(2025, 4, 1), datetime(2025, 6, 2), datetime(2025, 6, 3)]:
+        bucket_start = bucket_start.replace(tzinfo=timezone.utc)
+        effective_times.extend([bucket_start, bucket_start - timedelta(seconds=1)])
+    history_entries = [
+        UserAccountHistoryEntry(
+            user_account_id=sample_user_account.id,
+            effective_at=effective_at,
+            valuation_ccy="EUR",
+            available=True,
+            user_account_valuation_history_entry=UserAccountValuationHistoryEntry(
+                valuation=Decimal(1000 + (index * 37) % 101),
+                total_liabilities=Decimal(0),
+            ),
+        )
+        for (index, effective_at) in enumerate(effective_times)
+    ]
+    db_session.add_all(history_entries)
+    db_session.commit()
+    for history_entry in history_entries:
+        repository.update_user_account_valuation_rollups(db_session, history_entry.id)
+    db_session.commit()
+
+    for from_time, to_time in [
+        (FROM_TIME, TO_TIME),
+        (FROM_TIME, None),
+        (None, TO_TIME),
+        (None, None),
+        (FROM_TIME, FROM_TIME + timedelta(days=20)),
+    ]:
+        valuations = repository.get_user_account_historical_valuation(
+            db_session, sample_user_account.id, from_time, to_time, frequency
+        )
+        assert valuations
+        assert valuations == get_raw_historical_valuation(
+            db_session, sample_user_account.id, from_time, to_time, frequency
+        ), (from_time, to_time)
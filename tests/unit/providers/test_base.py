@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from finbot.core.schema import CurrencyCode
+from finbot.providers.base import ProviderBase, session_cached
+from finbot.providers.schema import Account
+
+
+class FakeProvider(ProviderBase):
+    description = "Fake provider"
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(user_account_currency=CurrencyCode.validate("EUR"), **kwargs)
+        self.calls: list[str] = []
+
+    async def initialize(self) -> None:
+        pass
+
+    async def get_accounts(self) -> list[Account]:
+        return []
+
+    @session_cached
+    async def fetch(self, endpoint: str, fail: bool = False) -> str:
+        self.calls.append(endpoint)
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError(endpoint)
+        return f"response:{endpoint}"
+
+
+@pytest.mark.asyncio
+async def test_session_cached_shares_upstream_calls():
+    async with FakeProvider() as provider:
+        results = await asyncio.gather(provider.fetch("a"), provider.fetch("a"), provider.fetch("b"))
+        assert results == ["response:a", "response:a", "response:b"]
+        assert await provider.fetch("a") == "response:a"
+        assert provider.calls == ["a", "b"]
+        assert provider.session_cache.upstream_calls == 2
+        assert provider.session_cache.saved_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_session_cached_does_not_cache_failures():
+    async with FakeProvider() as provider:
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await provider.fetch("a", fail=True)
+        assert provider.calls == ["a", "a"]
@@ -0,0 +1,62 @@
+from typing import Any
+
+import pytest
+
+from finbot.providers import kraken_us
+
+# requested pair -> (Kraken pair name, last price)
+TICKERS = {
+    "XBTEUR": ("XXBTZEUR", 50_000.0),
+    "ETHEUR": ("XETHZEUR", 2_000.0),
+    "DOTUSD": ("DOTUSD", 5.0),
+    "EURUSD": ("ZEURZUSD", 1.25),
+}
+
+
+class FakeKrakenApi:
+    def __init__(self) -> None:
+        self.ticker_requests: list[str] = []
+
+    def query_public(self, method: str, data: dict[str, str]) -> dict[str, Any]:
+        assert method == "Ticker"
+        self.ticker_requests.append(data["pair"])
+        results = {}
+        for pair in data["pair"].split(","):
+            if pair not in TICKERS:
+                return {"error": [f"EQuery:Unknown asset pair {pair}"], "result": {}}
+            (key, price) = TICKERS[pair]
+            results[key] = {"c": [str(price), "1.0"]}
+        return {"error": [], "result": results}
+
+
+@pytest.fixture(autouse=True)
+def clear_last_prices_cache():
+    kraken_us._LAST_PRICES_CACHE.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_last_prices_uses_a_single_ticker_call():
+    api = FakeKrakenApi()
+    fetcher = kraken_us.KrakenPriceFetcher(api)
+    assert await fetcher.get_last_prices(["XBT", "ETH", "EUR"], "EUR") == {
+        "XBT": 50_000.0,
+        "ETH": 2_000.0,
+        "EUR": 1.0,
+    }
+    assert api.ticker_requests == ["XBTEUR,ETHEUR"]
+
+
+@pytest.mark.asyncio
+async def test_get_last_prices_crosses_unlisted_pairs_via_usd():
+    api = FakeKrakenApi()
+    fetcher = kraken_us.KrakenPriceFetcher(api)
+    assert await fetcher.get_last_prices(["ETH", "DOT"], "EUR") == {"ETH": 2_000.0, "DOT": 4.0}
+    assert await fetcher.get_last_price("DOT", "EUR") == 4.0
+    assert api.ticker_requests == ["ETHEUR,DOTEUR", "ETHEUR", "DOTEUR", "DOTUSD,EURUSD"]
+
+
+@pytest.mark.asyncio
+async def test_get_last_prices_raises_for_unknown_assets():
+    fetcher = kraken_us.KrakenPriceFetcher(FakeKrakenApi())
+    with pytest.raises(kraken_us.KrakenPriceFetcher.Error):
+        await fetcher.get_last_prices(["UNKNOWN"], "EUR")
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from finbot.core.schema import CurrencyCode
+from finbot.providers.base import ProviderBase
+from finbot.providers.schema import Account, Assets, Liabilities
+from finbot.workflows.fetch_financial_data import schema
+from finbot.workflows.fetch_financial_data.service import fetch_line_items
+
+ALL_LINE_ITEMS = [
+    schema.LineItem.Accounts,
+    schema.LineItem.Assets,
+    schema.LineItem.Liabilities,
+]
+
+
+class FakeProvider(ProviderBase):
+    description = "Fake provider"
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(user_account_currency=CurrencyCode.validate("EUR"), **kwargs)
+        self.running = 0
+        self.max_running = 0
+
+    async def _track(self) -> None:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def get_accounts(self) -> list[Account]:
+        await self._track()
+        return []
+
+    async def get_assets(self) -> Assets:
+        await self._track()
+        return Assets(accounts=[])
+
+    async def get_liabilities(self) -> Liabilities:
+        await self._track()
+        return Liabilities(accounts=[])
+
+
+class FakeConcurrentProvider(FakeProvider):
+    concurrent_line_items = frozenset({"Accounts", "Assets", "Liabilities"})
+    max_concurrent_line_items = 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "provider_type,expected_max_running",
+    [
+        (FakeProvider, 1),
+        (FakeConcurrentProvider, 2),
+    ],
+)
+async def test_fetch_line_items(provider_type: type[FakeProvider], expected_max_running: int):
+    provider = provider_type()
+    results = await fetch_line_items(list(reversed(ALL_LINE_ITEMS)), provider)
+    assert [result.line_item for result in results] == list(reversed(ALL_LINE_ITEMS))
+    assert provider.max_running == expected_max_running
@@ -1,10 +1,16 @@
-from unittest.mock import Mock, call
+import os
+import time
+from pathlib import Path
+from typing import cast
+from unittest.mock import Mock, call, patch
 
 import pytest
 
 from finbot.core import fx_market
 from finbot.core import schema as core_schema
+from finbot.core.blob_store import FilesystemBlobStore
 from finbot.providers import schema as providers_schema
+from finbot.workflows.fetch_financial_data import claim_check
 from finbot.workflows.fetch_financial_data import schema as finbotwsrv_schema
 from finbot.workflows.user_account_snapshot import impl, schema
 
@@ -314,6 +320,47 @@ def test_visit_snapshot_tree(valid_snapshot_data: list[schema.LinkedAccountSnaps
     )
 
 
+def test_visit_snapshot_tree_with_stored_snapshot_data(
+    valid_snapshot_data: list[schema.LinkedAccountSnapshotResponse],
+    tmp_path: Path,
+):
+    blob_store = FilesystemBlobStore(tmp_path)
+    stored_snapshot_data = [
+        entry.model_copy(
+            update={
+                "snapshot_data": claim_check.store_financial_data(
+                    cast(finbotwsrv_schema.GetFinancialDataResponse, entry.snapshot_data), blob_store
+                )
+            }
+        )
+        for entry in valid_snapshot_data
+    ]
+    expected_visitor, stored_visitor = Mock(), Mock()
+    impl.visit_snapshot_tree(valid_snapshot_data, expected_visitor)
+    with patch.object(claim_check, "get_blob_store", return_value=blob_store):
+        impl.visit_snapshot_tree(impl.load_stored_snapshot_data(stored_snapshot_data), stored_visitor)
+        impl.delete_stored_snapshot_data(stored_snapshot_data)
+    assert stored_visitor.mock_calls == expected_visitor.mock_calls
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_delete_expired_financial_data_only_deletes_expired_blobs(
+    valid_snapshot_data: list[schema.LinkedAccountSnapshotResponse],
+    tmp_path: Path,
+):
+    blob_store = FilesystemBlobStore(tmp_path)
+    expired_ref, live_ref = [
+        claim_check.store_financial_data(
+            cast(finbotwsrv_schema.GetFinancialDataResponse, entry.snapshot_data), blob_store
+        )
+        for entry in valid_snapshot_data[:2]
+    ]
+    expired_mtime = time.time() - claim_check.STORED_FINANCIAL_DATA_TTL.total_seconds() - 60
+    os.utime(tmp_path / expired_ref.blob_key, (expired_mtime, expired_mtime))
+    assert claim_check.delete_expired_financial_data(blob_store) == 1
+    assert [blob_path.name for blob_path in tmp_path.iterdir()] == [live_ref.blob_key]
+
+
 class TestXccyCollector:
     def test_all_currencies_are_collected(
         self,
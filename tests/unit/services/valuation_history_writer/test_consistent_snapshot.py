@@ -0,0 +1,112 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+
+from finbot.model import SubAccountItemType
+from finbot.workflows.write_valuation_history.repository import (
+    ConsistencySnapshotEmptySubAccountEntry,
+    ConsistencySnapshotEntry,
+    ConsistencySnapshotItemEntry,
+    ConsistentSnapshot,
+    LinkedAccountValuationDescriptor,
+    SubAccountValuationAgg,
+    SubAccountValuationDescriptor,
+)
+
+LARGE_SNAPSHOT_ITEMS = 50_000
+
+
+def make_item_entry(index: int, linked_account_id: int, sub_account_id: str) -> ConsistencySnapshotItemEntry:
+    return ConsistencySnapshotItemEntry(
+        snapshot_id=linked_account_id * 10,
+        linked_account_snapshot_entry_id=linked_account_id,
+        linked_account_id=linked_account_id,
+        sub_account_id=sub_account_id,
+        sub_account_ccy="USD",
+        sub_account_description=f"Sub account {sub_account_id}",
+        sub_account_type="investment",
+        sub_account_sub_type=None,
+        item_name=f"Item {index}",
+        item_type=SubAccountItemType.Liability if index % 7 == 0 else SubAccountItemType.Asset,
+        item_subtype="equity",
+        item_asset_class="equities",
+        item_asset_type="ETF",
+        item_units=None,
+        value_snapshot_ccy=Decimal(index % 1000) / Decimal(100) * (-1 if index % 7 == 0 else 1),
+        value_sub_account_ccy=Decimal(index % 1000) / Decimal(90),
+        value_item_ccy=Decimal(index % 1000) / Decimal(90),
+        item_provider_specific_data=None,
+        item_currency="USD",
+        item_isin_code=None,
+    )
+
+
+@pytest.fixture(scope="module")
+def large_consistent_snapshot() -> ConsistentSnapshot:
+    """50k items spread over 20 linked accounts, 10 sub accounts each (plus one
+    empty sub account per linked account)
+    """
+    entries: list[ConsistencySnapshotEntry] = [
+        make_item_entry(index, linked_account_id=index % 20, sub_account_id=f"SA{index % 200}")
+        for index in range(LARGE_SNAPSHOT_ITEMS)
+    ]
+    entries.extend(
+        ConsistencySnapshotEmptySubAccountEntry(
+            snapshot_id=linked_account_id * 10,
+            linked_account_snapshot_entry_id=linked_account_id,
+            linked_account_id=linked_account_id,
+            sub_account_id="EMPTY",
+            sub_account_ccy="EUR",
+            sub_account_description="Empty sub account",
+            sub_account_type="depository",
+            sub_account_sub_type="checking",
+        )
+        for linked_account_id in range(20)
+    )
+    return ConsistentSnapshot(snapshot_data=entries)
+
+
+def row_based_aggregates(
+    entries: list[ConsistencySnapshotEntry],
+) -> tuple[
+    Decimal,
+    Decimal,
+    dict[LinkedAccountValuationDescriptor, Decimal],
+    dict[SubAccountValuationDescriptor, SubAccountValuationAgg],
+]:
+    linked_accounts: dict[LinkedAccountValuationDescriptor, Decimal] = defaultdict(Decimal)
+    sub_accounts: dict[SubAccountValuationDescriptor, SubAccountValuationAgg] = defaultdict(SubAccountValuationAgg)
+    for entry in entries:
+        linked_accounts[entry.linked_account_valuation_descriptor] += entry.get_value_snapshot_ccy()
+        sub_accounts[entry.sub_account_valuation_descriptor].agg(
+            value_sub_account_ccy=entry.get_value_sub_account_ccy(),
+            value_snapshot_ccy=entry.get_value_snapshot_ccy(),
+        )
+    return (
+        Decimal(sum(entry.get_value_snapshot_ccy() for entry in entries)),
+        Decimal(sum(entry.get_value_snapshot_ccy() for entry in entries if entry.get_value_snapshot_ccy() < 0)),
+        dict(linked_accounts),
+        dict(sub_accounts),
+    )
+
+
+def test_consistent_snapshot_aggregates_match_row_based_aggregation(
+    large_consistent_snapshot: ConsistentSnapshot,
+):
+    valuation, liabilities, linked_accounts, sub_accounts = row_based_aggregates(
+        large_consistent_snapshot.snapshot_data
+    )
+    assert large_consistent_snapshot.get_user_account_valuation() == valuation
+    assert large_consistent_snapshot.get_user_account_liabilities() == liabilities
+    assert large_consistent_snapshot.get_linked_accounts_valuation() == linked_accounts
+    assert large_consistent_snapshot.get_sub_accounts_valuation() == sub_accounts
+    assert len(sub_accounts) == 220
+
+
+def test_empty_consistent_snapshot_aggregates():
+    snapshot = ConsistentSnapshot(snapshot_data=[])
+    assert snapshot.get_user_account_valuation() == Decimal(0)
+    assert snapshot.get_user_account_liabilities() == Decimal(0)
+    assert snapshot.get_linked_accounts_valuation() == {}
+    assert snapshot.get_sub_accounts_valuation() == {}
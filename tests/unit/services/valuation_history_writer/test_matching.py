@@ -0,0 +1,186 @@
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable
+
+from finbot import model
+from finbot.core.utils import now_utc
+from finbot.model import SessionType, SnapshotStatus
+from finbot.workflows.write_valuation_history.matching import (
+    AMOUNT_TOLERANCE,
+    MAX_DATE_DIFF,
+    Candidate,
+    LinkedAccountNames,
+    _build_candidates,
+    _compute_confidence,
+    _resolve_with_greedy,
+    match_transactions,
+)
+
+ACCOUNT_NAMES: LinkedAccountNames = {1: "Current account", 2: "Savings", 3: None}
+START_DATE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_transaction(
+    transaction_id: int,
+    transaction_type: str,
+    amount: Decimal | None,
+    transaction_date: datetime,
+    linked_account_id: int,
+    counterparty: str | None = None,
+) -> model.TransactionHistoryEntry:
+    return model.TransactionHistoryEntry(
+        id=transaction_id,
+        linked_account_id=linked_account_id,
+        sub_account_id="SA",
+        transaction_type=transaction_type,
+        transaction_date=transaction_date,
+        amount=amount or Decimal(0),
+        amount_snapshot_ccy=amount,
+        currency="EUR",
+        counterparty=counterparty,
+    )
+
+
+def scan_build_candidates(
+    outflows: list[model.TransactionHistoryEntry],
+    inflows: list[model.TransactionHistoryEntry],
+    account_names: LinkedAccountNames,
+) -> list[Candidate]:
+    """Reference implementation: every outflow is compared with every inflow
+    (also used by tools/benchmark-transaction-matching)
+    """
+    candidates: list[Candidate] = []
+    for out_txn in outflows:
+        for in_txn in inflows:
+            if (
+                out_txn.linked_account_id == in_txn.linked_account_id
+                and out_txn.sub_account_id == in_txn.sub_account_id
+            ):
+                continue
+            if out_txn.amount_snapshot_ccy is None or in_txn.amount_snapshot_ccy is None:
+                continue
+            if abs(abs(out_txn.amount_snapshot_ccy) - abs(in_txn.amount_snapshot_ccy)) > AMOUNT_TOLERANCE:
+                continue
+            date_diff = abs(out_txn.transaction_date - in_txn.transaction_date)
+            if date_diff > MAX_DATE_DIFF:
+                continue
+            confidence = _compute_confidence(out_txn, in_txn, account_names)
+            candidates.append((confidence, date_diff.total_seconds(), out_txn, in_txn))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+    return candidates
+
+
+def test_build_candidates_matches_outflows_inflows_scan():
+    rng = random.Random(7)
+    outflows = []
+    inflows = []
+    for i in range(300):
+        amount = Decimal(rng.choice([10, 20, 50])) + Decimal(rng.randint(0, 2)) / 100 if rng.random() < 0.9 else None
+        outflows.append(
+            make_transaction(
+                2 * i,
+                rng.choice(["transfer_out", "payment"]),
+                -amount if amount is not None else None,
+                START_DATE + timedelta(days=rng.randint(0, 60)),
+                rng.choice([1, 2, 3]),
+                rng.choice([None, "savings", "current"]),
+            )
+        )
+        inflows.append(
+            make_transaction(
+                2 * i + 1,
+                rng.choice(["transfer_in", "deposit"]),
+                amount,
+                START_DATE + timedelta(days=rng.randint(0, 60)),
+                rng.choice([1, 2, 3]),
+                rng.choice([None, "current"]),
+            )
+        )
+
+    candidates = _build_candidates(outflows, inflows, ACCOUNT_NAMES)
+    assert candidates
+    assert candidates == scan_build_candidates(outflows, inflows, ACCOUNT_NAMES)
+
+
+def test_tied_candidates_are_left_ambiguous():
+    outflow = make_transaction(1, "transfer_out", Decimal("-100"), START_DATE, 1)
+    inflows = [
+        make_transaction(transaction_id, "transfer_in", Decimal("100"), START_DATE, 2) for transaction_id in (2, 3)
+    ]
+    other_outflow = make_transaction(4, "transfer_out", Decimal("-42.5"), START_DATE, 1, counterparty="Savings")
+    other_inflow = make_transaction(5, "transfer_in", Decimal("42.50"), START_DATE + timedelta(hours=1), 2)
+
+    candidates = _build_candidates([outflow, other_outflow], [*inflows, other_inflow], ACCOUNT_NAMES)
+    matches, ambiguous_groups = _resolve_with_greedy(candidates, user_account_id=1)
+
+    assert [(match.outflow_transaction_id, match.inflow_transaction_id) for match in matches] == [(4, 5)]
+    assert matches[0].match_confidence == Decimal("1.00")
+    assert [sorted((c[2].id, c[3].id) for c in group) for group in ambiguous_groups] == [[(1, 2), (1, 3)]]
+
+
+def test_match_transactions_only_considers_snapshot_transactions(
+    db_session: SessionType,
+    sample_user_account: model.UserAccount,
+    make_linked_account: Callable[[str], model.LinkedAccount],
+):
+    user_account = sample_user_account
+    current_account, savings_account = [make_linked_account(name) for name in ("Current account", "Savings")]
+    previous_snapshot, snapshot = [
+        model.UserAccountSnapshot(
+            user_account_id=user_account.id,
+            status=SnapshotStatus.Success,
+            requested_ccy="EUR",
+            start_time=now_utc(),
+            end_time=now_utc(),
+        )
+        for _ in range(2)
+    ]
+    db_session.add_all([current_account, savings_account, previous_snapshot, snapshot])
+    db_session.commit()
+
+    def add_transaction(
+        provider_transaction_id: str,
+        linked_account: model.LinkedAccount,
+        transaction_type: str,
+        amount: str,
+        transaction_date: datetime,
+        source_snapshot: model.UserAccountSnapshot,
+    ) -> model.TransactionHistoryEntry:
+        transaction = model.TransactionHistoryEntry(
+            linked_account_id=linked_account.id,
+            sub_account_id="SA",
+            provider_transaction_id=provider_transaction_id,
+            transaction_date=transaction_date,
+            transaction_type=transaction_type,
+            amount=Decimal(amount),
+            amount_snapshot_ccy=Decimal(amount),
+            currency="EUR",
+            description=provider_transaction_id,
+            source_snapshot_id=source_snapshot.id,
+        )
+        db_session.add(transaction)
+        return transaction
+
+    # seed outflow (this snapshot) and its counterpart (previous snapshot)
+    seed_outflow = add_transaction("T1", current_account, "transfer_out", "-250", START_DATE, snapshot)
+    counterpart = add_transaction("T2", savings_account, "transfer_in", "250", START_DATE, previous_snapshot)
+    # pair unrelated to the snapshot transactions, left to the full rescan
+    add_transaction("T3", current_account, "transfer_out", "-80", START_DATE, previous_snapshot)
+    add_transaction("T4", savings_account, "transfer_in", "80", START_DATE, previous_snapshot)
+    # seed inflow outside of the date window of the previous snapshot transactions
+    add_transaction("T5", savings_account, "transfer_in", "80", START_DATE + timedelta(days=30), snapshot)
+    db_session.commit()
+
+    assert match_transactions(snapshot.id, db_session) == 1
+    matches = db_session.query(model.TransactionMatch).all()
+    assert [(match.outflow_transaction_id, match.inflow_transaction_id) for match in matches] == [
+        (seed_outflow.id, counterpart.id)
+    ]
+    internal_transfer_ids = {
+        transaction_id
+        for (transaction_id,) in db_session.query(model.TransactionHistoryEntry.id).filter(
+            model.TransactionHistoryEntry.is_internal_transfer.is_(True)
+        )
+    }
+    assert internal_transfer_ids == {seed_outflow.id, counterpart.id}
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable
+
+import pytest
+
+from finbot import model
+from finbot.core.utils import now_utc
+from finbot.model import SessionType, SnapshotStatus
+from finbot.workflows.write_valuation_history import recurring
+
+START_DATE = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+def load_recurring_state(
+    db_session: SessionType,
+    user_account_id: int,
+    merchant_ids: set[int],
+) -> tuple[set[tuple[Any, ...]], dict[int, int | None]]:
+    db_session.expire_all()
+    groups = {
+        (group.id, group.merchant_id, group.currency, group.avg_amount, group.transaction_count, group.last_seen)
+        for group in db_session.query(model.RecurringTransactionGroup).filter_by(user_account_id=user_account_id)
+        if group.merchant_id in merchant_ids
+    }
+    transactions_groups = {
+        txn.id: txn.recurring_group_id
+        for txn in db_session.query(model.TransactionHistoryEntry)
+        if txn.merchant_id in merchant_ids
+    }
+    return groups, transactions_groups
+
+
+def test_incremental_detection_matches_full_rebuild_of_touched_keys(
+    db_session: SessionType,
+    monkeypatch: pytest.MonkeyPatch,
+    sample_user_account: model.UserAccount,
+    make_linked_account: Callable[[str], model.LinkedAccount],
+):
+    monkeypatch.setattr(recurring, "_annotate_groups", lambda groups, db_session: None)
+    user_account = sample_user_account
+    linked_account = make_linked_account("Current account")
+    previous_snapshot, snapshot = [
+        model.UserAccountSnapshot(
+            user_account_id=user_account.id,
+            status=SnapshotStatus.Success,
+            requested_ccy="EUR",
+            start_time=now_utc(),
+            end_time=now_utc(),
+        )
+        for _ in range(2)
+    ]
+    netflix, gym, spotify = [model.Merchant(name=name) for name in ("Netflix", "Gym", "Spotify")]
+    db_session.add_all([linked_account, previous_snapshot, snapshot, netflix, gym, spotify])
+    db_session.commit()
+
+    def add_transaction(
+        merchant: model.Merchant,
+        amount: str,
+        month: int,
+        source_snapshot: model.UserAccountSnapshot,
+    ) -> model.TransactionHistoryEntry:
+        transaction = model.TransactionHistoryEntry(
+            linked_account_id=linked_account.id,
+            sub_account_id="SA",
+            provider_transaction_id=f"{merchant.name}-{month}",
+            transaction_date=START_DATE + timedelta(days=30 * month),
+            transaction_type="payment",
+            amount=Decimal(amount),
+            amount_snapshot_ccy=Decimal(amount),
+            currency="EUR",
+            description=f"CB {merchant.name}",
+            merchant_id=merchant.id,
+            source_snapshot_id=source_snapshot.id,
+        )
+        db_session.add(transaction)
+        return transaction
+
+    gym_transactions = [add_transaction(gym, "-40", month, previous_snapshot) for month in range(3)]
+    spotify_transactions = [add_transaction(spotify, "-10", month, previous_snapshot) for month in range(3)]
+    for month in range(3):
+        add_transaction(netflix, "-15", month, previous_snapshot)
+    db_session.commit()
+    assert recurring.detect_recurring_transactions(user_account.id, db_session) == 3
+
+    # this snapshot: a new Netflix payment, the Gym payments no longer recur
+    add_transaction(netflix, "-15", 3, snapshot)
+    for gym_transaction, amount in zip(gym_transactions, ["-40", "-400", "-4000"]):
+        gym_transaction.amount = Decimal(amount)
+        gym_transaction.source_snapshot_id = snapshot.id
+    # out of this snapshot: the Spotify payments no longer recur either
+    for spotify_transaction in spotify_transactions[1:]:
+        spotify_transaction.transaction_type = "transfer"
+    db_session.commit()
+
+    assert recurring.detect_recurring_transactions(user_account.id, db_session, snapshot_id=snapshot.id) == 1
+    touched_merchant_ids = {netflix.id, gym.id}
+    incremental_state = load_recurring_state(db_session, user_account.id, touched_merchant_ids)
+    incremental_groups, _ = incremental_state
+    assert {group[1] for group in incremental_groups} == {netflix.id}
+    # orphaned groups are only deleted for the re-detected (merchant, currency) keys
+    assert db_session.query(model.RecurringTransactionGroup).filter_by(merchant_id=spotify.id).count() == 1
+
+    assert recurring.detect_recurring_transactions(user_account.id, db_session) == 1
+    assert load_recurring_state(db_session, user_account.id, touched_merchant_ids) == incremental_state
+    assert db_session.query(model.RecurringTransactionGroup).filter_by(merchant_id=spotify.id).count() == 0
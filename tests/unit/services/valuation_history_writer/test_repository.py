@@ -1,5 +1,6 @@
 from datetime import timedelta
 from decimal import Decimal
+from typing import Callable
 
 import pytest
 
@@ -8,14 +9,13 @@ from finbot.model import (
     LinkedAccount,
     LinkedAccountSnapshotEntry,
     PersistScope,
-    Provider,
     SessionType,
     SnapshotStatus,
     SubAccountItemSnapshotEntry,
     SubAccountItemType,
     SubAccountSnapshotEntry,
     UserAccount,
-    UserAccountSettings,
+    UserAccountHistoryEntry,
     UserAccountSnapshot,
 )
 from finbot.providers.schema import AssetClass, AssetType
@@ -27,49 +27,12 @@ from finbot.workflows.write_valuation_history.repository import (
 )
 
 
-@pytest.fixture(scope="function")
-def sample_provider(
-    db_session: SessionType,
-) -> Provider:
-    provider: Provider
-    with PersistScope(db_session)(Provider()) as provider:
-        provider.id = "test_bank_fr"
-        provider.description = "Test provider"
-        provider.website_url = "https://test-bank.fr"
-        provider.credentials_schema = {}
-    return provider
-
-
-@pytest.fixture(scope="function")
-def sample_user_account(
-    db_session: SessionType,
-) -> UserAccount:
-    user_account: UserAccount
-    with PersistScope(db_session)(UserAccount()) as user_account:
-        user_account.email = "test@finbot.com"
-        user_account.password_hash = b"fake password hash"
-        user_account.full_name = "Test Account"
-        user_account.mobile_phone_number = "0000"
-        user_account.settings = UserAccountSettings(valuation_ccy="EUR")
-    return user_account
-
-
 @pytest.fixture(scope="function")
 def sample_linked_accounts(
-    sample_user_account: UserAccount,
-    sample_provider: Provider,
+    make_linked_account: Callable[[str], LinkedAccount],
     db_session: SessionType,
 ) -> list[LinkedAccount]:
-    linked_accounts = [
-        LinkedAccount(
-            user_account_id=sample_user_account.id,
-            provider_id=sample_provider.id,
-            account_name=f"Test account {i}",
-            account_colour="#787878",
-            encrypted_credentials="",
-        )
-        for i in range(2)
-    ]
+    linked_accounts = [make_linked_account(f"Test account {i}") for i in range(2)]
     db_session.add_all(linked_accounts)
     db_session.commit()
     return linked_accounts
@@ -313,3 +276,46 @@ def test_get_consistent_snapshot_data(
             ),
         ]
     )
+
+
+def test_get_reference_history_entry_ids(
+    db_session: SessionType,
+    sample_user_account: UserAccount,
+):
+    now = now_utc()
+    history_entries: dict[str, UserAccountHistoryEntry] = {}
+    for name, age, available in [
+        ("3hours", timedelta(hours=3), True),
+        ("90minutes_unavailable", timedelta(minutes=90), False),
+        ("2days", timedelta(days=2), True),
+        ("10days", timedelta(days=10), True),
+        ("40days", timedelta(days=40), True),
+        ("200days", timedelta(days=200), True),
+        ("400days", timedelta(days=400), True),
+        ("800days", timedelta(days=800), True),
+        ("900days", timedelta(days=900), True),
+    ]:
+        history_entries[name] = UserAccountHistoryEntry(
+            user_account_id=sample_user_account.id,
+            effective_at=now - age,
+            valuation_ccy="EUR",
+            available=available,
+        )
+    db_session.add_all(history_entries.values())
+    db_session.commit()
+
+    repository = ReportRepository(db_session)
+    reference_ids = repository.get_reference_history_entry_ids(
+        baseline_id=0,
+        user_account_id=sample_user_account.id,
+        valuation_date=now,
+    )
+    assert reference_ids.reference_ids == {
+        "change_1hour": history_entries["3hours"].id,
+        "change_1day": history_entries["2days"].id,
+        "change_1week": history_entries["10days"].id,
+        "change_1month": history_entries["40days"].id,
+        "change_6months": history_entries["200days"].id,
+        "change_1year": history_entries["400days"].id,
+        "change_2years": history_entries["800days"].id,
+    }
@@ -0,0 +1,304 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable
+
+import pytest
+
+from finbot import model
+from finbot.core.utils import now_utc
+from finbot.model import SessionType, SnapshotStatus, SubAccountItemType
+from finbot.workflows.write_valuation_history import service
+from finbot.workflows.write_valuation_history.repository import (
+    ConsistencySnapshotItemEntry,
+    ConsistentSnapshot,
+    LinkedAccountKey,
+    ReportRepository,
+    SubAccountItemKey,
+    SubAccountKey,
+)
+
+# (linked account index, sub account id, item name) -> valuation, per history entry age (in days)
+CURRENT_VALUATIONS = {
+    (0, "SA1", "EUR"): "1000",
+    (0, "SA1", "Fund"): "2500",
+    (0, "SA2", "EUR"): "300",
+    (1, "SA3", "EUR"): "700",
+    (1, "SA3", "Loan"): "-5000",
+}
+REFERENCE_VALUATIONS = {
+    800: {(0, "SA1", "EUR"): "500", (1, "SA3", "EUR"): "200"},
+    400: {(0, "SA1", "EUR"): "800", (0, "SA2", "EUR"): "100", (1, "SA3", "Loan"): "-6000"},
+    2: {(0, "SA1", "EUR"): "900", (0, "SA1", "Fund"): "2400", (1, "SA3", "Loan"): "-5100"},
+}
+
+VALUATION_LEVELS: dict[type[Any], list[str]] = {
+    model.UserAccountValuationHistoryEntry: [],
+    model.LinkedAccountValuationHistoryEntry: ["linked_account_id"],
+    model.SubAccountValuationHistoryEntry: ["linked_account_id", "sub_account_id"],
+    model.SubAccountItemValuationHistoryEntry: ["linked_account_id", "sub_account_id", "item_type", "name"],
+}
+
+
+@pytest.fixture(scope="function")
+def sample_linked_accounts(
+    make_linked_account: Callable[[str], model.LinkedAccount],
+    db_session: SessionType,
+) -> list[model.LinkedAccount]:
+    linked_accounts = [make_linked_account(f"Test account {i}") for i in range(2)]
+    db_session.add_all(linked_accounts)
+    db_session.commit()
+    return linked_accounts
+
+
+@pytest.fixture(scope="function")
+def sample_snapshot(
+    sample_user_account: model.UserAccount,
+    db_session: SessionType,
+) -> model.UserAccountSnapshot:
+    snapshot = model.UserAccountSnapshot(
+        user_account_id=sample_user_account.id,
+        status=SnapshotStatus.Success,
+        requested_ccy="EUR",
+        start_time=now_utc(),
+        end_time=now_utc(),
+    )
+    db_session.add(snapshot)
+    db_session.commit()
+    return snapshot
+
+
+def make_consistent_snapshot(
+    snapshot: model.UserAccountSnapshot,
+    linked_accounts: list[model.LinkedAccount],
+    valuations: dict[tuple[int, str, str], str],
+) -> ConsistentSnapshot:
+    return ConsistentSnapshot(
+        snapshot_data=[
+            ConsistencySnapshotItemEntry(
+                snapshot_id=snapshot.id,
+                linked_account_snapshot_entry_id=linked_account_index,
+                linked_account_id=linked_accounts[linked_account_index].id,
+                sub_account_id=sub_account_id,
+                sub_account_ccy="EUR",
+                sub_account_description=f"Sub account {sub_account_id}",
+                sub_account_type="depository",
+                sub_account_sub_type=None,
+                item_name=item_name,
+                item_type=SubAccountItemType.Liability if item_name == "Loan" else SubAccountItemType.Asset,
+                item_subtype="currency",
+                item_asset_class="currency",
+                item_asset_type="cash",
+                item_units=None,
+                value_snapshot_ccy=Decimal(valuation),
+                value_sub_account_ccy=Decimal(valuation),
+                value_item_ccy=Decimal(valuation),
+                item_provider_specific_data=None,
+                item_currency="EUR",
+                item_isin_code=None,
+            )
+            for ((linked_account_index, sub_account_id, item_name), valuation) in valuations.items()
+        ]
+    )
+
+
+def make_history_entry(
+    db_session: SessionType,
+    snapshot: model.UserAccountSnapshot,
+    effective_at: datetime,
+) -> model.UserAccountHistoryEntry:
+    history_entry = model.UserAccountHistoryEntry(
+        user_account_id=snapshot.user_account_id,
+        source_snapshot_id=snapshot.id,
+        effective_at=effective_at,
+        valuation_ccy="EUR",
+        available=False,
+    )
+    db_session.add(history_entry)
+    db_session.commit()
+    return history_entry
+
+
+def write_valuation_entries_per_level(
+    history_entry: model.UserAccountHistoryEntry,
+    consistent_snapshot: ConsistentSnapshot,
+    valuation_date: datetime,
+    repo: ReportRepository,
+    db_session: SessionType,
+) -> model.ValuationChangeEntry:
+    """Reference implementation: valuation entries are written level by level
+    through the ORM, valuation changes are then computed from the written entries
+    """
+    history_entry.user_account_valuation_history_entry = model.UserAccountValuationHistoryEntry(
+        valuation=consistent_snapshot.get_user_account_valuation(),
+        total_liabilities=consistent_snapshot.get_user_account_liabilities(),
+    )
+    history_entry.linked_accounts_valuation_history_entries = [
+        model.LinkedAccountValuationHistoryEntry(
+            linked_account_id=descriptor.linked_account_id,
+            effective_snapshot_id=descriptor.snapshot_id,
+            valuation=valuation,
+        )
+        for (descriptor, valuation) in consistent_snapshot.get_linked_accounts_valuation().items()
+    ]
+    history_entry.sub_accounts_valuation_history_entries = [
+        model.SubAccountValuationHistoryEntry(
+            linked_account_id=descriptor.linked_account_id,
+            sub_account_id=descriptor.sub_account_id,
+            sub_account_ccy=descriptor.sub_account_ccy,
+            sub_account_description=descriptor.sub_account_description,
+            sub_account_type=descriptor.sub_account_type,
+            sub_account_sub_type=descriptor.sub_account_sub_type,
+            valuation=valuation.value_snapshot_ccy,
+            valuation_sub_account_ccy=valuation.value_sub_account_ccy,
+        )
+        for (descriptor, valuation) in consistent_snapshot.get_sub_accounts_valuation().items()
+    ]
+    history_entry.sub_accounts_items_valuation_history_entries = [
+        model.SubAccountItemValuationHistoryEntry(**row)
+        for row in service.iter_sub_account_item_valuation_history_rows(consistent_snapshot)
+    ]
+    db_session.commit()
+
+    reference_ids = repo.get_reference_history_entry_ids(
+        baseline_id=history_entry.id,
+        user_account_id=history_entry.user_account_id,
+        valuation_date=valuation_date,
+    )
+    user_account_entry = history_entry.user_account_valuation_history_entry
+    user_account_entry.valuation_change = repo.get_user_account_valuation_change(reference_ids)
+    linked_accounts_changes = repo.get_linked_accounts_valuation_change(reference_ids)
+    for linked_account_entry in history_entry.linked_accounts_valuation_history_entries:
+        linked_account_entry.valuation_change = linked_accounts_changes[
+            LinkedAccountKey(linked_account_id=linked_account_entry.linked_account_id)
+        ]
+    sub_accounts_changes = repo.get_sub_accounts_valuation_change(reference_ids)
+    for sub_account_entry in history_entry.sub_accounts_valuation_history_entries:
+        sub_account_entry.valuation_change = sub_accounts_changes[
+            SubAccountKey(
+                linked_account_id=sub_account_entry.linked_account_id,
+                sub_account_id=sub_account_entry.sub_account_id,
+            )
+        ]
+    items_changes = repo.get_sub_accounts_items_valuation_change(reference_ids)
+    for item_entry in history_entry.sub_accounts_items_valuation_history_entries:
+        item_entry.valuation_change = items_changes[
+            SubAccountItemKey(
+                linked_account_id=item_entry.linked_account_id,
+                sub_account_id=item_entry.sub_account_id,
+                item_type=item_entry.item_type.name,
+                name=item_entry.name,
+            )
+        ]
+    history_entry.available = True
+    db_session.commit()
+    return user_account_entry.valuation_change
+
+
+def load_valuation_entries(
+    db_session: SessionType,
+    history_entry_id: int,
+) -> dict[str, dict[tuple[Any, ...], tuple[dict[str, Any], dict[str, Any]]]]:
+    """Valuation entries (all columns but identifiers and timestamps) and their
+    valuation change, by level and entry key
+    """
+    db_session.expire_all()
+    ignored_columns = {"history_entry_id", "valuation_change_id", "created_at", "updated_at"}
+    return {
+        entry_type.__tablename__: {
+            tuple(getattr(entry, column) for column in key_columns): (
+                {
+                    column.name: getattr(entry, column.name)
+                    for column in entry_type.__table__.columns
+                    if column.name not in ignored_columns
+                },
+                entry.valuation_change.serialize(),
+            )
+            for entry in db_session.query(entry_type).filter_by(history_entry_id=history_entry_id)
+        }
+        for (entry_type, key_columns) in VALUATION_LEVELS.items()
+    }
+
+
+def write_reference_history(
+    db_session: SessionType,
+    snapshot: model.UserAccountSnapshot,
+    linked_accounts: list[model.LinkedAccount],
+    now: datetime,
+) -> dict[int, int]:
+    """Write the reference history entries, return their identifier by age (in days)"""
+    repo = ReportRepository(db_session)
+    history_entry_ids: dict[int, int] = {}
+    for days_ago, valuations in sorted(REFERENCE_VALUATIONS.items(), reverse=True):
+        effective_at = now - timedelta(days=days_ago)
+        history_entry = make_history_entry(db_session, snapshot, effective_at)
+        service._write_valuation_entries(
+            history_entry,
+            make_consistent_snapshot(snapshot, linked_accounts, valuations),
+            effective_at,
+            repo,
+            db_session,
+        )
+        history_entry_ids[days_ago] = history_entry.id
+    return history_entry_ids
+
+
+def test_write_valuation_entries_matches_per_level_orm_writes(
+    db_session: SessionType,
+    sample_snapshot: model.UserAccountSnapshot,
+    sample_linked_accounts: list[model.LinkedAccount],
+):
+    now = now_utc()
+    write_reference_history(db_session, sample_snapshot, sample_linked_accounts, now)
+    repo = ReportRepository(db_session)
+    consistent_snapshot = make_consistent_snapshot(sample_snapshot, sample_linked_accounts, CURRENT_VALUATIONS)
+
+    bulk_history_entry = make_history_entry(db_session, sample_snapshot, now)
+    bulk_change = service._write_valuation_entries(bulk_history_entry, consistent_snapshot, now, repo, db_session)
+    orm_history_entry = make_history_entry(db_session, sample_snapshot, now)
+    orm_change = write_valuation_entries_per_level(orm_history_entry, consistent_snapshot, now, repo, db_session)
+
+    assert bulk_change.serialize() == orm_change.serialize()
+    assert bulk_change.serialize() == {
+        "change_1hour": Decimal("1300"),
+        "change_1day": Decimal("1300"),
+        "change_1week": Decimal("4600"),
+        "change_1month": Decimal("4600"),
+        "change_6months": Decimal("4600"),
+        "change_1year": Decimal("4600"),
+        "change_2years": Decimal("-1200"),
+    }
+    bulk_entries = load_valuation_entries(db_session, bulk_history_entry.id)
+    assert bulk_entries == load_valuation_entries(db_session, orm_history_entry.id)
+    assert [len(entries) for entries in bulk_entries.values()] == [1, 2, 3, 5]
+
+
+def test_write_valuation_entries_aligns_valuation_changes_with_entries(
+    db_session: SessionType,
+    sample_snapshot: model.UserAccountSnapshot,
+    sample_linked_accounts: list[model.LinkedAccount],
+):
+    now = now_utc()
+    reference_ids = write_reference_history(db_session, sample_snapshot, sample_linked_accounts, now)
+    history_entry = make_history_entry(db_session, sample_snapshot, now)
+    service._write_valuation_entries(
+        history_entry,
+        make_consistent_snapshot(sample_snapshot, sample_linked_accounts, CURRENT_VALUATIONS),
+        now,
+        ReportRepository(db_session),
+        db_session,
+    )
+
+    entries = load_valuation_entries(db_session, history_entry.id)
+    reference_entries = {
+        days_ago: load_valuation_entries(db_session, history_entry_id)
+        for (days_ago, history_entry_id) in reference_ids.items()
+    }
+    for level, level_entries in entries.items():
+        for key, (row, valuation_change) in level_entries.items():
+            # every entry carries the change of its own valuation, against the same entry in each reference
+            for horizon, days_ago in [("change_1day", 2), ("change_1year", 400), ("change_2years", 800)]:
+                reference_entry = reference_entries[days_ago][level].get(key)
+                expected_change = (
+                    None if reference_entry is None else row["valuation"] - reference_entry[0]["valuation"]
+                )
+                assert valuation_change[horizon] == expected_change, (level, key, horizon)
@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from finbot.workflows.write_valuation_history.transactions import RawTransactionsBatch, build_transaction_rows
+
+
+def make_transaction(transaction_id: str, amount: float, currency: str = "EUR", **kwargs) -> dict:
+    return {
+        "transaction_id": transaction_id,
+        "account_id": "SA_TEST_01",
+        "transaction_date": "2026-01-01T00:00:00+00:00",
+        "transaction_type": "payment",
+        "amount": amount,
+        "currency": currency,
+        "description": "Test transaction",
+        **kwargs,
+    }
+
+
+def test_build_transaction_rows_converts_amounts_to_snapshot_ccy():
+    rows = build_transaction_rows(
+        raw_batches=[
+            RawTransactionsBatch(
+                linked_account_id=1,
+                transactions=[
+                    make_transaction("T1", -10.0),
+                    make_transaction("T2", -20.0, currency="USD"),
+                    make_transaction("T3", -30.0, currency="GBP"),
+                ],
+            )
+        ],
+        snapshot_id=42,
+        target_ccy="EUR",
+        xccy_rates={"USDEUR": Decimal("0.5")},
+    )
+    assert [row["amount_snapshot_ccy"] for row in rows] == [Decimal("-10.0"), Decimal("-10.0"), None]
+    assert all(row["source_snapshot_id"] == 42 for row in rows)
+
+
+def test_build_transaction_rows_deduplicates_on_history_key():
+    rows = build_transaction_rows(
+        raw_batches=[
+            RawTransactionsBatch(linked_account_id=1, transactions=[make_transaction("T1", -10.0)]),
+            RawTransactionsBatch(linked_account_id=2, transactions=[make_transaction("T1", -10.0)]),
+            RawTransactionsBatch(
+                linked_account_id=1,
+                transactions=[make_transaction("T1", -15.0, spending_category_primary="FOOD_AND_DRINK")],
+            ),
+        ],
+        snapshot_id=42,
+        target_ccy="EUR",
+        xccy_rates={},
+    )
+    assert len(rows) == 2
+    (first, second) = rows
+    assert (first["linked_account_id"], first["amount"]) == (1, Decimal("-15.0"))
+    assert first["spending_category_source"] == "provider"
+    assert (second["linked_account_id"], second["amount"]) == (2, Decimal("-10.0"))
@@ -115,6 +115,8 @@ export interface GetUserAccountTransactionsReportRequest {
     amountSign?: string | null;
     limit?: number;
     offset?: number;
+    cursor?: string | null;
+    rankByRelevance?: boolean;
 }
 
 /**
@@ -325,6 +327,8 @@ export interface UserAccountsReportsApiInterface {
      * @param {string} [amountSign] 
      * @param {number} [limit] 
      * @param {number} [offset] 
+     * @param {string} [cursor] 
+     * @param {boolean} [rankByRelevance] 
      * @param {*} [options] Override http request option.
      * @throws {RequiredError}
      * @memberof UserAccountsReportsApiInterface
@@ -885,6 +889,14 @@ export class UserAccountsReportsApi extends runtime.BaseAPI implements UserAccou
             queryParameters['offset'] = requestParameters['offset'];
         }
 
+        if (requestParameters['cursor'] != null) {
+            queryParameters['cursor'] = requestParameters['cursor'];
+        }
+
+        if (requestParameters['rankByRelevance'] != null) {
+            queryParameters['rank_by_relevance'] = requestParameters['rankByRelevance'];
+        }
+
         const headerParameters: runtime.HTTPHeaders = {};
 
         if (this.configuration && this.configuration.accessToken) {
@@ -44,6 +44,12 @@ export interface TransactionsReport {
      * @memberof TransactionsReport
      */
     totalCount: number;
+    /**
+     * 
+     * @type {string}
+     * @memberof TransactionsReport
+     */
+    nextCursor?: string | null;
 }
 
 /**
@@ -69,6 +75,7 @@ export function TransactionsReportFromJSONTyped(json: any, ignoreDiscriminator:
         'valuationCcy': json['valuation_ccy'],
         'transactions': ((json['transactions'] as Array<any>).map(TransactionEntryFromJSON)),
         'totalCount': json['total_count'],
+        'nextCursor': json['next_cursor'] == null ? undefined : json['next_cursor'],
     };
 }
 
@@ -86,6 +93,7 @@ export function TransactionsReportToJSONTyped(value?: TransactionsReport | null,
         'valuation_ccy': value['valuationCcy'],
         'transactions': ((value['transactions'] as Array<any>).map(TransactionEntryToJSON)),
         'total_count': value['totalCount'],
+        'next_cursor': value['nextCursor'],
     };
 }
 
@@ -62,6 +62,7 @@ interface TransactionsReport {
   valuation_ccy: string;
   transactions: TransactionEntry[];
   total_count: number;
+  next_cursor: string | null;
 }
 
 interface FilterOptionEntry {
@@ -80,6 +81,9 @@ interface FilterOptions {
   debit_count: number;
 }
 
+// first page has no cursor (shared instance, resetting to it is a no-op)
+const FIRST_PAGE: (string | null)[] = [null];
+
 export interface TransactionsReportPanelProps {
   userAccountId: number;
   locale: string;
@@ -103,13 +107,15 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
   const [selectedAccounts, setSelectedAccounts] = useState<Set<number>>(
     new Set(),
   );
-  const [offset, setOffset] = useState(0);
+  // cursors of the pages visited so far (keyset pagination)
+  const [pageCursors, setPageCursors] = useState(FIRST_PAGE);
   const [expandedId, setExpandedId] = useState<number | null>(null);
   const [detailId, setDetailId] = useState<number | null>(null);
   const [counterpartCache, setCounterpartCache] = useState<
     Record<number, TransactionEntry>
   >({});
   const limit = pageSize ?? 50;
+  const offset = (pageCursors.length - 1) * limit;
 
   // New filter state
   const [fromDate, setFromDate] = useState(() => {
@@ -237,7 +243,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
       }
       return next;
     });
-    setOffset(0);
+    setPageCursors(FIRST_PAGE);
   };
 
   const toggleAccount = (id: number) => {
@@ -250,7 +256,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
       }
       return next;
     });
-    setOffset(0);
+    setPageCursors(FIRST_PAGE);
   };
 
   const toggleMerchant = (name: string) => {
@@ -263,7 +269,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
       }
       return next;
     });
-    setOffset(0);
+    setPageCursors(FIRST_PAGE);
   };
 
   // Fetch transactions data
@@ -272,7 +278,10 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
       try {
         const params = new URLSearchParams();
         params.set("limit", String(limit));
-        params.set("offset", String(offset));
+        const cursor = pageCursors[pageCursors.length - 1];
+        if (cursor) {
+          params.set("cursor", cursor);
+        }
         if (linkedAccountId !== undefined) {
           params.append("linked_account_id", String(linkedAccountId));
         }
@@ -332,7 +341,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
     debouncedAmountMin,
     debouncedAmountMax,
     amountSign,
-    offset,
+    pageCursors,
   ]);
 
   const accountOptions = useMemo(
@@ -393,7 +402,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
     setAmountMin(null);
     setAmountMax(null);
     setAmountSign("all");
-    setOffset(0);
+    setPageCursors(FIRST_PAGE);
   };
 
   if (error) {
@@ -456,11 +465,11 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
                       toDate={toDate}
                       onFromDateChange={(v) => {
                         setFromDate(v);
-                        setOffset(0);
+                        setPageCursors(FIRST_PAGE);
                       }}
                       onToDateChange={(v) => {
                         setToDate(v);
-                        setOffset(0);
+                        setPageCursors(FIRST_PAGE);
                       }}
                     />
                   </TableHead>
@@ -480,7 +489,7 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
                       value={descriptionSearch}
                       onChange={(v) => {
                         setDescriptionSearch(v);
-                        setOffset(0);
+                        setPageCursors(FIRST_PAGE);
                       }}
                       placeholder="Search..."
                     />
@@ -515,15 +524,15 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
                           debitCount={filterOptions.debit_count}
                           onMinChange={(v) => {
                             setAmountMin(v);
-                            setOffset(0);
+                            setPageCursors(FIRST_PAGE);
                           }}
                           onMaxChange={(v) => {
                             setAmountMax(v);
-                            setOffset(0);
+                            setPageCursors(FIRST_PAGE);
                           }}
                           onSignChange={(v) => {
                             setAmountSign(v);
-                            setOffset(0);
+                            setPageCursors(FIRST_PAGE);
                           }}
                         />
                       )}
@@ -727,16 +736,18 @@ export const TransactionsReportPanel: React.FC<TransactionsReportPanelProps> = (
                 <Button
                   variant="outline"
                   size="sm"
-                  disabled={offset === 0}
-                  onClick={() => setOffset(Math.max(0, offset - limit))}
+                  disabled={pageCursors.length === 1}
+                  onClick={() => setPageCursors((prev) => prev.slice(0, -1))}
                 >
                   Previous
                 </Button>
                 <Button
                   variant="outline"
                   size="sm"
-                  disabled={offset + limit >= report.total_count}
-                  onClick={() => setOffset(offset + limit)}
+                  disabled={!report.next_cursor}
+                  onClick={() =>
+                    setPageCursors((prev) => [...prev, report.next_cursor])
+                  }
                 >
                   Next
                 </Button>